@@ -0,0 +1,215 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+# 批次報表不需要儀錶板的快取預熱、指標歷史與檔案監控（需在匯入專案模組前設定）
+os.environ.setdefault('SOCIAL_DASH_WARMUP', '0')
+os.environ.setdefault('SOCIAL_DASH_HISTORY', '0')
+os.environ.setdefault('SOCIAL_DASH_WATCH_INTERVAL', '0')
+
+# 儀錶板延遲載入 plotly.express；先在父程序載入，fork 出的子程序不需各自重新匯入
+import plotly.express  # noqa: E402,F401
+import plotly.io as pio  # noqa: E402
+from plotly.offline import get_plotlyjs  # noqa: E402
+
+from chart_data import ChartData  # noqa: E402
+from data_store import get_snapshot  # noqa: E402
+from social_data_dash import build_graphs, build_pie_chart, update_comparison_options  # noqa: E402
+
+# 離線報表：列出每個工作表所有可選的圖表組合，以多程序批次產生 HTML/JSON
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<script type="text/javascript">__PLOTLYJS__</script>
+</head>
+<body style="font-family: Arial; margin: 0 15px;">
+<h1 style="text-align: center; color: #f1f1f1; padding: 10px; background-color: #225A3E;">__TITLE__</h1>
+<p style="text-align: center;">數據版本 __VERSION__ ｜ 產生時間 __GENERATED__</p>
+<div id="pie-chart"></div>
+<label for="combo-select" style="font-weight: bold; margin-right: 10px;">圖表組合：</label>
+<select id="combo-select"></select>
+<div id="share-graph" style="height: 40vh;"></div>
+<div id="reach-graph" style="height: 40vh;"></div>
+<script type="text/javascript">
+const REPORT = __PAYLOAD__;
+const select = document.getElementById('combo-select');
+REPORT.charts.forEach(function (chart, i) {
+    const option = document.createElement('option');
+    option.value = i;
+    option.textContent = [chart.x, chart.y, chart.second_x, chart.second_y].filter(Boolean).join(' / ');
+    select.appendChild(option);
+});
+function render(i) {
+    const chart = REPORT.charts[i];
+    Plotly.react('share-graph', chart.share.data, chart.share.layout);
+    Plotly.react('reach-graph', chart.reach.data, chart.reach.layout);
+}
+select.addEventListener('change', function () { render(this.value); });
+if (REPORT.pie && REPORT.pie.data) {
+    Plotly.newPlot('pie-chart', REPORT.pie.data, REPORT.pie.layout);
+}
+if (REPORT.charts.length) {
+    render(0);
+}
+</script>
+</body>
+</html>
+"""
+
+
+def _option_values(options):
+    # 沒有選項的下拉選單以 None 代表（與 callback 收到的值一致）
+    return [option['value'] for option in options] or [None]
+
+
+def iter_combinations(snapshot, platforms=None):
+    # 依 update_comparison_options 定義的選項展開所有 (平台, 工作表, X, Y, 第二X, 第二Y)
+    for platform, sheets in (('FB', snapshot.fb_data), ('IG', snapshot.ig_data)):
+        if platforms and platform not in platforms:
+            continue
+        for sheet in sheets:
+            options = update_comparison_options(platform, sheet)
+            x_options, y_options = options[2], options[3]
+            second_x_options, second_y_options = options[6], options[9]
+            if not y_options:
+                continue
+            for x_axis in _option_values(x_options):
+                for y_axis in _option_values(y_options):
+                    for second_x_axis in _option_values(second_x_options):
+                        for second_y_axis in _option_values(second_y_options):
+                            yield (platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis)
+
+
+def render_combination(combination):
+    # 子程序透過 fork 繼承父程序已載入的快照，不需重新讀取 Excel
+    platform, sheet = combination[:2]
+    snapshot = get_snapshot()
+    try:
+        data = ChartData(snapshot.store, platform, sheet, version=snapshot.version)
+        share_fig, reach_fig = build_graphs(data, *combination)
+        return combination, share_fig.to_json(), reach_fig.to_json(), None
+    except Exception as e:
+        return combination, None, None, str(e)
+
+
+def _pool_context():
+    # 優先使用 fork，讓所有子程序共用同一份已載入的數據
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+def _render_all(combinations, workers):
+    if workers <= 1:
+        return [render_combination(combination) for combination in combinations]
+
+    chunksize = max(1, len(combinations) // (workers * 4))
+    with _pool_context().Pool(processes=workers) as pool:
+        return list(pool.imap_unordered(render_combination, combinations, chunksize=chunksize))
+
+
+def _write_bundle(output_dir, platform, sheet, report, formats):
+    account_dir = os.path.join(output_dir, platform)
+    os.makedirs(account_dir, exist_ok=True)
+    payload = json.dumps(report, ensure_ascii=False)
+    written = []
+
+    if 'json' in formats:
+        path = os.path.join(account_dir, f'{sheet}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        written.append(path)
+
+    if 'html' in formats:
+        platform_name = 'Facebook' if platform == 'FB' else 'Instagram'
+        html = (_HTML_TEMPLATE
+                .replace('__PLOTLYJS__', get_plotlyjs())
+                .replace('__TITLE__', f'{platform_name} - {sheet} 數據報表')
+                .replace('__VERSION__', str(report['data_version']))
+                .replace('__GENERATED__', report['generated_at'])
+                .replace('__PAYLOAD__', payload.replace('</', '<\\/')))
+        path = os.path.join(account_dir, f'{sheet}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        written.append(path)
+
+    return written
+
+
+def render_reports(output_dir='reports', workers=None, formats=('html', 'json'), platforms=None):
+    workers = workers or os.cpu_count() or 1
+    snapshot = get_snapshot()
+    combinations = list(iter_combinations(snapshot, platforms))
+
+    start = time.perf_counter()
+    results = _render_all(combinations, workers)
+    render_seconds = time.perf_counter() - start
+
+    # 依平台與工作表整理成報表，並保持選項原本的順序
+    order = {combination: i for i, combination in enumerate(combinations)}
+    results.sort(key=lambda result: order[result[0]])
+    generated_at = time.strftime('%Y-%m-%d %H:%M:%S')
+    reports = {}
+    errors = []
+    for combination, share_json, reach_json, error in results:
+        platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis = combination
+        if error is not None:
+            errors.append({'combination': combination, 'error': error})
+            continue
+        if (platform, sheet) not in reports:
+            reports[(platform, sheet)] = {
+                'platform': platform,
+                'sheet': sheet,
+                'data_version': snapshot.version,
+                'generated_at': generated_at,
+                'pie': json.loads(pio.to_json(build_pie_chart(snapshot, platform, sheet), validate=False)),
+                'charts': []
+            }
+        reports[(platform, sheet)]['charts'].append({
+            'x': x_axis,
+            'y': y_axis,
+            'second_x': second_x_axis,
+            'second_y': second_y_axis,
+            'share': json.loads(share_json),
+            'reach': json.loads(reach_json)
+        })
+
+    files = []
+    for (platform, sheet), report in reports.items():
+        files.extend(_write_bundle(output_dir, platform, sheet, report, formats))
+
+    return {
+        'data_version': snapshot.version,
+        'workers': workers,
+        'combinations': len(combinations),
+        'render_seconds': render_seconds,
+        'figures_per_second': 2 * len(combinations) / render_seconds if render_seconds else 0.0,
+        'errors': errors,
+        'files': files
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批次產生所有圖表組合的離線報表')
+    parser.add_argument('--output', default='reports', help='報表輸出資料夾')
+    parser.add_argument('--workers', type=int, default=None, help='平行程序數（預設為 CPU 核心數）')
+    parser.add_argument('--format', nargs='+', choices=['html', 'json'], default=['html', 'json'],
+                        dest='formats', help='輸出格式')
+    parser.add_argument('--platform', nargs='+', choices=['FB', 'IG'], default=None,
+                        dest='platforms', help='只產生指定平台的報表')
+    args = parser.parse_args()
+
+    summary = render_reports(args.output, args.workers, args.formats, args.platforms)
+    print(f"完成 {summary['combinations']} 組圖表（{summary['workers']} 個程序，"
+          f"{summary['render_seconds']:.2f} 秒），輸出 {len(summary['files'])} 個檔案")
+    for error in summary['errors']:
+        print(f"圖表生成錯誤: {error['combination']} {error['error']}")
+
+
+if __name__ == '__main__':
+    main()
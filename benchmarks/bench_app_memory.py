@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 整個儀錶板程序的記憶體與延遲：memory 與 sqlite 後端各在獨立子程序啟動應用，
+# 發布大量資料列後等待指標歷史記錄完成，再以 load_test 的虛擬使用者呼叫實際的 callback
+# （bench_storage.py 只量測後端本身的查詢）。指標歷史會在記憶體保留每篇貼文的最新數值，
+# 可用 --no-history 分開量測
+
+FINGERPRINT = 'bench-app'
+LINK_COLUMNS = ('永久連結', '發布網址')
+DATE_COLUMNS = ('發布日期', '張貼日期')
+# 每個工作表的資料列數相對於 --rows 的比例（與範例數據的比例相近）
+SHEET_SHARE = {'貼文': 1.0, '影片': 0.5, '限動': 0.2, '圖文': 1.0, '限時動態': 0.5}
+
+
+def _scale(df, rows, seed):
+    # 從範例工作表重複抽樣，網址加上編號、日期分散到五年內，每筆貼文都不同
+    rng = np.random.default_rng(seed)
+    out = df.sample(rows, replace=True, random_state=seed).reset_index(drop=True)
+    for col in out.columns:
+        if col in LINK_COLUMNS:
+            out[col] = out[col].astype(str) + '?p=' + pd.Series(np.arange(rows)).astype(str)
+        elif col in DATE_COLUMNS:
+            out[col] = pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 1826, rows), unit='D')
+        elif out[col].dtype.kind == 'i' and col not in ('編號', '發布時', '發布小時'):
+            out[col] = out[col] + rng.integers(0, 1000, rows)
+    return out
+
+
+def build_data(rows, seed):
+    import data_store
+    fb_data, ig_data = data_store.read_workbooks()
+    fb_data = {sheet: _scale(df, max(1, int(rows * SHEET_SHARE.get(sheet, 1.0))), seed + i)
+               for i, (sheet, df) in enumerate(fb_data.items())}
+    ig_data = {sheet: _scale(df, max(1, int(rows * SHEET_SHARE.get(sheet, 1.0))), seed + 10 + i)
+               for i, (sheet, df) in enumerate(ig_data.items())}
+    return fb_data, ig_data
+
+
+def _memory_status():
+    # VmHWM 為程序的峰值常駐記憶體，VmRSS 為目前的常駐記憶體（MB）
+    status = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('VmHWM', 'VmRSS'):
+                status[name] = int(value.split()[0]) / 1024
+    return status
+
+
+def _wait_history():
+    for thread in threading.enumerate():
+        if thread.name == 'metric-history':
+            thread.join()
+
+
+def child(backend, rows, seed, users, arrival_rate):
+    import data_store
+    import load_test
+    import social_data_dash as dashboard
+
+    _wait_history()
+    baseline = _memory_status()
+    start = time.perf_counter()
+    if backend == 'memory':
+        fb_data, ig_data = build_data(rows, seed)
+        data_store.publish_snapshot(fb_data, ig_data, fingerprint=FINGERPRINT)
+        del fb_data, ig_data
+    else:
+        # 資料庫已由父程序匯入（與先前啟動或上傳時匯入相同），這裡只發布欄位結構
+        data_store.publish_to_sqlite({}, {}, fingerprint=FINGERPRINT)
+    _wait_history()
+    publish_seconds = time.perf_counter() - start
+    published = _memory_status()
+
+    report = load_test.run_load_test(lambda: load_test.FlaskClientTransport(dashboard.server),
+                                     users=users, arrival_rate=arrival_rate, seed=seed)
+    served = _memory_status()
+    print(json.dumps({
+        'baseline_mb': baseline['VmRSS'],
+        'publish_seconds': publish_seconds,
+        'published_rss_mb': published['VmRSS'],
+        'served_rss_mb': served['VmRSS'],
+        'peak_mb': served['VmHWM'],
+        'errors': report['overall'].get('errors', 0),
+        'latency_ms': report['overall'].get('latency_ms', {}),
+        'callbacks': {name: result['latency_ms']['p95'] for name, result in report['callbacks'].items()}
+    }, ensure_ascii=False))
+
+
+def _run_child(backend, args, work_dir):
+    env = dict(os.environ, SOCIAL_DASH_STORAGE=backend, SOCIAL_DASH_WARMUP='0', SOCIAL_DASH_WATCH_INTERVAL='0',
+               SOCIAL_DASH_HISTORY='0' if args.no_history else '1',
+               SOCIAL_DASH_SQLITE_PATH=os.path.join(work_dir, 'social_data.sqlite'),
+               SOCIAL_DASH_CACHE_DIR=os.path.join(work_dir, f'cache-{backend}'),
+               SOCIAL_DASH_HISTORY_DIR=os.path.join(work_dir, f'history-{backend}'))
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', backend, '--rows', str(args.rows),
+                             '--seed', str(args.seed), '--users', str(args.users),
+                             '--arrival-rate', str(args.arrival_rate)],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_database(path, rows, seed):
+    # 在父程序匯入 SQLite（索引欄位與儀錶板相同），子程序只讀取
+    os.environ['SOCIAL_DASH_SQLITE_PATH'] = path
+    import data_store
+    fb_data, ig_data = build_data(rows, seed)
+    start = time.perf_counter()
+    data_store.get_sqlite_store().import_dataset(FINGERPRINT, fb_data, ig_data)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='儀錶板程序在兩種儲存後端下的記憶體與延遲')
+    parser.add_argument('--rows', type=int, default=1000000, help='貼文與圖文工作表的資料列數')
+    parser.add_argument('--backends', default='memory,sqlite')
+    parser.add_argument('--users', type=int, default=5, help='虛擬使用者數')
+    parser.add_argument('--arrival-rate', type=float, default=1.0, help='每秒新增的使用者數')
+    parser.add_argument('--no-history', action='store_true', help='關閉指標歷史記錄')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.rows, args.seed, args.users, args.arrival_rate)
+        return
+
+    backends = args.backends.split(',')
+    with tempfile.TemporaryDirectory() as work_dir:
+        if 'sqlite' in backends:
+            seconds = import_database(os.path.join(work_dir, 'social_data.sqlite'), args.rows, args.seed)
+            print(f"SQLite 匯入 {seconds:.1f} s")
+        results = {backend: _run_child(backend, args, work_dir) for backend in backends}
+
+    print(f"貼文/圖文各 {args.rows:,} 筆，{args.users} 位虛擬使用者，指標歷史{'關閉' if args.no_history else '開啟'}")
+    print(f"{'':<24}" + ''.join(f'{backend:>12}' for backend in backends))
+    rows = [('啟動後 RSS (MB)', 'baseline_mb', '.0f'), ('發布與歷史記錄 (s)', 'publish_seconds', '.1f'),
+            ('發布後 RSS (MB)', 'published_rss_mb', '.0f'), ('操作後 RSS (MB)', 'served_rss_mb', '.0f'),
+            ('程序峰值記憶體 (MB)', 'peak_mb', '.0f'), ('錯誤數', 'errors', 'd')]
+    for label, key, spec in rows:
+        print(f"{label:<24}" + ''.join(f"{format(results[b][key], spec):>12}" for b in backends))
+    for quantile in ('p50', 'p95', 'max'):
+        print(f"{'callback ' + quantile + ' (ms)':<24}"
+              + ''.join(f"{results[b]['latency_ms'].get(quantile, 0):>12.0f}" for b in backends))
+    for name in sorted(set().union(*(results[b]['callbacks'] for b in backends))):
+        print(f"  {name[:40]:<40}" + ''.join(f"{results[b]['callbacks'].get(name, 0):>10.0f}" for b in backends))
+
+
+if __name__ == '__main__':
+    main()
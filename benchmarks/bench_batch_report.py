@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_report import render_reports  # noqa: E402
+
+# 比較不同程序數下的批次報表產生速度
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    default_workers = sorted({1, 2, max(1, cpu_count // 2), cpu_count})
+    parser = argparse.ArgumentParser(description='批次報表多程序擴展性測試')
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers)
+    parser.add_argument('--platform', nargs='+', choices=['FB', 'IG'], default=None, dest='platforms')
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'程序數':>6} {'組合數':>6} {'秒數':>8} {'圖表/秒':>8} {'加速比':>6}")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as output_dir:
+            summary = render_reports(output_dir, workers, formats=('json',), platforms=args.platforms)
+        if baseline is None:
+            baseline = summary['render_seconds']
+        speedup = baseline / summary['render_seconds'] if summary['render_seconds'] else 0.0
+        print(f"{workers:>6} {summary['combinations']:>6} {summary['render_seconds']:>8.2f} "
+              f"{summary['figures_per_second']:>8.1f} {speedup:>6.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+import plotly.express as px  # noqa: E402
+from plotly.utils import PlotlyJSONEncoder  # noqa: E402
+
+from box_stats import box_figure  # noqa: E402
+from chart_data import ChartData  # noqa: E402
+from data_store import read_workbooks  # noqa: E402
+from storage import MemoryStore, short_labels  # noqa: E402
+
+# 比較 px.box（傳送所有原始數據）與伺服器端統計的箱型圖（與儀錶板相同經由 ChartData 分批計算）：建立時間與傳送大小
+
+
+def _measure(build):
+    start = time.perf_counter()
+    payload = json.dumps(build().to_plotly_json(), cls=PlotlyJSONEncoder)
+    return time.perf_counter() - start, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='箱型圖統計值測試')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--metric', default='總點擊次數')
+    args = parser.parse_args()
+
+    fb_data, _ = read_workbooks()
+    base = fb_data['貼文'].copy()
+    base['類別_簡稱'] = short_labels(base['類別'], 5)
+
+    print(f"{'筆數':>9} {'px.box 秒':>10} {'px.box bytes':>13} {'統計 秒':>8} {'統計 bytes':>11}")
+    for scale in args.scales:
+        df = pd.concat([base] * scale, ignore_index=True)
+        px_seconds, px_bytes = _measure(lambda: px.box(df, x='類別_簡稱', y=args.metric, color='類別_簡稱'))
+        data = ChartData(MemoryStore({'貼文': df}, {}), 'FB', '貼文')
+        stats_seconds, stats_bytes = _measure(lambda: box_figure(*data.box_stats('類別', args.metric),
+                                                                 args.metric, args.metric))
+        print(f"{len(df):>9} {px_seconds:>10.3f} {px_bytes:>13} {stats_seconds:>8.3f} {stats_bytes:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 比較重啟後第一次請求的延遲：不預熱、首次預熱（需計算）、由磁碟快取載入
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def child():
+    # 在全新程序中量測各預設組合第一次請求的耗時
+    start = time.perf_counter()
+    import social_data_dash as dashboard
+    import_seconds = time.perf_counter() - start
+    dashboard.wait_for_warmup(timeout=600)
+    ready_seconds = time.perf_counter() - start
+
+    snapshot = dashboard.get_snapshot()
+    latencies = []
+    for platform, sheets in (('FB', snapshot.fb_data), ('IG', snapshot.ig_data)):
+        for sheet in sheets:
+            options = dashboard.update_comparison_options(platform, sheet)
+            t = time.perf_counter()
+            dashboard.update_pie_chart(platform, sheet)
+            dashboard.update_graphs_and_table(platform, sheet, options[1], options[4], options[7], options[10])
+            latencies.append(time.perf_counter() - t)
+
+    print(json.dumps({'import_seconds': import_seconds, 'ready_seconds': ready_seconds, 'latencies': latencies}))
+
+
+def _run(cache_dir, warmup):
+    env = dict(os.environ, SOCIAL_DASH_CACHE_DIR=cache_dir, SOCIAL_DASH_WARMUP='1' if warmup else '0',
+               SOCIAL_DASH_WATCH_INTERVAL='0', PYTHONWARNINGS='ignore')
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], env=env, cwd=ROOT,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='啟動預熱與磁碟快取測試')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        runs = (('不預熱', False), ('預熱（計算）', True), ('預熱（磁碟）', True))
+        for name, warmup in runs:
+            result = _run(cache_dir, warmup)
+            latencies = [1000 * value for value in result['latencies']]
+            print(f"{name:<8} 可服務 {result['ready_seconds']:6.2f} s  "
+                  f"首次請求 p50 {_percentile(latencies, 50):8.2f} ms  p99 {_percentile(latencies, 99):8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
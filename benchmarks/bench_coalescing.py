@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SOCIAL_DASH_WARMUP', '0')
+os.environ.setdefault('SOCIAL_DASH_WATCH_INTERVAL', '0')
+
+import social_data_dash as dashboard  # noqa: E402
+
+# 同時送出多個相同的圖表請求（例如會議開始時大家打開預設畫面），比較有無合併請求的 CPU 與延遲
+
+DEFAULT_INPUTS = ('FB', '貼文', '發布日期', '留言', '類別', '總點擊次數')
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def _burst(requests, handler):
+    barrier = threading.Barrier(requests)
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        start = time.perf_counter()
+        handler()
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(requests)]
+    cpu_start = time.process_time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.process_time() - cpu_start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='相同請求合併測試')
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    # 先建立一次其他組合的圖表，排除 plotly 首次載入的成本
+    dashboard.update_graphs_and_table('FB', '貼文', '類別', '觸及人數', '心情', '留言')
+    snapshot = dashboard.get_snapshot()
+
+    def uncoalesced():
+        dashboard.compute_graphs_and_table(snapshot, *DEFAULT_INPUTS)
+
+    def coalesced():
+        dashboard.update_graphs_and_table(*DEFAULT_INPUTS)
+
+    for name, handler in (('無合併', uncoalesced), ('合併', coalesced)):
+        dashboard._graph_cache.clear()
+        before = dashboard._graph_cache.stats()
+        cpu, latencies = _burst(args.requests, handler)
+        after = dashboard._graph_cache.stats()
+        latencies = [1000 * value for value in latencies]
+        print(f"{name:<4} CPU {cpu:6.2f} s  p50 {_percentile(latencies, 50):8.1f} ms  "
+              f"p99 {_percentile(latencies, 99):8.1f} ms  計算 {after['misses'] - before['misses']:3d}  "
+              f"合併 {after['coalesced'] - before['coalesced']:3d}")
+
+
+if __name__ == '__main__':
+    main()
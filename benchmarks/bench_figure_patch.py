@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SOCIAL_DASH_WARMUP', '0')
+os.environ.setdefault('SOCIAL_DASH_WATCH_INTERVAL', '0')
+
+import social_data_dash as dashboard  # noqa: E402
+
+# 切換 Y 軸指標時，比較整張圖重送與部分更新（Patch）的回應大小與伺服器處理時間
+
+Y_DROPDOWNS = ((3, 'y-axis-dropdown'), (5, 'second-y-axis-dropdown'))
+
+
+def _graph_callback(client):
+    dependencies = json.loads(client.get('/_dash-dependencies').data)
+    return next(item for item in dependencies if 'graph-inputs-store.data' in item['output'])
+
+
+def _post(client, spec, values, changed, store):
+    outputs = [dict(zip(('id', 'property'), item.rsplit('.', 1))) for item in spec['output'][2:-2].split('...')]
+    payload = {
+        'output': spec['output'],
+        'outputs': outputs,
+        'inputs': [{'id': item['id'], 'property': item['property'], 'value': value}
+                   for item, value in zip(spec['inputs'], values)],
+        'changedPropIds': [f'{changed}.value'],
+        'state': [{'id': 'graph-inputs-store', 'property': 'data', 'value': store}]
+    }
+    start = time.perf_counter()
+    response = client.post('/_dash-update-component', json=payload)
+    return time.perf_counter() - start, response.data
+
+
+def main():
+    client = dashboard.server.test_client()
+    spec = _graph_callback(client)
+    snapshot = dashboard.get_snapshot()
+
+    totals = {'full': [0, 0.0], 'patch': [0, 0.0]}
+    print(f"{'工作表':<14}{'下拉選單':<24}{'切換次數':>8}{'整張 (KB)':>12}{'部分更新 (KB)':>16}")
+    for platform, sheets in (('FB', snapshot.fb_data), ('IG', snapshot.ig_data)):
+        for sheet in sheets:
+            options = dashboard.update_comparison_options(platform, sheet)
+            values = [platform, sheet, options[1], options[4], options[7], options[10]]
+            for index, component in Y_DROPDOWNS:
+                choices = [option['value'] for option in options[(index - 2) * 3] if option['value'] != values[index]]
+                if values[index] is None or not choices:
+                    continue
+                # 先建立所有組合的圖表，只比較傳送與序列化的成本
+                _post(client, spec, values, component, None)
+                full_bytes = patch_bytes = 0
+                for choice in choices:
+                    changed = list(values)
+                    changed[index] = choice
+                    _post(client, spec, changed, component, None)
+                    store = {'version': snapshot.version, 'inputs': values}
+                    for mode, state in (('full', None), ('patch', store)):
+                        seconds, body = _post(client, spec, changed, component, state)
+                        totals[mode][0] += len(body)
+                        totals[mode][1] += seconds
+                        if mode == 'full':
+                            full_bytes += len(body)
+                        else:
+                            patch_bytes += len(body)
+                print(f"{platform + '/' + sheet:<14}{component:<24}{len(choices):>8}"
+                      f"{full_bytes / 1024:>12.1f}{patch_bytes / 1024:>16.1f}")
+
+    for mode, (size, seconds) in totals.items():
+        print(f"{mode:<6} 總大小 {size / 1024:10.1f} KB  伺服器時間 {1000 * seconds:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metric_history import MetricHistory, post_keys  # noqa: E402
+
+# 模擬多次匯出：每次新增貼文、近期貼文的指標持續成長，比較歷史區段與「保留每份完整數據」的大小與查詢速度
+
+METRICS = ['觸及人數', '總點擊次數', '連結點擊次數', '心情', '留言', '分享']
+
+
+def _exports(posts, exports, new_per_export, seed):
+    rng = np.random.default_rng(seed)
+    total = posts + new_per_export * exports
+    base = pd.DataFrame({
+        '類別': rng.choice(['【知識典故】', '【問與答】', '【活動】', '【新聞】'], total),
+        '發布日期': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(total) // 5, unit='D'),
+        '發布時間': [f'{h:02d}:{m:02d}' for h, m in zip(rng.integers(0, 24, total), rng.integers(0, 60, total))],
+        '永久連結': [f'https://www.facebook.com/post/{i}' for i in range(total)],
+    })
+    values = rng.integers(0, 1000, size=(total, len(METRICS))).astype(float)
+
+    for export in range(exports):
+        count = posts + new_per_export * export
+        # 只有最近發布的貼文（最後 10%）數字還在成長
+        recent = np.arange(int(count * 0.9), count)
+        values[recent] += rng.integers(0, 50, size=(len(recent), len(METRICS)))
+        df = base.iloc[:count].copy()
+        for i, metric in enumerate(METRICS):
+            df[metric] = values[:count, i].astype(np.int64)
+        yield df
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='指標歷史儲存測試')
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--exports', type=int, default=30)
+    parser.add_argument('--new-per-export', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as history_dir, tempfile.TemporaryDirectory() as full_dir:
+        history = MetricHistory(history_dir)
+        record_seconds = 0.0
+        for export, df in enumerate(_exports(args.posts, args.exports, args.new_per_export, args.seed)):
+            with open(os.path.join(full_dir, f'{export:06d}.pkl'), 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+            start = time.perf_counter()
+            history.record({'貼文': df}, {}, fingerprint=str(export), exported_at=1.7e9 + export * 86400)
+            record_seconds += time.perf_counter() - start
+        last = df
+
+        print(f"{args.exports} 次匯出，最後一次 {len(last)} 筆貼文")
+        print(f"完整保存: {_dir_size(full_dir) / 1e6:8.2f} MB")
+        print(f"歷史區段: {_dir_size(history_dir) / 1e6:8.2f} MB  平均記錄時間 "
+              f"{1000 * record_seconds / args.exports:.1f} ms")
+
+        start = time.perf_counter()
+        reopened = MetricHistory(history_dir)
+        reopened.refresh()
+        print(f"重新開啟（重播全部區段並建立索引）: {1000 * (time.perf_counter() - start):.1f} ms")
+
+        middle = args.exports // 2
+        start = time.perf_counter()
+        frame = reopened.as_of('FB', '貼文', middle)
+        print(f"as_of 第 {middle} 次匯出（{len(frame)} 筆）: {1000 * (time.perf_counter() - start):.1f} ms")
+
+        key = post_keys(last, 'FB')[int(args.posts * 0.95)]
+        start = time.perf_counter()
+        curve = reopened.growth('FB', '貼文', key, '觸及人數')
+        index_seconds = time.perf_counter() - start
+
+        # 對照：逐一讀取每份完整數據找出該貼文
+        start = time.perf_counter()
+        scanned = []
+        for export in range(args.exports):
+            with open(os.path.join(full_dir, f'{export:06d}.pkl'), 'rb') as f:
+                df = pickle.load(f)
+            match = df[np.array(post_keys(df, 'FB')) == key]
+            if len(match):
+                scanned.append(int(match['觸及人數'].iloc[0]))
+        scan_seconds = time.perf_counter() - start
+        assert scanned == curve['觸及人數'].astype(int).tolist()
+        print(f"成長曲線（{len(curve)} 點）: 索引 {1000 * index_seconds:.2f} ms  逐份掃描 {1000 * scan_seconds:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics_api  # noqa: E402
+from social_data_dash import server  # noqa: E402
+
+# 模擬其他服務輪詢 API：比較首次計算、伺服器端快取與 If-None-Match 304 的成本
+
+URLS = [
+    '/api/v1/FB/貼文/aggregate?by=類別',
+    '/api/v1/FB/貼文/aggregate?by=發布時&agg=sum',
+    '/api/v1/IG/圖文/aggregate?by=發布小時&agg=sum',
+    '/api/v1/FB/貼文/rows?limit=100',
+    '/api/v1/IG/圖文/schema',
+]
+
+
+def _poll(client, rounds, etags=None, clear_cache=False):
+    total_bytes = 0
+    statuses = {}
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(rounds):
+        for url in URLS:
+            if clear_cache:
+                metrics_api._body_cache.clear()
+            headers = {'If-None-Match': etags[url]} if etags else {}
+            response = client.get(url, headers=headers)
+            total_bytes += len(response.data)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    requests = rounds * len(URLS)
+    return {
+        'cpu_ms_per_request': 1000 * (time.process_time() - cpu_start) / requests,
+        'wall_ms_per_request': 1000 * (time.perf_counter() - wall_start) / requests,
+        'bytes_per_request': total_bytes / requests,
+        'statuses': statuses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='metrics API 輪詢負載測試')
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    client = server.test_client()
+    etags = {url: client.get(url).headers['ETag'] for url in URLS}
+
+    for name, kwargs in (('無快取', {'clear_cache': True}),
+                         ('伺服器快取', {}),
+                         ('If-None-Match', {'etags': etags})):
+        result = _poll(client, args.rounds, **kwargs)
+        print(f"{name:<14} CPU {result['cpu_ms_per_request']:7.3f} ms/req  "
+              f"耗時 {result['wall_ms_per_request']:7.3f} ms/req  "
+              f"{result['bytes_per_request']:9.1f} bytes/req  {result['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import openpyxl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SOCIAL_DASH_WARMUP', '0')
+os.environ.setdefault('SOCIAL_DASH_HISTORY', '0')
+os.environ.setdefault('SOCIAL_DASH_WATCH_INTERVAL', '0')
+os.environ.setdefault('SOCIAL_DASH_CACHE_DIR', tempfile.mkdtemp(prefix='bench-reload-'))
+
+import data_store  # noqa: E402
+import social_data_dash as dashboard  # noqa: E402
+
+# 檔案更新後的重新載入期間請求延遲的變化：解析 Excel 在子程序進行（--in-process 為改版前在服務程序執行緒內解析）
+
+URLS = [
+    '/api/v1/FB/貼文/aggregate?by=類別',
+    '/api/v1/FB/貼文/rows?limit=100',
+    '/api/v1/IG/圖文/aggregate?by=發布小時&agg=sum',
+]
+
+
+def _variants(work_dir):
+    # 兩組內容不同（其中一個活頁簿重新存檔）的檔案，輪流載入時解析快取都不會命中
+    variants = []
+    for i, resaved in enumerate((data_store.FB_PATH, data_store.IG_PATH)):
+        paths = []
+        for source in (data_store.FB_PATH, data_store.IG_PATH):
+            path = os.path.join(work_dir, f'{i}-{os.path.basename(source)}')
+            if source == resaved:
+                openpyxl.load_workbook(source).save(path)
+            else:
+                shutil.copy(source, path)
+            paths.append(path)
+        variants.append(tuple(paths))
+    return variants
+
+
+def _reload_loop(stop, counter, variants, in_process):
+    while not stop.is_set():
+        fb_path, ig_path = variants[counter[0] % len(variants)]
+        if in_process:
+            fb_data, ig_data = data_store.read_workbooks(fb_path, ig_path)
+            data_store.publish_snapshot(fb_data, ig_data, source=('bench', counter[0]),
+                                        fingerprint=f'bench-{counter[0]}')
+        elif data_store.reload_data(fb_path, ig_path) is None:
+            raise RuntimeError('重新載入失敗')
+        counter[0] += 1
+
+
+def _measure(client, seconds):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for url in URLS:
+            start = time.perf_counter()
+            client.get(url)
+            latencies.append(1000 * (time.perf_counter() - start))
+    return np.array(latencies)
+
+
+def _summary(name, latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return (f"{name:<10}{len(latencies):>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}"
+            f"{latencies.max():>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重新載入期間的請求延遲')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--in-process', action='store_true', help='在服務程序的執行緒內解析（改版前的做法）')
+    args = parser.parse_args()
+
+    client = dashboard.server.test_client()
+    for url in URLS:
+        client.get(url)
+
+    start = time.perf_counter()
+    data_store.read_workbooks()
+    parse_ms = 1000 * (time.perf_counter() - start)
+
+    idle = _measure(client, args.seconds)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stop = threading.Event()
+        counter = [0]
+        reloader = threading.Thread(target=_reload_loop, args=(stop, counter, _variants(work_dir), args.in_process),
+                                    daemon=True)
+        reloader.start()
+        busy = _measure(client, args.seconds)
+        stop.set()
+        reloader.join()
+
+    mode = '服務程序內' if args.in_process else '子程序'
+    print(f"單次解析 {parse_ms:.0f} ms，量測期間在{mode}重新載入 {counter[0]} 次")
+    print(f"{'':<10}{'請求數':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    print(_summary('閒置', idle))
+    print(_summary('重新載入中', busy))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 量測冷啟動到第一個請求完成的時間（time-to-first-request），並列出各啟動階段耗時
+
+
+def child():
+    start = time.perf_counter()
+    import social_data_dash as dashboard
+    imported = time.perf_counter() - start
+
+    client = dashboard.server.test_client()
+    client.get('/')
+    page = time.perf_counter() - start
+    dashboard.update_graphs_and_table('FB', '貼文', '發布日期', '留言', '類別', '總點擊次數')
+    first_figure = time.perf_counter() - start
+
+    print(json.dumps({
+        'import_seconds': imported,
+        'first_page_seconds': page,
+        'first_figure_seconds': first_figure,
+        'phases': dashboard.startup_timings()
+    }, ensure_ascii=False))
+
+
+def _run(cache_dir):
+    env = dict(os.environ, SOCIAL_DASH_CACHE_DIR=cache_dir, SOCIAL_DASH_WARMUP='0',
+               SOCIAL_DASH_WATCH_INTERVAL='0', PYTHONWARNINGS='ignore')
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], env=env, cwd=ROOT,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='啟動時間測試')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    # 第一次以空的快取資料夾啟動，之後的啟動直接使用第一次寫入的數據快取
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in ['無數據快取'] + ['有數據快取'] * args.repeat:
+            result = _run(cache_dir)
+            phases = '  '.join(f'{phase} {1000 * seconds:.0f}' for phase, seconds in result['phases'])
+            print(f"{name}  匯入 {1000 * result['import_seconds']:6.0f} ms  "
+                  f"首頁 {1000 * result['first_page_seconds']:6.0f} ms  "
+                  f"首張圖 {1000 * result['first_figure_seconds']:6.0f} ms  [{phases}]")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import MemoryStore, SqliteStore  # noqa: E402
+
+# 比較 memory 與 sqlite 後端在大量資料列下的查詢延遲與程序記憶體（每種組合在獨立子程序量測）
+
+CATEGORIES = ['【知識典故】', '【問與答】', '【好話分享】', '【公司實績】', '【好評分享】', '【書籍知識】',
+              '【自說自話】', '【分享好文】', '【教育資訊】', '【服務須知】', '【服務資訊】', '【贊助資訊】']
+METRICS = ['觸及人數', '心情', '留言', '分享', '總點擊次數']
+INDEX_COLUMNS = {'FB': ('發布日期', '類別', '發布時')}
+FINGERPRINT = 'bench'
+CHUNK = 500000
+
+
+def _chunk(start, size, seed):
+    rng = np.random.default_rng(seed + start)
+    df = pd.DataFrame({
+        '編號': np.arange(start, start + size),
+        '類別': np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), size)],
+        '發布日期': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, size), unit='D'),
+        '發布時': rng.integers(0, 24, size),
+    })
+    for metric in METRICS:
+        df[metric] = rng.integers(0, 20000, size)
+    return df
+
+
+def _chunks(rows, seed):
+    for start in range(0, rows, CHUNK):
+        yield _chunk(start, min(CHUNK, rows - start), seed)
+
+
+def build_database(path, rows, seed):
+    store = SqliteStore(path, INDEX_COLUMNS)
+    if store.has_dataset(FINGERPRINT):
+        return 0.0
+    start = time.perf_counter()
+    chunks = _chunks(rows, seed)
+    store.import_dataset(FINGERPRINT, {'貼文': next(chunks)}, {})
+    for chunk in chunks:
+        store.append_rows(FINGERPRINT, 'FB', '貼文', chunk)
+    store.analyze()
+    return time.perf_counter() - start
+
+
+def _queries(rows):
+    # 與儀錶板相同的操作：圓餅圖、依小時彙總、日期區間篩選、表格深層分頁、條件分頁
+    recent = [('發布日期', '>=', pd.Timestamp('2024-12-01'))]
+    category = [('類別', 'in', ['【問與答】'])]
+    return {
+        '圓餅圖（類別計數）': lambda s: s.value_counts('FB', '貼文', '類別'),
+        '依發布小時加總': lambda s: s.aggregate('FB', '貼文', '發布時', 'sum', ['觸及人數'], recent),
+        '近一個月圖表欄位': lambda s: s.frame('FB', '貼文', ['發布日期', '觸及人數'], recent),
+        '表格中間頁': lambda s: s.page('FB', '貼文', rows // 2, 100),
+        '類別篩選分頁': lambda s: s.page('FB', '貼文', 1000, 100, None, category),
+    }
+
+
+def child(backend, rows, db, seed, repeat):
+    start = time.perf_counter()
+    if backend == 'memory':
+        df = pd.concat(list(_chunks(rows, seed)), ignore_index=True)
+        store = MemoryStore({'貼文': df}, {})
+    else:
+        store = SqliteStore(db, INDEX_COLUMNS).dataset(FINGERPRINT)
+    load_seconds = time.perf_counter() - start
+
+    latencies = {}
+    for name, query in _queries(rows).items():
+        samples = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            query(store)
+            samples.append(time.perf_counter() - t)
+        latencies[name] = 1000 * min(samples)
+
+    # ru_maxrss 在 Linux 以 KB 為單位
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'load_seconds': load_seconds, 'peak_mb': peak_mb, 'latency_ms': latencies}))
+
+
+def _run_child(backend, rows, db, seed, repeat):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', backend, '--rows', str(rows),
+                             '--db', db, '--seed', str(seed), '--repeat', str(repeat)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='儲存後端比較')
+    parser.add_argument('--rows', default='100000,10000000', help='以逗號分隔的資料列數')
+    parser.add_argument('--backends', default='memory,sqlite')
+    parser.add_argument('--db-dir', default=None, help='保留資料庫檔的目錄（預設為暫存目錄）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--child', default=None)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, int(args.rows), args.db, args.seed, args.repeat)
+        return
+
+    backends = args.backends.split(',')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_dir = args.db_dir or tmp_dir
+        for rows in [int(value) for value in args.rows.split(',')]:
+            db = os.path.join(db_dir, f'bench_{rows}.sqlite')
+            if 'sqlite' in backends:
+                seconds = build_database(db, rows, args.seed)
+                print(f"\n{rows:,} 筆：SQLite 匯入 {seconds:.1f} s，檔案 {os.path.getsize(db) / 1e6:.0f} MB")
+            else:
+                print(f"\n{rows:,} 筆")
+
+            results = {backend: _run_child(backend, rows, db, args.seed, args.repeat) for backend in backends}
+            print(f"{'':<20}" + ''.join(f'{backend:>14}' for backend in backends))
+            print(f"{'載入 (s)':<20}" + ''.join(f"{results[b]['load_seconds']:>14.2f}" for b in backends))
+            print(f"{'程序峰值記憶體 (MB)':<20}" + ''.join(f"{results[b]['peak_mb']:>14.0f}" for b in backends))
+            for name in _queries(rows):
+                print(f"{name + ' (ms)':<20}" + ''.join(f"{results[b]['latency_ms'][name]:>14.1f}" for b in backends))
+
+
+if __name__ == '__main__':
+    main()
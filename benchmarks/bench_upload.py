@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 解析結果寫到暫存的快取目錄，不影響正式的解析快取（子程序沿用同一個環境變數）
+_cache_dir = tempfile.TemporaryDirectory()
+os.environ['SOCIAL_DASH_CACHE_DIR'] = _cache_dir.name
+
+from data_store import ig_column_mapping, numeric_cols  # noqa: E402
+from upload import UPLOAD_MEMORY_MB, UPLOAD_TIMEOUT, run_worker  # noqa: E402
+
+# 產生不同大小的 FB/IG 活頁簿，量測上傳解析子程序的吞吐量與峰值記憶體
+
+CATEGORIES = ['【知識典故】', '【問與答】', '【好話分享】', '【公司實績】', '【好評分享】', '【書籍知識】']
+
+
+def _sheet(rows, columns, numeric, date_column, category_column, rng):
+    df = pd.DataFrame({date_column: pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1800, rows), unit='D')})
+    for col in columns:
+        if col in numeric:
+            df[col] = rng.integers(0, 20000, rows)
+        elif col == category_column:
+            df[col] = np.array(CATEGORIES, dtype=object)[rng.integers(0, len(CATEGORIES), rows)]
+        elif col not in df.columns:
+            df[col] = [f'{h:02d}:{m:02d}' for h, m in zip(rng.integers(0, 24, rows), rng.integers(0, 60, rows))]
+    return df
+
+
+def write_workbooks(directory, rows, seed):
+    # 主要工作表 rows 筆，其餘工作表四分之一
+    rng = np.random.default_rng(seed)
+    fb_sheets = {sheet: _sheet(rows if sheet == '貼文' else rows // 4, ['類別', '發布時間', '發布時'] + cols,
+                               cols, '發布日期', '類別', rng)
+                 for sheet, cols in numeric_cols['FB'].items()}
+    ig_sheets = {}
+    for sheet, mapping in ig_column_mapping.items():
+        cols = list(mapping.values()) + [c for c in numeric_cols['IG'].get(sheet, []) if c not in mapping.values()]
+        ig_sheets[sheet] = _sheet(rows if sheet == '圖文' else rows // 4, cols,
+                                  numeric_cols['IG'].get(sheet, []), '張貼日期', '分類', rng)
+
+    paths = []
+    for name, sheets in (('FB.xlsx', fb_sheets), ('IG.xlsx', ig_sheets)):
+        path = os.path.join(directory, name)
+        with pd.ExcelWriter(path) as writer:
+            for sheet, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet, index=False)
+        paths.append((path, name))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='活頁簿上傳解析測試')
+    parser.add_argument('--rows', default='10000,50000,200000', help='以逗號分隔的主要工作表筆數')
+    parser.add_argument('--memory-mb', type=int, default=UPLOAD_MEMORY_MB)
+    parser.add_argument('--timeout', type=float, default=UPLOAD_TIMEOUT)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"記憶體上限 {args.memory_mb} MB，時間上限 {args.timeout:g} 秒")
+    print(f"{'筆數':>10}{'檔案 (MB)':>12}{'總資料列':>10}{'解析 (s)':>10}{'含啟動 (s)':>12}"
+          f"{'列/秒':>10}{'MB/秒':>8}{'峰值 (MB)':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in [int(value) for value in args.rows.split(',')]:
+            files = write_workbooks(tmp_dir, rows, args.seed)
+            size_mb = sum(os.path.getsize(path) for path, _ in files) / 1e6
+
+            start = time.perf_counter()
+            result = run_worker(files, timeout=args.timeout, memory_mb=args.memory_mb)
+            wall = time.perf_counter() - start
+            if result.get('errors'):
+                print(f"{rows:>10,}{size_mb:>12.1f}  失敗：{'；'.join(result['errors'])}")
+                continue
+            total = sum(result['rows'].values())
+            print(f"{rows:>10,}{size_mb:>12.1f}{total:>10,}{result['seconds']:>10.1f}{wall:>12.1f}"
+                  f"{total / result['seconds']:>10,.0f}{size_mb / result['seconds']:>8.2f}{result['peak_mb']:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import qualitative
+
+from data_store import VersionedCache
+from storage import short_labels
+
+# 箱型圖：在伺服器端算好每個類別的四分位數與鬚線，只傳統計值與少量離群點給前端
+
+# 每個類別最多傳送的離群點數
+MAX_OUTLIERS = 50
+
+_stats_cache = VersionedCache(maxsize=64, name='box_stats')
+
+
+def _quantile(values, p):
+    # 與 plotly.js 的 linear 四分位數算法相同（位置為 p * n - 0.5）
+    position = p * len(values) - 0.5
+    if position <= 0:
+        return float(values[0])
+    if position >= len(values) - 1:
+        return float(values[-1])
+    lower = int(np.floor(position))
+    fraction = position - lower
+    return float((1 - fraction) * values[lower] + fraction * values[lower + 1])
+
+
+def _sample(values, limit):
+    # 離群點過多時等距抽樣，保留最小與最大值
+    if len(values) <= limit:
+        return values
+    return values[np.unique(np.linspace(0, len(values) - 1, limit).round().astype(int))]
+
+
+def chunked_box_stats(chunks, x, y, prefix=None, max_outliers=MAX_OUTLIERS):
+    # 分批讀取（類別, 數值），只累積類別編號與數值陣列，不需一次取出整個工作表
+    # prefix 為類別轉為字串後只取前幾個字（類別簡稱）
+    positions = {}
+    codes, numbers = [], []
+    for chunk in chunks:
+        keys = short_labels(chunk[x], prefix) if prefix else chunk[x]
+        chunk_codes, uniques = pd.factorize(keys, sort=False)
+        # 最後一格對應空值（編號 -1）
+        mapping = np.array([positions.setdefault(key, len(positions)) for key in uniques] + [-1], dtype=np.int32)
+        codes.append(mapping[chunk_codes])
+        numbers.append(pd.to_numeric(chunk[y], errors='coerce').to_numpy(dtype=float))
+    if not codes:
+        return []
+    return _box_stats(np.concatenate(codes), np.concatenate(numbers), list(positions), max_outliers)
+
+
+def _box_stats(codes, numbers, uniques, max_outliers):
+    # 一次排序（類別, 數值）後依類別切段計算，類別依第一次出現的順序排列
+    keep = (codes >= 0) & ~np.isnan(numbers)
+    codes, numbers = codes[keep], numbers[keep]
+    order = np.lexsort((numbers, codes))
+    codes, numbers = codes[order], numbers[order]
+    bounds = np.searchsorted(codes, np.arange(len(uniques) + 1))
+
+    stats = []
+    for i, category in enumerate(uniques):
+        segment = numbers[bounds[i]:bounds[i + 1]]
+        if not len(segment):
+            stats.append({'category': category, 'count': 0})
+            continue
+
+        q1, median, q3 = _quantile(segment, 0.25), _quantile(segment, 0.5), _quantile(segment, 0.75)
+        iqr = q3 - q1
+        # 鬚線為 1.5 倍四分位距內最遠的數據點（與 plotly.js 相同）
+        low = np.searchsorted(segment, q1 - 1.5 * iqr, side='left')
+        high = np.searchsorted(segment, q3 + 1.5 * iqr, side='right') - 1
+        lowerfence = min(q1, float(segment[min(low, len(segment) - 1)]))
+        upperfence = max(q3, float(segment[max(high, 0)]))
+        outliers = np.concatenate([
+            segment[:np.searchsorted(segment, lowerfence, side='left')],
+            segment[np.searchsorted(segment, upperfence, side='right'):]
+        ])
+
+        stats.append({
+            'category': category,
+            'count': len(segment),
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': lowerfence,
+            'upperfence': upperfence,
+            'mean': float(segment.mean()),
+            'outliers': _sample(outliers, max_outliers).tolist()
+        })
+    return stats
+
+
+def store_box_stats(store, platform, sheet, x, y, prefix=None, version=None):
+    # 直接從數據後端分批讀取兩個欄位計算
+    def compute():
+        return chunked_box_stats(store.iter_chunks(platform, sheet, columns=[x, y]), x, y, prefix)
+
+    if version is None:
+        return compute()
+    return _stats_cache.get_or_compute(version, (platform, sheet, x, y, prefix), compute)
+
+
+def box_figure(stats, x, y, title):
+    # 版面與 px.box(df, x=x, y=y, color=x) 相同，每個類別一個箱型與一組離群點
+    # 與 px 相同，顏色取自預設樣板的 colorway
+    colors = pio.templates[pio.templates.default].layout.colorway or qualitative.Plotly
+    hovertemplate = f'{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>'
+
+    fig = go.Figure()
+    for i, item in enumerate(stats):
+        category = item['category']
+        color = colors[i % len(colors)]
+        common = dict(name=category, legendgroup=category, marker={'color': color}, hovertemplate=hovertemplate,
+                      xaxis='x', yaxis='y')
+        # 平均值只留在快取的統計值：傳入 mean 時 plotly 會預設畫出 px.box 沒有的平均線
+        if item['count']:
+            box = dict(x=[category], q1=[item['q1']], median=[item['median']], q3=[item['q3']],
+                       lowerfence=[item['lowerfence']], upperfence=[item['upperfence']])
+        else:
+            box = dict(x=[])
+        fig.add_trace(go.Box(alignmentgroup='True', offsetgroup=category, orientation='v', notched=False,
+                             showlegend=True, x0=' ', y0=' ', **box, **common))
+        if item['count'] and item['outliers']:
+            fig.add_trace(go.Scatter(x=[category] * len(item['outliers']), y=item['outliers'], mode='markers',
+                                     showlegend=False, **common))
+
+    fig.update_layout(
+        title={'text': title},
+        xaxis={'anchor': 'y', 'domain': [0.0, 1.0], 'title': {'text': x}, 'categoryorder': 'array',
+               'categoryarray': [item['category'] for item in stats]},
+        yaxis={'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': y}},
+        legend={'title': {'text': x}, 'tracegroupgap': 0},
+        boxmode='overlay'
+    )
+    return fig
@@ -0,0 +1,141 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from box_stats import store_box_stats
+
+# 圖表數據：長條圖、直方圖、熱力圖與箱型圖的彙總交給後端（SQLite 時在 SQL 內完成），
+# plotly 只收到每個類別或分箱一筆；散佈圖與折線圖需要每一筆資料，只取出用到的兩個欄位
+
+# 類別簡稱取前幾個字（表格中的簡稱欄位相同）
+SHORT_NAME_LENGTH = 5
+
+
+def _round_up(value, choices, reverse=False):
+    # 與 plotly.js 的 Lib.roundUp 相同：reverse 時取不大於 value 的最大值，否則取大於 value 的最小值
+    low, high = 0, len(choices) - 1
+    rounded = math.ceil if reverse else math.floor
+    for _ in range(100):
+        if low >= high:
+            break
+        mid = rounded((low + high) / 2)
+        if choices[mid] <= value:
+            low = mid if reverse else mid + 1
+        else:
+            high = mid - 1 if reverse else mid
+    return choices[low]
+
+
+def _js_length(value):
+    return len(np.format_float_positional(value, trim='-'))
+
+
+def _increment(value, step):
+    # 與 plotly.js 的 Lib.increment 相同：相加後位數過多時四捨五入到 12 位有效數字
+    if not step:
+        return value
+    inverse = 1 / abs(step)
+    result = (inverse * value + inverse * step) / inverse if inverse > 1 else value + step
+    if _js_length(result) > 16 and _js_length(result) >= _js_length(value) + _js_length(step) \
+            and abs(result) < 1e12:
+        result = float(f'{result:.12g}')
+    return result
+
+
+def _near_edge(value, start, size):
+    # plotly.js 判斷數值是否位於分箱邊界 1% 內的算式
+    return math.fmod(1 + 100 * (value - start) / size, 100) < 2
+
+
+def autobin(summary, is2d=False):
+    # 依 plotly.js 的 Axes.autoBin 決定數值軸的分箱大小與起點（尚未做邊界位移），summary 為後端的 summary()
+    # 對照 plotly.py 5.18 內附的 plotly.js 2.27.0（histogram2d 的 ybins），升級 plotly 後需以 tests/test_chart_data.py 確認
+    low, high = summary['min'], summary['max']
+    min_diff = (high - low) or 1
+    if summary['min_gap'] is not None:
+        min_diff = min(min_diff, summary['min_gap'])
+    exponent = math.pow(10, math.floor(math.log(min_diff) / math.log(10)))
+    min_size = exponent * _round_up(min_diff / exponent, [0.9, 1.9, 4.9, 9.9], reverse=True)
+    rough = max(min_size, 2 * summary['std'] / math.pow(summary['rows'], 0.25 if is2d else 0.4))
+    if not math.isfinite(rough):
+        rough = 1
+
+    # 與自動刻度相同，取 2、5、10 乘以 10 的次方
+    base = math.pow(10, math.floor(math.log(rough) / math.log(10)))
+    size = base * _round_up(rough / base, [2, 5, 10]) or 1
+    first = math.ceil((low - (high - low) * 1e-4) / size) * size
+    return _increment(first, -size), size
+
+
+def numeric_bins(store, platform, sheet, column, is2d=False):
+    # 完整的自動分箱（含 plotly.js 對整數與邊界數據的位移），回傳 {'start', 'end', 'size'}；沒有數值時為 None
+    # 日期欄位在 plotly.js 以月、年等日曆單位分箱，無法以固定大小表示，也回傳 None
+    if pd.api.types.is_datetime64_any_dtype(store.schema(platform, sheet)[column]):
+        return None
+    summary = store.summary(platform, sheet, column)
+    if not summary['count']:
+        return None
+    low, high = summary['min'], summary['max']
+    start, size = autobin(summary, is2d)
+    if summary['integers'] == summary['count']:
+        if size < 1:
+            start = low - 0.5 * size
+        else:
+            start -= 0.5
+            if start + size < low:
+                start += size
+    else:
+        # 以 1/100 分箱計算位於邊界與分箱中間的筆數
+        fine = store.histogram(platform, sheet, column, start - 0.01 * size, size / 100)
+        position = fine['bin'] % 100
+        edge = int(fine['count'][position < 2].sum())
+        middle = int(fine['count'][(position >= 50) & (position < 52)].sum())
+        count = summary['count']
+        if middle < 0.1 * count and (edge > 0.3 * count or _near_edge(low, start, size)
+                                     or _near_edge(high, start, size)):
+            shift = size / 2
+            start += shift if start + shift < low else -shift
+    end = start + (1 + math.floor((high - start) / size)) * size
+    return {'start': start, 'end': end, 'size': size}
+
+
+class ChartData:
+    # 一張工作表的圖表數據；derived 記錄圖表產生的簡稱欄位，表格會一併顯示
+    def __init__(self, store, platform, sheet, version=None):
+        self.store = store
+        self.platform = platform
+        self.sheet = sheet
+        self.version = version
+        self.derived = []
+
+    def _short_name(self, column):
+        name = f'{column}_簡稱'
+        if name not in self.derived:
+            self.derived.append(name)
+        return name
+
+    def frame(self, *columns):
+        return self.store.frame(self.platform, self.sheet, list(dict.fromkeys(columns)))
+
+    def totals(self, by, metric, short=False):
+        # 各類別的加總，類別依第一次出現的順序；short 時以類別簡稱分組
+        prefix = SHORT_NAME_LENGTH if short else None
+        result = self.store.totals(self.platform, self.sheet, by, [metric], prefix=prefix)
+        return result.rename(columns={by: self._short_name(by)}) if short else result
+
+    def heatmap(self, x, y):
+        # x 為類別、y 依 plotly.js 的規則分箱後計數；回傳（x, y 分箱中心, count）與 y 的分箱設定
+        # 無法在後端分箱（日期或沒有數值）時回傳原始的兩個欄位，分箱設定為 None，由 plotly 自行分箱
+        bins = numeric_bins(self.store, self.platform, self.sheet, y, is2d=True)
+        if bins is None:
+            return self.frame(x, y), None
+        counts = self.store.histogram(self.platform, self.sheet, y, bins['start'], bins['size'], by=x)
+        counts[y] = bins['start'] + (counts['bin'] + 0.5) * bins['size']
+        return counts[[x, y, 'count']], bins
+
+    def box_stats(self, by, metric):
+        # 以類別簡稱分組的箱型圖統計值，回傳（統計值, 簡稱欄位名稱）
+        stats = store_box_stats(self.store, self.platform, self.sheet, by, metric,
+                                prefix=SHORT_NAME_LENGTH, version=self.version)
+        return stats, self._short_name(by)
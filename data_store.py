@@ -0,0 +1,496 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+
+import pandas as pd
+
+from figure_cache import CACHE_ROOT, PickleStore
+from storage import MemoryStore, SqliteStore
+
+# 數據檔案位置
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+FB_PATH = os.path.join(DATA_DIR, 'FB_all_data.xlsx')
+IG_PATH = os.path.join(DATA_DIR, 'IG_all_data.xlsx')
+
+# 檔案監控間隔（秒），設為 0 則停用熱更新
+DATA_WATCH_INTERVAL = float(os.environ.get('SOCIAL_DASH_WATCH_INTERVAL', '2'))
+
+# 數據存取後端：memory（整份 DataFrame 放在記憶體）或 sqlite（查詢時才從資料庫讀取需要的部分）
+STORAGE_BACKEND = os.environ.get('SOCIAL_DASH_STORAGE', 'memory')
+SQLITE_PATH = os.environ.get('SOCIAL_DASH_SQLITE_PATH', os.path.join(CACHE_ROOT, 'social_data.sqlite'))
+
+# 解析後的數據快取：解析 Excel 是啟動最慢的步驟，內容未變時直接載入上次的結果
+_parsed_store = PickleStore(os.path.join(CACHE_ROOT, 'data'))
+with open(os.path.abspath(__file__), 'rb') as _f:
+    _CODE_DIGEST = hashlib.sha1(_f.read()).hexdigest()[:12]
+
+# 定義 IG 欄位名稱
+ig_column_mapping = {
+    '圖文': {
+        '類別': '分類',
+        '發布日期': '張貼日期',
+        '發布時間': '張貼時間',
+        '發布時': '發布小時',
+        '永久連結': '發布網址',
+        '觸及人數': '觸及數量',
+        '按讚數': '按讚數量',
+        '分享': '分享數量',
+        '留言數': '留言數量',
+        '分享率': '分享率別'
+    },
+    '限時動態': {
+        '期間（秒）': '動態時間',
+        '發布日期': '張貼日期',
+        '發布時間': '張貼時間',
+        '發布時': '發布小時',
+        '觸及人數': '觸及數量',
+        '按讚數': '按讚數量',
+        '分享': '分享數量',
+        '分享率': '分享率別'
+    }
+}
+
+# 統一處理所有數值列
+numeric_cols = {
+    'FB': {
+        '貼文': ['觸及人數', '總點擊次數', '連結點擊次數', '心情', '留言', '分享'],
+        '影片': ['心情', '影片觀看 3 秒以上的次數', '觸及人數', '留言', '分享']
+    },
+    'IG': {
+        '圖文': ['觸及數量', '按讚數量', '分享數量', '留言數量', '珍藏次數', '分享率別']
+    }
+}
+
+# 各平台的日期、發布小時與類別欄位（IG 為重新命名後的名稱）
+date_columns = {'FB': '發布日期', 'IG': '張貼日期'}
+hour_columns = {'FB': '發布時', 'IG': '發布小時'}
+category_columns = {'FB': '類別', 'IG': '分類'}
+
+
+def _prepare_fb(raw_sheets):
+    # 處理fb數據，每個工作表產生新的 DataFrame，不修改原始資料
+    sheets = {}
+    for sheet_name, raw in raw_sheets.items():
+        converted = {}
+        for col in numeric_cols['FB'].get(sheet_name, []):
+            if col in raw.columns:
+                converted[col] = pd.to_numeric(raw[col], errors='coerce')
+
+        # 處理日期
+        if '發布日期' in raw.columns:
+            converted['發布日期'] = pd.to_datetime(raw['發布日期'], errors='coerce')
+
+        sheets[sheet_name] = raw.assign(**converted) if converted else raw.copy()
+    return sheets
+
+
+def _prepare_ig(raw_sheets):
+    # 處理IG數據，重新命名欄位後轉換型別，同樣不做 in-place 修改
+    sheets = {}
+    for sheet_name, raw in raw_sheets.items():
+        df = raw.rename(columns=ig_column_mapping.get(sheet_name, {}))
+
+        converted = {}
+        for col in numeric_cols['IG'].get(sheet_name, []):
+            if col in df.columns:
+                converted[col] = pd.to_numeric(df[col], errors='coerce')
+
+        # 處理日期列
+        if '張貼日期' in df.columns:
+            converted['張貼日期'] = pd.to_datetime(df['張貼日期'], errors='coerce')
+
+        sheets[sheet_name] = df.assign(**converted) if converted else df
+    return sheets
+
+
+def workbook_platform(sheet_names):
+    # 依工作表名稱判斷活頁簿屬於哪個平台，無法判斷時回傳 None
+    names = set(sheet_names)
+    matched = [platform for platform in ('FB', 'IG') if names & set(required_columns(platform))]
+    return matched[0] if len(matched) == 1 else None
+
+
+def required_columns(platform):
+    # read_workbooks() 會用到的工作表與欄位（IG 為重新命名後的名稱）
+    if platform == 'FB':
+        return {sheet: cols + ['發布日期'] for sheet, cols in numeric_cols['FB'].items()}
+    sheets = {}
+    for sheet in list(ig_column_mapping) + [s for s in numeric_cols['IG'] if s not in ig_column_mapping]:
+        cols = list(ig_column_mapping.get(sheet, {}).values())
+        sheets[sheet] = cols + [col for col in numeric_cols['IG'].get(sheet, []) if col not in cols]
+    return sheets
+
+
+def validate_workbook(platform, raw_sheets):
+    # 檢查原始工作表是否符合欄位定義，回傳錯誤訊息清單（空清單表示通過）
+    errors = []
+    for sheet, cols in required_columns(platform).items():
+        if sheet not in raw_sheets:
+            errors.append(f"{platform} 缺少工作表「{sheet}」")
+            continue
+        df = raw_sheets[sheet]
+        if platform == 'IG':
+            df = df.rename(columns=ig_column_mapping.get(sheet, {}))
+        missing = [col for col in cols if col not in df.columns]
+        if missing:
+            errors.append(f"{platform}/{sheet} 缺少欄位：{'、'.join(missing)}")
+
+        # 數值欄位有內容卻完全無法轉換時，多半是欄位對應錯誤
+        for col in numeric_cols[platform].get(sheet, []):
+            if col not in df.columns:
+                continue
+            values = df[col]
+            filled = values.notna() & (values.astype(str).str.strip() != '')
+            if filled.any() and pd.to_numeric(values[filled], errors='coerce').isna().all():
+                errors.append(f"{platform}/{sheet} 的「{col}」沒有可轉換的數值")
+    return errors
+
+
+def prepare_workbook(platform, raw_sheets):
+    return _prepare_fb(raw_sheets) if platform == 'FB' else _prepare_ig(raw_sheets)
+
+
+def read_workbooks(fb_path=FB_PATH, ig_path=IG_PATH):
+    # 讀取並整理兩個活頁簿，失敗時直接拋出例外（由呼叫端決定如何處理）
+    if not os.path.exists(fb_path) or not os.path.exists(ig_path):
+        raise FileNotFoundError("數據文件不存在")
+
+    fb_data = _prepare_fb(pd.read_excel(fb_path, sheet_name=None))
+    ig_data = _prepare_ig(pd.read_excel(ig_path, sheet_name=None))
+    return fb_data, ig_data
+
+
+# 不可變的數據快照：version 每次發布遞增，callback 取得後整個請求都使用同一份
+# fingerprint 為檔案內容雜湊，跨程序重啟仍相同，可作為磁碟快取的鍵值
+# store 為查詢資料列的後端；使用 sqlite 時 fb_data/ig_data 只保留欄位與型別（沒有資料列）
+DataSnapshot = namedtuple('DataSnapshot',
+                          ['version', 'fb_data', 'ig_data', 'source', 'loaded_at', 'fingerprint', 'store'])
+
+_publish_lock = threading.Lock()
+_snapshot = DataSnapshot(0, MappingProxyType({}), MappingProxyType({}), None, 0.0, None, MemoryStore({}, {}))
+_listeners = []
+
+
+def get_snapshot():
+    # 讀取端不加鎖：模組層級的參照指派本身是原子操作
+    return _snapshot
+
+
+def subscribe(listener):
+    # 註冊快照發布後的通知（在發布的執行緒中呼叫，不應長時間阻塞）
+    _listeners.append(listener)
+
+
+def publish_snapshot(fb_data, ig_data, source=None, fingerprint=None, store=None):
+    global _snapshot
+    with _publish_lock:
+        _snapshot = DataSnapshot(
+            _snapshot.version + 1,
+            MappingProxyType(dict(fb_data)),
+            MappingProxyType(dict(ig_data)),
+            source,
+            time.time(),
+            fingerprint,
+            store if store is not None else MemoryStore(dict(fb_data), dict(ig_data))
+        )
+        snapshot = _snapshot
+
+    for listener in list(_listeners):
+        try:
+            listener(snapshot)
+        except Exception as e:
+            print(f"快照通知錯誤: {str(e)}")
+    return snapshot
+
+
+def file_signature(paths=(FB_PATH, IG_PATH)):
+    # 以 (修改時間, 檔案大小) 判斷檔案是否變動
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def content_fingerprint(paths=(FB_PATH, IG_PATH)):
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_parsed(fingerprint, parsed):
+    try:
+        _parsed_store.save(f'{fingerprint}-{_CODE_DIGEST}', parsed)
+    except OSError as e:
+        print(f"數據快取寫入錯誤: {str(e)}")
+
+
+def _load_parsed(fb_path, ig_path, fingerprint):
+    parsed = _parsed_store.load(f'{fingerprint}-{_CODE_DIGEST}')
+    if parsed is not None:
+        return parsed
+    # 啟動時還沒有數據可服務，直接在本程序解析；之後的重新載入交給子程序，解析 Excel 不會拖慢請求
+    if get_snapshot().version == 0:
+        parsed = read_workbooks(fb_path, ig_path)
+        save_parsed(fingerprint, parsed)
+        return parsed
+    return _parse_in_worker(fb_path, ig_path, fingerprint)
+
+
+def _parse_in_worker(fb_path, ig_path, fingerprint):
+    # 與上傳相同的解析子程序（有時間與記憶體上限），結果寫入解析快取後由本程序載入
+    from upload import run_worker  # upload 匯入本模組，使用時才匯入
+    result = run_worker([(fb_path, os.path.basename(fb_path)), (ig_path, os.path.basename(ig_path))])
+    if result.get('errors'):
+        raise ValueError('；'.join(result['errors']))
+    if result['fingerprint'] != fingerprint:
+        raise ValueError('數據檔案在載入期間變動')
+    parsed = _parsed_store.load(f'{fingerprint}-{_CODE_DIGEST}')
+    if parsed is None:
+        raise ValueError('讀取解析結果失敗')
+    return parsed
+
+
+_sqlite_store = None
+_sqlite_lock = threading.Lock()
+
+
+def get_sqlite_store():
+    global _sqlite_store
+    if _sqlite_store is None:
+        with _sqlite_lock:
+            if _sqlite_store is None:
+                index_columns = {platform: (date_columns[platform], category_columns[platform],
+                                            hour_columns[platform]) for platform in ('FB', 'IG')}
+                _sqlite_store = SqliteStore(SQLITE_PATH, index_columns)
+    return _sqlite_store
+
+
+def publish_to_sqlite(fb_data, ig_data, source=None, fingerprint=None):
+    # 匯入資料庫後只在快照保留欄位結構，資料列由 SQLite 查詢
+    dataset = get_sqlite_store().import_dataset(fingerprint, fb_data, ig_data)
+    return _publish_dataset(dataset, source, fingerprint)
+
+
+def _publish_dataset(dataset, source, fingerprint):
+    fb_schema = {sheet: dataset.schema('FB', sheet) for sheet in dataset.sheets('FB')}
+    ig_schema = {sheet: dataset.schema('IG', sheet) for sheet in dataset.sheets('IG')}
+    return publish_snapshot(fb_schema, ig_schema, source=source, fingerprint=fingerprint, store=dataset)
+
+
+_reload_lock = threading.Lock()
+
+
+def reload_data(fb_path=FB_PATH, ig_path=IG_PATH):
+    # 檔案監控與上傳可能同時觸發，依序執行避免同一組檔案重複載入
+    with _reload_lock:
+        return _reload_data(fb_path, ig_path)
+
+
+def _reload_data(fb_path, ig_path):
+    # 在背景重建整份數據後再一次性替換，讀取失敗時保留舊快照
+    source = ((fb_path, ig_path), file_signature((fb_path, ig_path)))
+    # 目前快照已來自同一組檔案（例如上傳後監控才偵測到變動）時不重複發布
+    if get_snapshot().source == source:
+        return None
+    try:
+        fingerprint = content_fingerprint((fb_path, ig_path))
+        # 內容與目前快照相同（例如上傳發布後才把檔案移到 data/）時只更新來源，不發布新版本
+        if _adopt_source(source, fingerprint):
+            return None
+        if STORAGE_BACKEND == 'sqlite':
+            store = get_sqlite_store()
+            # 資料庫已有同一份內容時不需解析 Excel
+            if store.has_dataset(fingerprint):
+                return _publish_dataset(store.dataset(fingerprint), source, fingerprint)
+            fb_data, ig_data = _load_parsed(fb_path, ig_path, fingerprint)
+            return publish_to_sqlite(fb_data, ig_data, source=source, fingerprint=fingerprint)
+        fb_data, ig_data = _load_parsed(fb_path, ig_path, fingerprint)
+    except Exception as e:
+        print(f"數據加載錯誤: {str(e)}")
+        return None
+    return publish_snapshot(fb_data, ig_data, source=source, fingerprint=fingerprint)
+
+
+def _adopt_source(source, fingerprint):
+    global _snapshot
+    with _publish_lock:
+        if fingerprint is None or _snapshot.fingerprint != fingerprint:
+            return False
+        # 版本不變，各快取仍然有效
+        _snapshot = _snapshot._replace(source=source)
+        return True
+
+
+class _Flight:
+    # 進行中的計算：其他相同請求等待同一個結果
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def resolve(self, value=None, error=None):
+        self._value, self._error = value, error
+        self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+_caches = {}
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+class VersionedCache:
+    # 以數據版本為前提的 LRU 快取：版本前進時整份清空，舊版本的請求不寫入
+    # 同一版本、同一鍵值的並行請求只計算一次，其餘請求等待並共用結果
+    def __init__(self, maxsize=128, name=None):
+        self.maxsize = maxsize
+        self._version = None
+        self._items = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'coalesced': 0}
+        if name is not None:
+            _caches[name] = self
+
+    def get_or_compute(self, version, key, compute):
+        with self._lock:
+            if self._version is None or version > self._version:
+                self._items.clear()
+                self._version = version
+            if version == self._version and key in self._items:
+                self._items.move_to_end(key)
+                self._counters['hits'] += 1
+                return self._items[key]
+
+            flight = self._inflight.get((version, key))
+            leader = flight is None
+            if leader:
+                flight = self._inflight[(version, key)] = _Flight()
+                self._counters['misses'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            return flight.wait()
+
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop((version, key), None)
+            flight.resolve(error=e)
+            raise
+
+        # 先寫入快取再移除進行中的紀錄，避免期間的新請求重複計算
+        self.put(version, key, value)
+        with self._lock:
+            self._inflight.pop((version, key), None)
+        flight.resolve(value)
+        return value
+
+    def get(self, version, key, default=None):
+        with self._lock:
+            if version != self._version or key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, version, key, value):
+        with self._lock:
+            if self._version is None or version > self._version:
+                self._items.clear()
+                self._version = version
+            if version == self._version:
+                self._items[key] = value
+                self._items.move_to_end(key)
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._version = None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, size=len(self._items), inflight=len(self._inflight),
+                        version=self._version)
+
+
+class DataWatcher:
+    # 輪詢數據檔案，檔案穩定（連續兩次檢查相同）後才在背景執行緒重新載入
+    def __init__(self, paths=(FB_PATH, IG_PATH), interval=DATA_WATCH_INTERVAL):
+        self.paths = tuple(paths)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_seen = None
+        self._attempted = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        # 目前快照若來自同一組檔案，以載入當下的簽章為基準，避免漏掉啟動前的變動
+        source = get_snapshot().source
+        if source is not None and source[0] == self.paths:
+            self._attempted = source[1]
+        else:
+            self._attempted = file_signature(self.paths)
+        self._last_seen = file_signature(self.paths)
+        self._thread = threading.Thread(target=self._run, name='data-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def check(self):
+        # 回傳新發布的快照，沒有變動或仍在寫入中則回傳 None
+        current = file_signature(self.paths)
+        stable = current == self._last_seen
+        self._last_seen = current
+        if not stable or current == self._attempted:
+            return None
+        self._attempted = current
+        return reload_data(*self.paths)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            snapshot = self.check()
+            if snapshot is not None:
+                print(f"數據已重新載入，版本 {snapshot.version}")
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def ensure_data_watcher():
+    global _watcher
+    if _watcher is not None:
+        return _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            watcher = DataWatcher()
+            watcher.start()
+            _watcher = watcher
+    return _watcher
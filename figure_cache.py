@@ -0,0 +1,92 @@
+import atexit
+import os
+import pickle
+import tempfile
+import threading
+from collections import Counter
+
+# 磁碟快取（解析後的數據與預先計算的圖表），以數據內容雜湊分檔，新程序啟動時直接載入
+
+CACHE_ROOT = os.environ.get(
+    'SOCIAL_DASH_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+CACHE_DIR = os.path.join(CACHE_ROOT, 'figures')
+
+
+def write_pickle(path, payload):
+    # 先寫入暫存檔再取代，避免多個 worker 同時寫入時讀到不完整的檔案
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_pickle(path, default):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return default
+
+
+class PickleStore:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _entries_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def load(self, key, default=None):
+        return read_pickle(self._entries_path(key), default)
+
+    def save(self, key, entries):
+        # 只保留目前版本的檔案，舊版本數據的快取直接移除
+        write_pickle(self._entries_path(key), entries)
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl') and name != f'{key}.pkl':
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+
+class UsageTracker:
+    # 記錄圖表組合的使用次數，供下次預熱挑選最常用的組合；寫入磁碟時只保留最常用的 max_keys 個組合
+    def __init__(self, cache_dir=CACHE_DIR, max_keys=500):
+        self.path = os.path.join(cache_dir, 'usage.counts')
+        self.max_keys = max_keys
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def most_common(self, n):
+        counts = read_pickle(self.path, Counter())
+        with self._lock:
+            counts.update(self._counts)
+        return [key for key, _ in counts.most_common(n)]
+
+    def flush(self):
+        with self._lock:
+            pending, self._counts = self._counts, Counter()
+        if not pending:
+            return
+        counts = read_pickle(self.path, Counter())
+        counts.update(pending)
+        counts = Counter(dict(counts.most_common(self.max_keys)))
+        try:
+            write_pickle(self.path, counts)
+        except OSError as e:
+            print(f"使用紀錄寫入錯誤: {str(e)}")
+
+    def flush_at_exit(self):
+        atexit.register(self.flush)
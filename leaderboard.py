@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+from data_store import VersionedCache, category_columns, date_columns, numeric_cols
+from storage import MemoryStore
+
+# 貼文排行榜：數據在記憶體時每個數據版本只建立一次排序索引，查詢時不需重新排序整個表格；
+# 數據在 SQLite 時不載入指標欄位，每次查詢由 SQL 排序並只取前 n 筆
+
+_index_cache = VersionedCache(maxsize=16, name='leaderboard')
+
+# 日期區間索引每個節點保留的名次數，也是前端可查詢的最大 N；超過時改為掃描整個區間
+MAX_N = 100
+
+# 名次陣列中的缺值（該列指標為空）
+_NO_RANK = -1
+_MAX_RANK = np.iinfo(np.int32).max
+
+
+class _RangeRanks:
+    # 依日期排序的名次（在整體排序中的位置）上建立線段樹，每個節點保留最前與最後 size 個名次
+    # 區間查詢只需合併 O(log 區塊數) 個節點，加上兩端不滿一個區塊的部分，與區間筆數無關
+    def __init__(self, ranks, size=MAX_N):
+        self.size = size
+        self.ranks = ranks
+        blocks = max(1, -(-len(ranks) // size))
+        leaves = 1 << (blocks - 1).bit_length()
+        padded = np.full(leaves * size, _NO_RANK, dtype=np.int32)
+        padded[:len(ranks)] = ranks
+        level = padded.reshape(leaves, size)
+
+        # top 由小到大（缺值放最後），bottom 由大到小（缺值為 -1 自然在最後）
+        top = np.sort(np.where(level == _NO_RANK, _MAX_RANK, level), axis=1)
+        bottom = -np.sort(-level, axis=1)
+        self.levels = {False: [top], True: [bottom]}
+        while top.shape[0] > 1:
+            top = np.sort(top.reshape(-1, 2 * size), axis=1)[:, :size]
+            bottom = -np.sort(-bottom.reshape(-1, 2 * size), axis=1)[:, :size]
+            self.levels[False].append(top)
+            self.levels[True].append(bottom)
+
+    def query(self, lo, hi, n, bottom=False):
+        # 回傳 [lo, hi) 區間內最前（bottom 時最後）n 個名次，依排名順序排列
+        first, last = -(-lo // self.size), hi // self.size
+        if first >= last:
+            parts = [self.ranks[lo:hi]]
+        else:
+            parts = [self.ranks[lo:first * self.size], self.ranks[last * self.size:hi]]
+            levels = self.levels[bottom]
+            left, right, depth = first, last, 0
+            while left < right:
+                if left & 1:
+                    parts.append(levels[depth][left][:n])
+                    left += 1
+                if right & 1:
+                    right -= 1
+                    parts.append(levels[depth][right][:n])
+                left, right, depth = left >> 1, right >> 1, depth + 1
+
+        candidates = np.concatenate(parts)
+        candidates = candidates[(candidates != _NO_RANK) & (candidates != _MAX_RANK)]
+        k = min(n, len(candidates))
+        if not k:
+            return candidates
+        keys = -candidates if bottom else candidates
+        selected = np.sort(np.partition(keys, k - 1)[:k])
+        return -selected if bottom else selected
+
+
+class LeaderboardIndex:
+    def __init__(self, df, metrics, category_col=None, date_col=None):
+        self.df = df
+        self.metrics = list(metrics)
+        self.category_col = category_col
+        self.date_col = date_col
+
+        # 全部資料（None）以及每個類別各自的列位置
+        groups = {None: np.arange(len(df))}
+        if category_col:
+            for category, positions in df.groupby(category_col, sort=False).indices.items():
+                groups[category] = positions
+        self.categories = [category for category in groups if category is not None]
+
+        # 每個指標、每個類別的列位置，依數值由大到小排序（排除空值）
+        self._values = {}
+        self._by_metric = {}
+        for metric in self.metrics:
+            values = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=float)
+            self._values[metric] = values
+            for group, positions in groups.items():
+                group_values = values[positions]
+                keep = ~np.isnan(group_values)
+                order = np.argsort(-group_values[keep], kind='stable')
+                self._by_metric[(group, metric)] = positions[keep][order]
+
+        # 依日期排序的列位置，日期區間查詢時以二分搜尋取得範圍
+        self._by_date = {}
+        self._range_ranks = {}
+        if date_col:
+            dates = df[date_col].to_numpy(dtype='datetime64[ns]')
+            for group, positions in groups.items():
+                group_dates = dates[positions]
+                keep = ~np.isnat(group_dates)
+                order = np.argsort(group_dates[keep], kind='stable')
+                self._by_date[group] = (group_dates[keep][order], positions[keep][order])
+
+    def _ranks_in_date_order(self, category, metric):
+        # 第一次以日期查詢該類別與指標時才建立
+        key = (category, metric)
+        if key not in self._range_ranks:
+            order = self._by_metric[key]
+            rank = np.full(len(self.df), _NO_RANK, dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            self._range_ranks[key] = _RangeRanks(rank[self._by_date[category][1]])
+        return self._range_ranks[key]
+
+    def query(self, metric, n=10, category=None, start=None, end=None, bottom=False):
+        # 回傳前（或後）n 名的列位置；無日期條件為 O(n)
+        # 有日期條件且 n <= MAX_N 時為 O(log rows + n log rows)，超過 MAX_N 時掃描整個區間
+        if (category, metric) not in self._by_metric:
+            return np.array([], dtype=int)
+
+        if start is None and end is None:
+            order = self._by_metric[(category, metric)]
+            return order[::-1][:n] if bottom else order[:n]
+
+        if category not in self._by_date:
+            return np.array([], dtype=int)
+        dates, positions = self._by_date[category]
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left') if start else 0
+        # 結束日期包含當天整天
+        hi = (np.searchsorted(dates, np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1), 'ns'), side='left')
+              if end else len(dates))
+        if n <= MAX_N:
+            # 名次越小代表數值越大，同分時與無日期條件的排列一致
+            ranks = self._ranks_in_date_order(category, metric).query(lo, hi, n, bottom)
+            return self._by_metric[(category, metric)][ranks]
+
+        candidates = positions[lo:hi]
+        values = self._values[metric][candidates]
+        keep = ~np.isnan(values)
+        candidates, values = candidates[keep], values[keep]
+        if not len(candidates):
+            return candidates
+
+        # 同分時的排列方式與無日期條件的結果一致（第 n 名有同分時也要選到相同的列）
+        keys = values if bottom else -values
+        ties = -candidates if bottom else candidates
+        return candidates[np.lexsort((ties, keys))[:n]]
+
+    def rows(self, positions, metric):
+        return self.df.iloc[positions][_row_columns(self.df, metric, self.category_col, self.date_col)]
+
+    def top(self, metric, n=10, category=None, start=None, end=None, bottom=False):
+        return self.rows(self.query(metric, n, category, start, end, bottom), metric)
+
+    def date_extent(self):
+        if not self.date_col:
+            return None, None
+        dates = self.df[self.date_col]
+        return dates.min(), dates.max()
+
+
+class StoreLeaderboard:
+    # 與 LeaderboardIndex 相同的查詢介面，排序與篩選交給數據後端
+    def __init__(self, store, platform, sheet, schema, metrics, category_col=None, date_col=None):
+        self.store = store
+        self.platform = platform
+        self.sheet = sheet
+        self.schema = schema
+        self.metrics = list(metrics)
+        self.category_col = category_col
+        self.date_col = date_col
+        self.categories = list(store.totals(platform, sheet, category_col)[category_col]) if category_col else []
+
+    def top(self, metric, n=10, category=None, start=None, end=None, bottom=False):
+        columns = _row_columns(self.schema, metric, self.category_col, self.date_col)
+        if metric not in self.metrics or (category is not None and not self.category_col) or \
+                ((start or end) and not self.date_col):
+            return self.schema[columns]
+        filters = []
+        if category is not None:
+            filters.append((self.category_col, 'in', [str(category)]))
+        if start:
+            filters.append((self.date_col, '>=', pd.Timestamp(start)))
+        if end:
+            # 結束日期包含當天整天
+            filters.append((self.date_col, '<', pd.Timestamp(end) + pd.Timedelta(days=1)))
+        return self.store.top(self.platform, self.sheet, metric, n, columns, filters, bottom)
+
+    def date_extent(self):
+        if not self.date_col:
+            return None, None
+        return self.store.extent(self.platform, self.sheet, self.date_col)
+
+
+def _row_columns(df, metric, category_col, date_col):
+    return [col for col in (category_col, date_col) if col] + [
+        col for col in ('永久連結', '發布網址') if col in df.columns
+    ] + [metric]
+
+
+def leaderboard_metrics(platform, sheet, df):
+    # 以 numeric_cols 定義的指標為主，未定義的工作表則使用所有數值欄位
+    metrics = numeric_cols.get(platform, {}).get(sheet)
+    if metrics is None:
+        metrics = [col for col in df.select_dtypes('number').columns if col != '編號']
+    return [metric for metric in metrics if metric in df.columns]
+
+
+def get_leaderboard_index(snapshot, platform, sheet):
+    def build():
+        # 依欄位結構決定需要的欄位，只向後端取出這些欄位建立索引
+        schema = snapshot.fb_data[sheet] if platform == 'FB' else snapshot.ig_data[sheet]
+        category_col = category_columns[platform] if category_columns[platform] in schema.columns else None
+        date_col = date_columns[platform] if date_columns[platform] in schema.columns else None
+        metrics = leaderboard_metrics(platform, sheet, schema)
+        if not isinstance(snapshot.store, MemoryStore):
+            return StoreLeaderboard(snapshot.store, platform, sheet, schema, metrics, category_col, date_col)
+        wanted = {category_col, date_col, '永久連結', '發布網址'} | set(metrics)
+        df = snapshot.store.frame(platform, sheet, [col for col in schema.columns if col in wanted])
+        return LeaderboardIndex(df, metrics, category_col, date_col)
+
+    return _index_cache.get_or_compute(snapshot.version, (platform, sheet), build)
@@ -0,0 +1,317 @@
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+# 儀錶板負載測試：模擬多位使用者操作下拉選單，實際呼叫 Dash 的 callback 端點
+
+AXIS_DROPDOWNS = ['x-axis-dropdown', 'y-axis-dropdown', 'second-x-axis-dropdown', 'second-y-axis-dropdown']
+
+
+class FlaskClientTransport:
+    # 透過 Flask test client 在同一程序內送出請求
+    def __init__(self, server):
+        self.client = server.test_client()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.data
+
+    def post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.data
+
+
+class HttpTransport:
+    # 對實際啟動的服務送出 HTTP 請求
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _open(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, payload):
+        body = json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(self.base_url + path, data=body,
+                                         headers={'Content-Type': 'application/json'})
+        return self._open(request)
+
+
+def _parse_outputs(output):
+    # 多個輸出的格式為 "..a.prop...b.prop.."
+    if output.startswith('..'):
+        return [item.rsplit('.', 1) for item in output[2:-2].split('...')], True
+    return [output.rsplit('.', 1)], False
+
+
+def _collect_props(node, props):
+    # 從 /_dash-layout 的 JSON 取出每個有 id 的元件初始屬性
+    if isinstance(node, list):
+        for child in node:
+            _collect_props(child, props)
+        return
+    if not isinstance(node, dict) or 'props' not in node:
+        return
+    component_props = node['props']
+    if 'id' in component_props:
+        for name, value in component_props.items():
+            if name not in ('id', 'children'):
+                props[(component_props['id'], name)] = value
+    _collect_props(component_props.get('children'), props)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = {'completed': 0, 'failed': 0}
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.samples[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def session_done(self, ok):
+        with self._lock:
+            self.sessions['completed' if ok else 'failed'] += 1
+
+
+class VirtualUser:
+    # 簡化版的 Dash 前端：依照 callback 相依關係依序觸發，並保存各元件目前的屬性
+    def __init__(self, transport, layout, dependencies, recorder, rng, think_time=0.0):
+        self.transport = transport
+        self.recorder = recorder
+        self.rng = rng
+        self.think_time = think_time
+        self.props = {}
+        _collect_props(layout, self.props)
+        self.callbacks = []
+        for callback in dependencies:
+            outputs, multi = _parse_outputs(callback['output'])
+            self.callbacks.append({
+                'spec': callback,
+                'outputs': [tuple(output) for output in outputs],
+                'multi': multi,
+                'inputs': [(item['id'], item['property']) for item in callback['inputs']],
+                'name': '.'.join(outputs[0])
+            })
+
+    def _timed(self, name, request):
+        start = time.perf_counter()
+        try:
+            status, body = request()
+        except Exception:
+            status, body = None, b''
+        # 204 代表 callback 選擇不更新（PreventUpdate），視為成功
+        self.recorder.record(name, time.perf_counter() - start, status in (200, 204))
+        return status, body
+
+    def load_page(self):
+        for path in ('/', '/_dash-layout', '/_dash-dependencies'):
+            status, _ = self._timed('page' + path, lambda: self.transport.get(path))
+            if status != 200:
+                raise RuntimeError(f'頁面載入失敗: {path} ({status})')
+        initial = [cb for cb in self.callbacks if not cb['spec'].get('prevent_initial_call')]
+        self._run_callbacks(initial, changed=set())
+
+    def _fire(self, callback, changed):
+        spec = callback['spec']
+        outputs = [{'id': component, 'property': prop} for component, prop in callback['outputs']]
+        payload = {
+            'output': spec['output'],
+            'outputs': outputs if callback['multi'] else outputs[0],
+            'inputs': [{'id': component, 'property': prop, 'value': self.props.get((component, prop))}
+                       for component, prop in callback['inputs']],
+            'changedPropIds': [f'{component}.{prop}' for component, prop in callback['inputs']
+                               if (component, prop) in changed],
+            'state': [{'id': item['id'], 'property': item['property'],
+                       'value': self.props.get((item['id'], item['property']))}
+                      for item in spec.get('state', [])]
+        }
+        status, body = self._timed(callback['name'],
+                                   lambda: self.transport.post('/_dash-update-component', payload))
+        if status != 200:
+            return set()
+
+        updated = set()
+        for component, values in json.loads(body).get('response', {}).items():
+            for prop, value in values.items():
+                self.props[(component, prop)] = value
+                updated.add((component, prop))
+        return updated
+
+    def _run_callbacks(self, pending, changed):
+        # 與前端相同：上游 callback 尚未完成時，先不觸發依賴它輸出的 callback
+        pending = list(pending)
+        while pending:
+            pending_outputs = {output for cb in pending for output in cb['outputs']}
+            ready = [cb for cb in pending
+                     if not any(item in pending_outputs and item not in cb['outputs'] for item in cb['inputs'])]
+            ready = ready or pending[:1]
+            for callback in ready:
+                pending.remove(callback)
+                updated = self._fire(callback, changed)
+                changed |= updated
+                # 與前端相同：callback 的輸出同時是自己的輸入時（例如分頁）不會再次觸發自己
+                for dependent in self.callbacks:
+                    if dependent is callback:
+                        continue
+                    if dependent not in pending and any(item in updated for item in dependent['inputs']):
+                        pending.append(dependent)
+
+    def set_prop(self, component, prop, value):
+        self.props[(component, prop)] = value
+        triggered = [cb for cb in self.callbacks if (component, prop) in cb['inputs']]
+        self._run_callbacks(triggered, changed={(component, prop)})
+        if self.think_time:
+            time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+    def _pick(self, component, exclude=None):
+        options = self.props.get((component, 'options')) or []
+        values = [option['value'] for option in options if option['value'] != exclude]
+        return self.rng.choice(values) if values else None
+
+    def run_session(self):
+        # 操作流程：開啟頁面 → 選平台 → 選工作表 → 逐一切換各軸 → 下載
+        self.load_page()
+        self.set_prop('platform-dropdown', 'value', self._pick('platform-dropdown') or 'FB')
+        sheet = self._pick('sheet-dropdown')
+        if sheet is not None:
+            self.set_prop('sheet-dropdown', 'value', sheet)
+        for component in AXIS_DROPDOWNS:
+            value = self._pick(component, exclude=self.props.get((component, 'value')))
+            if value is not None:
+                self.set_prop(component, 'value', value)
+        self.set_prop('download-button', 'n_clicks', (self.props.get(('download-button', 'n_clicks')) or 0) + 1)
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def _summary(samples, errors, duration):
+    latencies = [1000 * value for value in samples]
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'throughput_per_second': len(samples) / duration if duration else 0.0,
+        'latency_ms': {
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'max': max(latencies),
+            'mean': sum(latencies) / len(latencies)
+        }
+    }
+
+
+def run_load_test(transport_factory, users=10, arrival_rate=5.0, think_time=0.0, seed=0):
+    # 依固定到達速率啟動虛擬使用者，每位使用者在自己的執行緒跑完整個操作流程
+    bootstrap = transport_factory()
+    layout = json.loads(bootstrap.get('/_dash-layout')[1])
+    dependencies = json.loads(bootstrap.get('/_dash-dependencies')[1])
+    recorder = Recorder()
+
+    def session(index):
+        user = VirtualUser(transport_factory(), layout, dependencies, recorder,
+                           random.Random(seed + index), think_time)
+        try:
+            user.run_session()
+            recorder.session_done(True)
+        except Exception as e:
+            print(f"使用者 {index} 錯誤: {str(e)}")
+            recorder.session_done(False)
+
+    threads = []
+    start = time.perf_counter()
+    for index in range(users):
+        delay = start + index / arrival_rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(target=session, args=(index,), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    all_samples = [value for samples in recorder.samples.values() for value in samples]
+    return {
+        'config': {'users': users, 'arrival_rate': arrival_rate, 'think_time': think_time, 'seed': seed},
+        'duration_seconds': duration,
+        'sessions': dict(recorder.sessions),
+        'callbacks': {name: _summary(samples, recorder.errors[name], duration)
+                      for name, samples in sorted(recorder.samples.items())},
+        'overall': _summary(all_samples, sum(recorder.errors.values()), duration) if all_samples else {}
+    }
+
+
+def compare_reports(baseline, current, tolerance=0.2):
+    # 回傳 p95 延遲或錯誤率變差超過容許範圍的 callback
+    regressions = []
+    for name, result in current['callbacks'].items():
+        before = baseline.get('callbacks', {}).get(name)
+        if before is None:
+            continue
+        if result['latency_ms']['p95'] > before['latency_ms']['p95'] * (1 + tolerance):
+            regressions.append({'callback': name, 'metric': 'p95',
+                                'baseline': before['latency_ms']['p95'], 'current': result['latency_ms']['p95']})
+        if result['error_rate'] > before['error_rate']:
+            regressions.append({'callback': name, 'metric': 'error_rate',
+                                'baseline': before['error_rate'], 'current': result['error_rate']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='儀錶板 callback 負載測試')
+    parser.add_argument('--users', type=int, default=10, help='虛擬使用者數')
+    parser.add_argument('--arrival-rate', type=float, default=5.0, help='每秒新增的使用者數')
+    parser.add_argument('--think-time', type=float, default=0.0, help='每步操作之間的平均等待秒數')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', default=None, help='測試已啟動的服務（預設為程序內的 test client）')
+    parser.add_argument('--output', default=None, help='將結果寫入 JSON 檔')
+    parser.add_argument('--baseline', default=None, help='與先前的結果比較，退步時回傳非零結束碼')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='p95 延遲可接受的退步比例')
+    args = parser.parse_args()
+
+    if args.url:
+        transport_factory = lambda: HttpTransport(args.url)  # noqa: E731
+    else:
+        from social_data_dash import server
+        transport_factory = lambda: FlaskClientTransport(server)  # noqa: E731
+
+    report = run_load_test(transport_factory, args.users, args.arrival_rate, args.think_time, args.seed)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_reports(json.load(f), report, args.tolerance)
+        for item in regressions:
+            print(f"效能退步: {item['callback']} {item['metric']} {item['baseline']:.3f} → {item['current']:.3f}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
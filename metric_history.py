@@ -0,0 +1,420 @@
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import DATA_DIR
+from figure_cache import read_pickle, write_pickle
+
+# 指標歷史：每次匯出只追加一個區段檔，區段內以欄為單位記錄「有變動的貼文與新數值」
+# 重播區段即可還原任一次匯出時的工作表；成長曲線由記錄時建立的索引直接查詢
+
+HISTORY_DIR = os.environ.get('SOCIAL_DASH_HISTORY_DIR', os.path.join(DATA_DIR, 'history'))
+
+# 設為 0 則不記錄歷史
+HISTORY_ENABLED = os.environ.get('SOCIAL_DASH_HISTORY', '1') != '0'
+
+# 記錄快照時每次從數據後端讀取的資料列數
+HISTORY_CHUNKSIZE = 50000
+
+# 貼文識別欄位：有網址時以網址為主，再加上發布日期與時間區分
+_KEY_COLUMNS = {
+    'FB': ('永久連結', '發布日期', '發布時間'),
+    'IG': ('發布網址', '張貼日期', '張貼時間')
+}
+
+
+def post_keys(df, platform, seen=None):
+    parts = [df[col].astype(str) for col in _KEY_COLUMNS[platform] if col in df.columns]
+    if parts:
+        keys = parts[0]
+        for part in parts[1:]:
+            keys = keys + '|' + part
+    else:
+        keys = pd.Series(df.index.astype(str), index=df.index)
+    # 同一工作表內重複的鍵值依出現順序加上編號；分批處理時 seen 記錄前面區塊中各鍵值出現的次數
+    occurrence = keys.groupby(keys, sort=False).cumcount()
+    if seen is not None:
+        if seen:
+            occurrence += keys.map(seen).fillna(0).astype(int)
+        for key, count in keys.value_counts(sort=False).items():
+            seen[key] = seen.get(key, 0) + count
+    return keys.where(occurrence == 0, keys + '#' + occurrence.astype(str)).tolist()
+
+
+def _fill_value(dtype):
+    if dtype.kind in 'iufb':
+        return np.float64, np.nan
+    if dtype.kind == 'M':
+        return 'datetime64[ns]', np.datetime64('NaT')
+    return object, None
+
+
+def _common_dtype(current, dtype):
+    # 分批讀取時同一欄位在不同區塊的型別可能不同（例如某區塊有空值的整數欄位）
+    if current is None or current == dtype:
+        return dtype
+    if current.kind in 'iufb' and dtype.kind in 'iufb':
+        return np.result_type(current, dtype)
+    return np.dtype(object)
+
+
+def _changed(old, new):
+    # 兩邊都是空值視為相同
+    old, new = pd.Series(old), pd.Series(new)
+    same = (old.to_numpy() == new.to_numpy()) | (old.isna().to_numpy() & new.isna().to_numpy())
+    return ~same
+
+
+class _PostIndex:
+    # 依貼文編號查詢的紀錄（貼文編號, 匯出編號, 數值）：每次匯出附加一段陣列，查詢時才合併排序，
+    # 不為每篇貼文各建一個 Python 物件
+    def __init__(self):
+        self.parts = []
+        self.merged = False
+
+    def append(self, export, ids, values):
+        if len(ids):
+            self.parts.append((np.asarray(ids, dtype=np.int32), np.full(len(ids), export, dtype=np.int32), values))
+            self.merged = False
+
+    def lookup(self, post):
+        if not self.parts:
+            return [], []
+        if not self.merged:
+            ids = np.concatenate([part[0] for part in self.parts])
+            exports = np.concatenate([part[1] for part in self.parts])
+            values = [part[2] for part in self.parts]
+            if len({part.dtype for part in values}) > 1:
+                values = [part.astype(object) for part in values]
+            values = np.concatenate(values)
+            order = np.lexsort((exports, ids))
+            self.parts = [(ids[order], exports[order], values[order])]
+            self.merged = True
+        ids, exports, values = self.parts[0]
+        low, high = np.searchsorted(ids, post, side='left'), np.searchsorted(ids, post, side='right')
+        return exports[low:high].tolist(), values[low:high].tolist()
+
+
+class _SheetHistory:
+    def __init__(self):
+        self.keys = []        # 貼文編號 -> 鍵值
+        self.ids = {}         # 鍵值 -> 貼文編號
+        self.values = {}      # 欄位 -> 最新數值（依貼文編號排列）
+        self.columns = []
+        self.dtypes = {}
+        self.rows = np.array([], dtype=np.int32)
+        self.layouts = []     # [(匯出編號, 欄位, 型別, 列順序)]，只在有變動時記錄
+        self.changes = []     # [(匯出編號, {欄位: (貼文編號, 數值)})]
+        self.curves = {}      # 欄位 -> _PostIndex（各貼文數值變動的匯出編號與數值）
+        self.presence = _PostIndex()  # 各貼文出現（1）與消失（0）的匯出編號，兩者交替
+
+    def diff(self, chunks, platform):
+        # chunks 依序為工作表的資料列區塊（可以只有一個 DataFrame），逐塊比對，不需一次取出整個工作表
+        new_keys = []
+        seen = {}
+        columns, dtypes = None, {}
+        id_parts, delta_parts = [], {}
+        start = 0
+        for df in chunks:
+            if columns is None:
+                columns = list(df.columns)
+            df = df.set_axis(pd.RangeIndex(start, start + len(df)))
+            start += len(df)
+
+            keys = post_keys(df, platform, seen)
+            ids = np.empty(len(keys), dtype=np.int32)
+            for i, key in enumerate(keys):
+                post = self.ids.get(key)
+                if post is None:
+                    post = len(self.keys) + len(new_keys)
+                    new_keys.append(key)
+                ids[i] = post
+            id_parts.append(ids)
+
+            for col in df.columns:
+                dtypes[col] = _common_dtype(dtypes.get(col), df[col].dtype)
+                values = df[col].to_numpy()
+                state = self.values.get(col)
+                changed = np.ones(len(ids), dtype=bool)
+                if state is not None:
+                    known = ids < len(state)
+                    changed[known] = _changed(state[ids[known]], values[known])
+                if changed.any():
+                    delta_parts.setdefault(col, []).append((ids[changed], values[changed]))
+
+        ids = np.concatenate(id_parts) if id_parts else np.array([], dtype=np.int32)
+        deltas = {col: (np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts]))
+                  for col, parts in delta_parts.items()}
+        columns = columns or []
+        dtypes = {col: str(dtypes[col]) for col in columns}
+        layout_changed = columns != self.columns or dtypes != self.dtypes
+        return {
+            'new_keys': new_keys,
+            'columns': columns if layout_changed else None,
+            'dtypes': dtypes if layout_changed else None,
+            'rows': self._rows_delta(ids),
+            'deltas': deltas
+        }
+
+    def _rows_delta(self, ids):
+        # 列順序以（沿用前次的前綴長度, 其後的貼文編號）記錄，新貼文附加在後時只存新增部分
+        if np.array_equal(ids, self.rows):
+            return None
+        n = min(len(ids), len(self.rows))
+        mismatch = np.flatnonzero(ids[:n] != self.rows[:n])
+        keep = int(mismatch[0]) if len(mismatch) else n
+        return keep, ids[keep:]
+
+    def apply(self, export, part):
+        for key in part['new_keys']:
+            self.ids[key] = len(self.keys)
+            self.keys.append(key)
+
+        if part['columns'] is not None:
+            self.columns, self.dtypes = part['columns'], part['dtypes']
+        if part['rows'] is not None:
+            keep, tail = part['rows']
+            rows = np.concatenate([self.rows[:keep], tail]).astype(np.int32)
+            self._update_presence(export, rows)
+            self.rows = rows
+        if part['columns'] is not None or part['rows'] is not None:
+            self.layouts.append((export, self.columns, self.dtypes, self.rows))
+
+        for col, (ids, values) in part['deltas'].items():
+            self._set_values(col, ids, values)
+            if values.dtype.kind not in 'iufb':
+                continue  # 成長曲線只索引數值欄位
+            self.curves.setdefault(col, _PostIndex()).append(export, ids, values)
+        if part['deltas']:
+            self.changes.append((export, part['deltas']))
+
+    def _set_values(self, col, ids, values):
+        dtype, fill = _fill_value(values.dtype)
+        state = self.values.get(col)
+        if state is not None and state.dtype != np.dtype(dtype):
+            state = state.astype(object)
+            dtype, fill = object, None
+        if state is None or len(state) < len(self.keys):
+            grown = np.full(len(self.keys), fill, dtype=dtype if state is None else state.dtype)
+            if state is not None:
+                grown[:len(state)] = state
+            state = grown
+        state[ids] = values
+        self.values[col] = state
+
+    def _update_presence(self, export, rows):
+        added = np.setdiff1d(rows, self.rows)
+        removed = np.setdiff1d(self.rows, rows)
+        self.presence.append(export, np.concatenate([added, removed]),
+                             np.r_[np.ones(len(added), dtype=np.int8), np.zeros(len(removed), dtype=np.int8)])
+
+    def frame(self, columns, dtypes, rows):
+        df = pd.DataFrame({col: self.values[col][rows] if col in self.values else [None] * len(rows)
+                           for col in columns})
+        for col in columns:
+            try:
+                df[col] = df[col].astype(dtypes[col])
+            except (TypeError, ValueError):
+                pass
+        return df
+
+
+class MetricHistory:
+    def __init__(self, history_dir=HISTORY_DIR):
+        self.history_dir = history_dir
+        self._lock = threading.Lock()
+        self._exports = []
+        self._sheets = {}
+
+    def _segment_path(self, export):
+        return os.path.join(self.history_dir, f'{export:06d}.pkl')
+
+    def refresh(self):
+        # 載入其他程序追加的區段（區段只會新增，不會修改）
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        while os.path.exists(self._segment_path(len(self._exports))):
+            segment = read_pickle(self._segment_path(len(self._exports)), None)
+            if segment is None:
+                break
+            self._apply(segment)
+
+    def _apply(self, segment):
+        export = segment['export']['id']
+        self._exports.append(segment['export'])
+        for name, part in segment['sheets'].items():
+            self._sheets.setdefault(name, _SheetHistory()).apply(export, part)
+
+    def record(self, fb_data, ig_data, fingerprint=None, exported_at=None):
+        # 追加一次匯出，內容相同（fingerprint 已記錄過）時不重複寫入；回傳匯出編號
+        with self._lock:
+            for _ in range(2):
+                self._refresh()
+                if fingerprint is not None:
+                    for export in self._exports:
+                        if export['fingerprint'] == fingerprint:
+                            return export['id']
+
+                export = {
+                    'id': len(self._exports),
+                    'fingerprint': fingerprint,
+                    'exported_at': exported_at if exported_at is not None else time.time(),
+                    'recorded_at': time.time()
+                }
+                sheets = {}
+                current = {('FB', sheet): df for sheet, df in fb_data.items()}
+                current.update({('IG', sheet): df for sheet, df in ig_data.items()})
+                for name, data in current.items():
+                    # 工作表可以是 DataFrame，或是每次呼叫都重新產生資料列區塊的函式
+                    chunks = data() if callable(data) else [data]
+                    sheets[name] = self._sheets.get(name, _SheetHistory()).diff(chunks, name[0])
+                # 已不存在的工作表視為沒有任何貼文
+                for name, history in self._sheets.items():
+                    if name not in current and len(history.rows):
+                        sheets[name] = {'new_keys': [], 'columns': None, 'dtypes': None,
+                                        'rows': (0, np.array([], dtype=np.int32)), 'deltas': {}}
+                segment = {'export': export, 'sheets': sheets}
+
+                if self._write_segment(export['id'], segment):
+                    self._apply(segment)
+                    return export['id']
+        return None
+
+    def _write_segment(self, export, segment):
+        # 先寫暫存檔再以 hard link 建立區段，其他程序已寫入同一編號時回傳 False 重新比對
+        path = self._segment_path(export)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        write_pickle(tmp_path, segment)
+        try:
+            os.link(tmp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def exports(self):
+        with self._lock:
+            return list(self._exports)
+
+    def _resolve_export(self, export):
+        if not self._exports:
+            raise KeyError('尚無歷史紀錄')
+        if export is None:
+            return len(self._exports) - 1
+        if not 0 <= export < len(self._exports):
+            raise KeyError(f'找不到匯出紀錄: {export}')
+        return export
+
+    def _sheet(self, platform, sheet):
+        history = self._sheets.get((platform, sheet))
+        if history is None:
+            raise KeyError(f'找不到工作表歷史: {platform}/{sheet}')
+        return history
+
+    def as_of(self, platform, sheet, export=None):
+        # 還原指定匯出當時的工作表；最新一次直接使用目前狀態，較早的則重播到該次為止
+        with self._lock:
+            export = self._resolve_export(export)
+            history = self._sheet(platform, sheet)
+            if not history.layouts or history.layouts[0][0] > export:
+                raise KeyError(f'{platform}/{sheet} 在匯出 {export} 時不存在')
+            if export == len(self._exports) - 1:
+                return history.frame(history.columns, history.dtypes, history.rows)
+
+            _, columns, dtypes, rows = [layout for layout in history.layouts if layout[0] <= export][-1]
+            replay = _SheetHistory()
+            replay.keys = history.keys
+            for change_export, deltas in history.changes:
+                if change_export > export:
+                    break
+                for col, (ids, values) in deltas.items():
+                    replay._set_values(col, ids, values)
+            return replay.frame(columns, dtypes, rows)
+
+    def posts(self, platform, sheet):
+        # 最新一次匯出中的貼文鍵值，依工作表列順序
+        with self._lock:
+            history = self._sheets.get((platform, sheet))
+            if history is None:
+                return []
+            return [history.keys[post] for post in history.rows.tolist()]
+
+    def growth(self, platform, sheet, post, metric):
+        # 貼文在每次出現的匯出中的指標值：只讀取該貼文的變動點與存在區間
+        with self._lock:
+            history = self._sheet(platform, sheet)
+            post_id = history.ids.get(post)
+            if post_id is None:
+                raise KeyError(f'找不到貼文: {post}')
+            curve = history.curves.get(metric)
+            change_exports, points = curve.lookup(post_id) if curve is not None else ([], [])
+            exports = []
+            start = None
+            for export, appeared in zip(*history.presence.lookup(post_id)):
+                if appeared:
+                    start = export
+                else:
+                    exports.extend(range(start, export))
+                    start = None
+            if start is not None:
+                exports.extend(range(start, len(self._exports)))
+            positions = np.searchsorted(change_exports, exports, side='right') - 1
+            return pd.DataFrame({
+                '匯出': exports,
+                '匯出時間': pd.to_datetime([self._exports[export]['exported_at'] for export in exports], unit='s'),
+                metric: [points[i] if i >= 0 else None for i in positions]
+            })
+
+
+def snapshot_exported_at(snapshot):
+    # 以活頁簿的修改時間作為匯出時間，沒有來源檔案時使用載入時間
+    if snapshot.source is not None:
+        times = [signature[0] for signature in snapshot.source[1] if signature is not None]
+        if times:
+            return max(times) / 1e9
+    return snapshot.loaded_at
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                history = MetricHistory()
+                history.refresh()
+                _history = history
+    return _history
+
+
+def _store_chunks(store, platform, sheet, schema):
+    # 先產生欄位結構（工作表可能沒有資料列），再依序從後端讀取資料列區塊
+    return lambda: itertools.chain([schema], store.iter_chunks(platform, sheet, HISTORY_CHUNKSIZE))
+
+
+def record_snapshot(snapshot):
+    try:
+        # 透過快照的後端分批讀取工作表（使用 SQLite 時快照本身沒有資料列），不需一次取出完整工作表
+        fb_data = {sheet: _store_chunks(snapshot.store, 'FB', sheet, schema.iloc[:0])
+                   for sheet, schema in snapshot.fb_data.items()}
+        ig_data = {sheet: _store_chunks(snapshot.store, 'IG', sheet, schema.iloc[:0])
+                   for sheet, schema in snapshot.ig_data.items()}
+        return get_history().record(fb_data, ig_data, snapshot.fingerprint, snapshot_exported_at(snapshot))
+    except Exception as e:
+        print(f"歷史紀錄錯誤: {str(e)}")
+        return None
+
+
+def post_label(key):
+    # 下拉選單顯示用：鍵值為「網址|日期|時間」
+    return ' '.join(part for part in key.split('|') if part not in ('', 'nan', 'NaT'))
@@ -0,0 +1,242 @@
+import hashlib
+import json
+
+import pandas as pd
+from flask import Blueprint, Response, request
+
+from data_store import VersionedCache, cache_stats, category_columns, date_columns, get_snapshot, hour_columns
+from metric_history import get_history
+from storage import AGGREGATIONS, MemoryStore
+
+# 唯讀 JSON API：提供與儀錶板相同的統計數據，回應以數據內容雜湊產生 ETag
+
+metrics_api = Blueprint('metrics_api', __name__, url_prefix='/api/v1')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+_RESERVED_PARAMS = {'fields', 'offset', 'limit', 'start', 'end', 'as_of'}
+
+_body_cache = VersionedCache(maxsize=256, name='api')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_response(payload, status=200, etag=None):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    response = Response(body, status=status, mimetype='application/json')
+    if etag is not None:
+        response.set_etag(etag)
+        # 允許快取但每次都需重新驗證，輪詢時以 304 回應
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _frame_records(df):
+    # 透過 pandas 序列化處理日期與 NaN
+    return json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+
+
+def _get_sheet(snapshot, platform, sheet):
+    # 回傳 (查詢後端, 欄位結構)；as_of=匯出編號 時改從指標歷史還原當時的工作表
+    if request.args.get('as_of') is not None:
+        export = _int_param('as_of', None)
+        try:
+            df = get_history().as_of(platform, sheet, export)
+        except KeyError as e:
+            raise ApiError(str(e.args[0]), status=404)
+        store = MemoryStore({sheet: df}, {}) if platform == 'FB' else MemoryStore({}, {sheet: df})
+        return store, df.iloc[:0]
+    sheets = {'FB': snapshot.fb_data, 'IG': snapshot.ig_data}.get(platform)
+    if sheets is None or sheet not in sheets:
+        raise ApiError(f'找不到工作表: {platform}/{sheet}', status=404)
+    return snapshot.store, sheets[sheet]
+
+
+def _split_list(value):
+    return [item for item in (value or '').split(',') if item]
+
+
+def _check_columns(df, columns):
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ApiError(f'欄位不存在: {", ".join(missing)}')
+    return columns
+
+
+def _int_param(name, default, minimum=0, maximum=None):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(f'{name} 必須是整數')
+    if number < minimum or (maximum is not None and number > maximum):
+        raise ApiError(f'{name} 超出範圍')
+    return number
+
+
+def _filters(schema, platform):
+    # 欄位名稱的查詢參數視為等值篩選，start/end 篩選日期欄位；交由後端執行
+    filters = []
+    for name in request.args:
+        if name in _RESERVED_PARAMS or name in ('by', 'metrics', 'agg'):
+            continue
+        _check_columns(schema, [name])
+        filters.append((name, 'in', request.args.getlist(name)))
+
+    date_col = date_columns[platform]
+    for name, op in (('start', '>='), ('end', '<=')):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        if date_col not in schema.columns:
+            raise ApiError(f'此工作表沒有日期欄位: {date_col}')
+        try:
+            bound = pd.Timestamp(value)
+        except ValueError:
+            raise ApiError(f'{name} 日期格式錯誤')
+        filters.append((date_col, op, bound))
+    return filters
+
+
+def _schema(snapshot, platform, sheet):
+    store, df = _get_sheet(snapshot, platform, sheet)
+    numeric = set(df.select_dtypes('number').columns)
+    dimensions = [col for col in (category_columns[platform], hour_columns[platform], date_columns[platform])
+                  if col in df.columns]
+    return {
+        'platform': platform,
+        'sheet': sheet,
+        'rows': store.count(platform, sheet),
+        'columns': [{'name': col, 'dtype': str(df[col].dtype), 'numeric': col in numeric} for col in df.columns],
+        'dimensions': dimensions
+    }
+
+
+def _aggregate(snapshot, platform, sheet):
+    store, df = _get_sheet(snapshot, platform, sheet)
+    by = request.args.get('by')
+    if not by:
+        raise ApiError('缺少 by 參數')
+    _check_columns(df, [by])
+
+    agg = request.args.get('agg', 'count')
+    if agg not in AGGREGATIONS:
+        raise ApiError(f'agg 必須是 {", ".join(AGGREGATIONS)} 其中之一')
+
+    filters = _filters(df, platform)
+    if agg == 'count':
+        # 與圓餅圖相同：依數量由多到少排序
+        result = store.aggregate(platform, sheet, by, 'count', filters=filters)
+        metrics = ['count']
+    else:
+        # 與排行榜相同，預設指標不含編號欄位
+        numeric = list(df.select_dtypes('number').columns)
+        metrics = _split_list(request.args.get('metrics')) or [col for col in numeric if col not in (by, '編號')]
+        _check_columns(df, metrics)
+        non_numeric = [col for col in metrics if col not in numeric]
+        if non_numeric:
+            raise ApiError(f'{agg} 只能用於數值欄位: {", ".join(non_numeric)}')
+        result = store.aggregate(platform, sheet, by, agg, metrics, filters)
+
+    return {
+        'platform': platform,
+        'sheet': sheet,
+        'by': by,
+        'agg': agg,
+        'metrics': metrics,
+        'groups': _frame_records(result)
+    }
+
+
+def _rows(snapshot, platform, sheet):
+    store, df = _get_sheet(snapshot, platform, sheet)
+    fields = _check_columns(df, _split_list(request.args.get('fields')))
+    offset = _int_param('offset', 0)
+    limit = _int_param('limit', DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+
+    page, total = store.page(platform, sheet, offset, limit, fields or None, _filters(df, platform))
+
+    return {
+        'platform': platform,
+        'sheet': sheet,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < total else None,
+        'rows': _frame_records(page)
+    }
+
+
+def _sheets(snapshot):
+    return {
+        'platforms': {
+            'FB': list(snapshot.fb_data.keys()),
+            'IG': list(snapshot.ig_data.keys())
+        }
+    }
+
+
+def _conditional(build):
+    # ETag 只取決於數據內容雜湊與請求內容，未變動時不需計算即可回應 304
+    # version 是各程序各自遞增的計數，多個 worker 之間同一個編號可能代表不同數據，不能用於 ETag
+    snapshot = get_snapshot()
+    query = sorted(request.args.items(multi=True))
+    key = (request.path, tuple(query))
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+    etag = f'{snapshot.fingerprint[:16]}-{digest}' if snapshot.fingerprint else None
+
+    if etag is not None and request.if_none_match.contains(etag):
+        return _json_response(b'', status=304, etag=etag)
+
+    def compute():
+        payload = build(snapshot)
+        payload['data_version'] = snapshot.version
+        payload['data_fingerprint'] = snapshot.fingerprint
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    try:
+        body = _body_cache.get_or_compute(snapshot.version, key, compute)
+    except ApiError as e:
+        return _json_response({'error': str(e)}, status=e.status)
+    return _json_response(body, etag=etag)
+
+
+@metrics_api.route('/sheets')
+def list_sheets():
+    return _conditional(_sheets)
+
+
+@metrics_api.route('/<platform>/<sheet>/schema')
+def sheet_schema(platform, sheet):
+    return _conditional(lambda snapshot: _schema(snapshot, platform, sheet))
+
+
+@metrics_api.route('/<platform>/<sheet>/aggregate')
+def sheet_aggregate(platform, sheet):
+    return _conditional(lambda snapshot: _aggregate(snapshot, platform, sheet))
+
+
+@metrics_api.route('/<platform>/<sheet>/rows')
+def sheet_rows(platform, sheet):
+    return _conditional(lambda snapshot: _rows(snapshot, platform, sheet))
+
+
+@metrics_api.route('/history/exports')
+def list_exports():
+    # 歷史紀錄在發布後於背景追加，不使用 ETag 以免取得尚未更新的清單
+    exports = [{'id': export['id'], 'exported_at': export['exported_at'], 'fingerprint': export['fingerprint']}
+               for export in get_history().exports()]
+    return _json_response({'exports': exports})
+
+
+@metrics_api.route('/cache-stats')
+def get_cache_stats():
+    # 各快取的命中、計算與合併（等待其他請求結果）次數，不使用 ETag
+    return _json_response({'data_version': get_snapshot().version, 'caches': cache_stats()})
@@ -1,10 +1,58 @@
+import hashlib
+import importlib
+import os
+import threading
+import time
+
+# 啟動分析模式（SOCIAL_DASH_PROFILE_STARTUP=1）：列出匯入與初始化各階段的耗時
+PROFILE_STARTUP = os.environ.get('SOCIAL_DASH_PROFILE_STARTUP') == '1'
+_startup_timings = []
+_startup_clock = time.perf_counter()
+
+def _startup_phase(name):
+    global _startup_clock
+    now = time.perf_counter()
+    _startup_timings.append((name, now - _startup_clock))
+    _startup_clock = now
+
+def startup_timings():
+    return list(_startup_timings)
+
 import dash
-from dash import dcc, html, dash_table
+from dash import Patch, dcc, html, dash_table
 from dash.dependencies import Input, Output, State
+_startup_phase('匯入 dash')
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import os
 import plotly.graph_objects as go
+_startup_phase('匯入 pandas / plotly')
+from box_stats import box_figure
+from chart_data import SHORT_NAME_LENGTH, ChartData
+from data_store import VersionedCache, ensure_data_watcher, get_snapshot, reload_data, subscribe
+from figure_cache import PickleStore, UsageTracker
+from leaderboard import get_leaderboard_index, leaderboard_metrics
+from metric_history import HISTORY_ENABLED, get_history, post_label, record_snapshot
+from metrics_api import metrics_api
+from storage import short_labels
+from upload import UPLOAD_MAX_MB, job_status, submit_upload
+_startup_phase('匯入專案模組')
+
+class _LazyModule:
+    # 第一次使用時才匯入，避免啟動時就載入較慢的模組
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            start = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            if PROFILE_STARTUP:
+                print(f"[啟動分析] 延遲載入 {self._name}: {1000 * (time.perf_counter() - start):.1f} ms")
+        return getattr(self._module, attr)
+
+# plotly.express 延到第一次建立圖表時才載入
+px = _LazyModule('plotly.express')
 
 # 初始化Dash應用
 app = dash.Dash(__name__)
@@ -12,93 +60,38 @@ app = dash.Dash(__name__)
 # 獲取Flask伺服器
 server = app.server 
 
-# 讀取數據
-def load_data():
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        fb_path = os.path.join(current_dir, 'data', 'FB_all_data.xlsx')
-        ig_path = os.path.join(current_dir, 'data', 'IG_all_data.xlsx')
-        
-        if not os.path.exists(fb_path) or not os.path.exists(ig_path):
-            raise FileNotFoundError("數據文件不存在")
-            
-        fb_data = pd.read_excel(fb_path, sheet_name=None)
-        ig_data = pd.read_excel(ig_path, sheet_name=None)
-        
-        # 定義 IG 欄位名稱
-        ig_column_mapping = {
-            '圖文': {
-                '類別': '分類',
-                '發布日期': '張貼日期',
-                '發布時間': '張貼時間',
-                '發布時': '發布小時',
-                '永久連結': '發布網址',
-                '觸及人數': '觸及數量',
-                '按讚數': '按讚數量',
-                '分享': '分享數量',
-                '留言數': '留言數量',
-                '分享率': '分享率別'
-            },
-            '限時動態': {
-                '期間（秒）': '動態時間',
-                '發布日期': '張貼日期',
-                '發布時間': '張貼時間',
-                '發布時': '發布小時',
-                '觸及人數': '觸及數量',
-                '按讚數': '按讚數量',
-                '分享': '分享數量',
-                '分享率': '分享率別'
-            }
-        }
-        
-        # 統一處理所有數值列
-        numeric_cols = {
-            'FB': {
-                '貼文': ['觸及人數', '總點擊次數', '連結點擊次數', '心情', '留言', '分享'],
-                '影片': ['心情', '影片觀看 3 秒以上的次數', '觸及人數', '留言', '分享']
-            },
-            'IG': {
-                '圖文': ['觸及數量', '按讚數量', '分享數量', '留言數量', '珍藏次數', '分享率別']
-            }
-        }
-        
-        # 處理fb數據
-        for sheet_name in fb_data:
-            df = fb_data[sheet_name]
-            if sheet_name in numeric_cols['FB']:
-                for col in numeric_cols['FB'][sheet_name]:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # 處理日期
-            if '發布日期' in df.columns:
-                df['發布日期'] = pd.to_datetime(df['發布日期'], errors='coerce')
-        
-        # 處理IG數據
-        for sheet_name in ig_data:
-            df = ig_data[sheet_name]
-            
-            # 重新命名欄位
-            if sheet_name in ig_column_mapping:
-                df.rename(columns=ig_column_mapping[sheet_name], inplace=True)
-            
-            # 處理數值型columns
-            if sheet_name in numeric_cols['IG']:
-                for col in numeric_cols['IG'][sheet_name]:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # 處理日期列
-            if '張貼日期' in df.columns:
-                df['張貼日期'] = pd.to_datetime(df['張貼日期'], errors='coerce')
-        
-        return fb_data, ig_data
-        
-    except Exception as e:
-        print(f"數據加載錯誤: {str(e)}")
-        return {}, {}
+# 唯讀 JSON API（/api/v1）
+server.register_blueprint(metrics_api)
+
+# 圖表快取（依數據版本失效），預熱結果另存磁碟供新程序直接載入
+_pie_cache = VersionedCache(maxsize=16, name='pie')
+_graph_cache = VersionedCache(maxsize=256, name='graphs')
+_figure_store = PickleStore()
+
+# plotly 建立圖表時會用到共用的驗證器與樣板，並非執行緒安全（並行時偶爾拋出 Invalid value），
+# 背景預熱與請求執行緒建立圖表時都需取得此鎖
+_figure_lock = threading.RLock()
+_usage = UsageTracker()
+_usage.flush_at_exit()
+
+# 預熱時除了各工作表預設選項外，另外計算最常用的組合數
+WARM_TOP_N = 20
+WARMUP_ENABLED = os.environ.get('SOCIAL_DASH_WARMUP', '1') != '0'
+_warmup_done = threading.Event()
+
+# 圖表程式碼（含箱型圖與圖表彙總）變更後磁碟快取即失效
+_code_hash = hashlib.sha1()
+for _path in (os.path.abspath(__file__), *(os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                                          for name in ('box_stats.py', 'chart_data.py'))):
+    with open(_path, 'rb') as _f:
+        _code_hash.update(_f.read())
+_CODE_DIGEST = _code_hash.hexdigest()[:12]
 
-fb_data, ig_data = load_data()
+@server.before_request
+def _start_data_watcher():
+    ensure_data_watcher()
+
+_startup_phase('建立 Dash 應用')
 
 # 應用布局
 app.layout = html.Div(style={
@@ -264,6 +257,9 @@ app.layout = html.Div(style={
                 'height': '41vh',
                 'display': 'block'  # 默認顯示
             }, id='second-graph-container'),
+
+            # 記錄目前畫面上圖表對應的選項，只換指標時用來送出部分更新
+            dcc.Store(id='graph-inputs-store'),
         ], style={
             'width': 'calc(75% - 40px)',
             'float': 'left',
@@ -273,7 +269,85 @@ app.layout = html.Div(style={
         'display': 'flex',
         'margin': '0 20px'
     }),
+
+    # 貼文排行榜區域
+    html.Div([
+        html.H3('貼文排行榜', style={
+            'textAlign': 'center',
+            'color': '#225A3E',
+            'marginBottom': '15px'
+        }),
+        html.Div([
+            html.Div([
+                html.Label('排行指標：', style={'fontWeight': 'bold', 'marginRight': '10px'}),
+                dcc.Dropdown(id='leaderboard-metric-dropdown', style={'width': '200px'}),
+            ], style={'display': 'inline-block', 'marginRight': '20px'}),
+            html.Div([
+                html.Label('類別：', style={'fontWeight': 'bold', 'marginRight': '10px'}),
+                dcc.Dropdown(id='leaderboard-category-dropdown', placeholder='全部類別', style={'width': '200px'}),
+            ], style={'display': 'inline-block', 'marginRight': '20px'}),
+            html.Div([
+                html.Label('日期區間：', style={'fontWeight': 'bold', 'marginRight': '10px'}),
+                dcc.DatePickerRange(id='leaderboard-date-range', clearable=True, display_format='YYYY-MM-DD'),
+            ], style={'display': 'inline-block', 'marginRight': '20px'}),
+            html.Div([
+                html.Label('顯示筆數：', style={'fontWeight': 'bold', 'marginRight': '10px'}),
+                dcc.Input(id='leaderboard-n-input', type='number', min=1, max=100, value=10, style={'width': '80px'}),
+            ], style={'display': 'inline-block'}),
+        ], style={'display': 'flex', 'flexWrap': 'wrap', 'alignItems': 'flex-end', 'marginBottom': '15px'}),
+        html.Div([
+            html.Div([
+                html.H4('表現最佳'),
+                dash_table.DataTable(id='leaderboard-top-table', style_table={'overflowX': 'auto'},
+                                     style_cell={'textAlign': 'left', 'padding': '8px', 'maxWidth': '180px',
+                                                 'whiteSpace': 'normal', 'height': 'auto'},
+                                     style_header={'backgroundColor': '#f8f9fa', 'fontWeight': 'bold'})
+            ], style={'width': '49%'}),
+            html.Div([
+                html.H4('表現最差'),
+                dash_table.DataTable(id='leaderboard-bottom-table', style_table={'overflowX': 'auto'},
+                                     style_cell={'textAlign': 'left', 'padding': '8px', 'maxWidth': '180px',
+                                                 'whiteSpace': 'normal', 'height': 'auto'},
+                                     style_header={'backgroundColor': '#f8f9fa', 'fontWeight': 'bold'})
+            ], style={'width': '49%'}),
+        ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+    ], id='leaderboard-section', style={
+        'clear': 'both',
+        'padding': '20px',
+        'marginTop': '18px',
+        'backgroundColor': 'white',
+        'borderRadius': '5px',
+        'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
+    }),
     
+    # 貼文成長曲線區域：歷次匯出中同一貼文的指標變化
+    html.Div([
+        html.H3('貼文成長曲線', style={
+            'textAlign': 'center',
+            'color': '#225A3E',
+            'marginBottom': '15px'
+        }),
+        html.Div([
+            html.Div([
+                html.Label('貼文：', style={'fontWeight': 'bold', 'marginRight': '10px'}),
+                dcc.Dropdown(id='growth-post-dropdown', placeholder='輸入網址或日期搜尋貼文',
+                             style={'width': '420px'}),
+            ], style={'display': 'inline-block', 'marginRight': '20px'}),
+            html.Div([
+                html.Label('指標：', style={'fontWeight': 'bold', 'marginRight': '10px'}),
+                dcc.Dropdown(id='growth-metric-dropdown', style={'width': '200px'}),
+            ], style={'display': 'inline-block'}),
+        ], style={'display': 'flex', 'flexWrap': 'wrap', 'alignItems': 'flex-end', 'marginBottom': '15px'}),
+        dcc.Graph(id='growth-graph'),
+    ], id='growth-section', style={
+        'clear': 'both',
+        'padding': '20px',
+        'marginTop': '18px',
+        'backgroundColor': 'white',
+        'borderRadius': '5px',
+        'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
+    }),
+
     # 最下方數據表格區域
     html.Div([
         html.H3(id='data-title', style={
@@ -296,6 +370,26 @@ app.layout = html.Div(style={
             }
         ),
         dcc.Download(id='download-dataframe-csv'),
+        # 上傳新的匯出檔，背景解析與檢查後發布為新的數據版本
+        dcc.Upload(
+            id='upload-workbook',
+            children=html.Div(['拖放或點擊選擇 FB/IG 活頁簿（.xlsx）上傳新數據']),
+            multiple=True,
+            accept='.xlsx,.xlsm',
+            max_size=UPLOAD_MAX_MB * 1024 * 1024,
+            style={
+                'marginBottom': '10px',
+                'padding': '12px',
+                'border': '1px dashed #225A3E',
+                'borderRadius': '5px',
+                'textAlign': 'center',
+                'color': '#225A3E',
+                'cursor': 'pointer'
+            }
+        ),
+        html.Div(id='upload-status', style={'marginBottom': '10px', 'color': '#202020'}),
+        dcc.Store(id='upload-job'),
+        dcc.Interval(id='upload-poll', interval=1000, disabled=True),
         html.Div([
             dash_table.DataTable(
                 id='data-table',
@@ -321,6 +415,9 @@ app.layout = html.Div(style={
                 style_data={
                     'border': '1px solid #ddd'
                 },
+                # 由伺服器分頁，每次只傳送目前這一頁
+                page_action='custom',
+                page_current=0,
                 page_size=100  # 每頁顯示的行數
             )
         ], style={
@@ -365,6 +462,7 @@ app.layout = html.Div(style={
         'fontSize': '14px'
     })
 ])  # app.layout 的結束括號
+_startup_phase('建立版面')
 
 # 更新工作表選項
 @app.callback(
@@ -372,10 +470,11 @@ app.layout = html.Div(style={
     Input('platform-dropdown', 'value')
 )
 def update_sheet_options(platform):
+    snapshot = get_snapshot()
     if platform == 'FB':
-        return [{'label': sheet, 'value': sheet} for sheet in fb_data.keys()]
+        return [{'label': sheet, 'value': sheet} for sheet in snapshot.fb_data.keys()]
     else:
-        return [{'label': sheet, 'value': sheet} for sheet in ig_data.keys()]
+        return [{'label': sheet, 'value': sheet} for sheet in snapshot.ig_data.keys()]
 
 # 修改數據比對區域的顯示方式
 @app.callback(
@@ -530,7 +629,7 @@ def update_comparison_options(platform, sheet):
             # FB影片的選項
             first_x_options = [{'label': '心情', 'value': '心情'}]
             first_y_options = [
-                {'label': '3秒觀看數', 'value': '影片觀看 3 ��以上的次數'},
+                {'label': '3秒觀看數', 'value': '影片觀看 3 秒以上的次數'},
                 {'label': '觸及人數', 'value': '觸及人數'},
                 {'label': '留言', 'value': '留言'},
                 {'label': '分享', 'value': '分享'}
@@ -625,7 +724,43 @@ def update_graph_layout(platform, sheet):
 def update_pie_chart(platform, sheet):
     if not sheet:
         return {}
+
+    # 同一數據版本下圓餅圖結果固定，直接共用快取
+    snapshot = get_snapshot()
+    return _pie_cache.get_or_compute(
+        snapshot.version, (platform, sheet),
+        lambda: _pie_figure(snapshot, platform, sheet)
+    )
+
+def _figure_dict(fig):
+    return fig.to_plotly_json() if isinstance(fig, go.Figure) else fig
+
+def _pie_figure(snapshot, platform, sheet):
+    # 先由後端取得類別計數，只在建立圖表時持有 _figure_lock
+    category_counts = pie_counts(snapshot, platform, sheet)
+    with _figure_lock:
+        return _figure_dict(pie_figure(category_counts))
+
+def build_pie_chart(snapshot, platform, sheet):
+    return pie_figure(pie_counts(snapshot, platform, sheet))
+
+def pie_counts(snapshot, platform, sheet):
+    # 影片、限動與找不到的工作表沒有類別，回傳 None 顯示提示文字
+    if sheet in ['影片', '限動', '限時動態']:
+        return None
     
+    try:
+        # 根據平台選擇正確的數據和工作表名稱
+        # 由後端直接分組計數，不需取出整個工作表
+        if platform == 'FB' and sheet == '貼文':
+            return snapshot.store.value_counts(platform, sheet, '類別')
+        elif platform == 'IG' and sheet == '圖文':
+            return snapshot.store.value_counts(platform, sheet, '分類')
+    except KeyError:
+        pass
+    return None
+
+def pie_figure(category_counts):
     # 創建空白圖表（用於影片和限動）
     blank_fig = {
         'data': [],
@@ -652,158 +787,135 @@ def update_pie_chart(platform, sheet):
     }
     
     # 對於影片和限動數據，返回提示文字
-    if sheet in ['影片', '限動', '限時動態']:
+    if category_counts is None:
         return blank_fig
     
-    try:
-        # 根據平台選擇正確的數據和工作表名稱
-        if platform == 'FB' and sheet == '貼文':
-            df = fb_data[sheet]  # FB使用原始工作表名稱
-            category_counts = df['類別'].value_counts()
-        elif platform == 'IG' and sheet == '圖文':
-            df = ig_data[sheet]  # 直接使用 sheet 而不是 sheet_name
-            category_counts = df['分類'].value_counts()
-        
-        # 只顯示前10名，其餘歸類為"其他"
-        top_10 = category_counts.head(10)
-        if len(category_counts) > 10:
-            others = pd.Series({'其他': category_counts[10:].sum()})
-            category_counts = pd.concat([top_10, others])
-        
-        fig = px.pie(
-            values=category_counts.values,
-            names=category_counts.index,
-            title='各類別所占比例（前十名）'
-        )
-        fig.update_layout(
-            showlegend=True,
-            margin=dict(t=40, b=20, l=20, r=20),
-            height=300,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            title={
-                'x': 0.5,
-                'xanchor': 'center',
-                'yanchor': 'top'
-            }
-        )
-        fig.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            hovertemplate='%{label}<br>數量: %{value}<br>比例: %{percent}'
-        )
-        return fig
-    except KeyError:
-        # 如果找不到工作表，返回空白圖表
-        return blank_fig
+    # 只顯示前10名，其餘歸類為"其他"
+    top_10 = category_counts.head(10)
+    if len(category_counts) > 10:
+        others = pd.Series({'其他': category_counts[10:].sum()})
+        category_counts = pd.concat([top_10, others])
+    
+    fig = px.pie(
+        values=category_counts.values,
+        names=category_counts.index,
+        title='各類別所占比例（前十名）'
+    )
+    fig.update_layout(
+        showlegend=True,
+        margin=dict(t=40, b=20, l=20, r=20),
+        height=300,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        title={
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        }
+    )
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hovertemplate='%{label}<br>數量: %{value}<br>比例: %{percent}'
+    )
+    return fig
 
-# 修改原有的更新圖表回調函數 - 合併所有圖表更新
-@app.callback(
-    [Output('share-rate-graph', 'figure'),
-     Output('reach-graph', 'figure'),
-     Output('data-table', 'data'),
-     Output('data-table', 'columns'),
-     Output('data-title', 'children')],
-    [Input('platform-dropdown', 'value'),
-     Input('sheet-dropdown', 'value'),
-     Input('x-axis-dropdown', 'value'),
-     Input('y-axis-dropdown', 'value'),
-     Input('second-x-axis-dropdown', 'value'),
-     Input('second-y-axis-dropdown', 'value')]
-)
-def update_graphs_and_table(platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis):
-    try:
-        if not sheet or y_axis is None:
-            return dash.no_update, dash.no_update, [], [], ''
-        
-        df = fb_data[sheet] if platform == 'FB' else ig_data[sheet]
-        df = df.copy()
-        
-        platform_name = 'Facebook' if platform == 'FB' else 'Instagram'
-        title = f'{platform_name} - {sheet} 所有數據'
-        
-        share_fig = go.Figure()
-        reach_fig = go.Figure()
+# 依平台、工作表與軸選項建立兩張圖表（callback 與批次報表共用）
+# 長條圖、直方圖與熱力圖使用後端彙總好的數據，每個類別或分箱只傳一筆
+# 先向後端取得所有數據，只有建立 plotly 圖表時才持有 _figure_lock，查詢不會擋住其他請求的繪圖
+def build_graphs(data, platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis):
+    share_chart = go.Figure
+    reach_chart = go.Figure
+    
+    # Facebook 貼文的圖表邏輯
+    if platform == 'FB' and sheet == '貼文':
+        if x_axis == '發布日期':
+            share_df = data.frame(x_axis, y_axis)
+            share_chart = lambda: px.line(share_df, 
+                                          x=x_axis, 
+                                          y=y_axis,
+                                          title=f'{y_axis}趨勢圖')
+        elif x_axis == '發布時間':
+            share_df = data.totals(x_axis, y_axis)
+            share_chart = lambda: px.histogram(share_df, 
+                                               x=x_axis, 
+                                               y=y_axis,
+                                               color='發布時間',
+                                               title=f'{x_axis}與{y_axis}分布')
+        elif x_axis == '類別':
+            # 以類別簡稱分組加總
+            share_df = data.totals('類別', y_axis, short=True)
+            share_chart = lambda: px.bar(share_df, 
+                                         x='類別_簡稱', 
+                                         y=y_axis,
+                                         color='類別_簡稱',
+                                         title=f'{y_axis}的類別分布')
         
-        # Facebook 貼文的圖表邏輯
-        if platform == 'FB' and sheet == '貼文':
-            if x_axis == '發布日期':
-                share_fig = px.line(df, 
-                                  x=x_axis, 
-                                  y=y_axis,
-                                  title=f'{y_axis}趨勢圖')
-            elif x_axis == '發布時間':
-                share_fig = px.histogram(df, 
-                                       x=x_axis, 
-                                       y=y_axis,
-                                       color='發布時間',
-                                       title=f'{x_axis}與{y_axis}分布')
-            elif x_axis == '類別':
-                # 創建類別簡稱
-                df['類別_簡稱'] = df['類別'].apply(lambda x: str(x)[:5])
-                share_fig = px.bar(df, 
-                                 x='類別_簡稱', 
-                                 y=y_axis,
-                                 color='類別_簡稱',
-                                 title=f'{y_axis}的類別分布')
-            
-            # 第二張圖的邏輯
-            if second_x_axis == '心情':
-                reach_fig = px.scatter(df, 
-                                     x=second_x_axis, 
-                                     y=second_y_axis,
-                                     color_discrete_sequence=px.colors.qualitative.Alphabet_r,
-                                     title=f'{second_x_axis}與{second_y_axis}關係')
-            elif second_x_axis == '發布時間':
-                reach_fig = px.density_heatmap(df, 
+        # 第二張圖的邏輯
+        if second_x_axis == '心情':
+            reach_df = data.frame(second_x_axis, second_y_axis)
+            reach_chart = lambda: px.scatter(reach_df, 
                                              x=second_x_axis, 
                                              y=second_y_axis,
-                                             color_continuous_scale=px.colors.sequential.Inferno_r,
-                                             title=f'{second_x_axis}與{second_y_axis}分布熱力圖')
-            elif second_x_axis == '類別':
-                # 創建類別簡稱
-                df['類別_簡稱'] = df['類別'].apply(lambda x: str(x)[:5])
-                reach_fig = px.box(df, 
-                                 x='類別_簡稱', 
-                                 y=second_y_axis,
-                                 color='類別_簡稱',
-                                 title=f'{second_y_axis}的類別分布')
-
-        # Facebook 影片的圖表邏輯
-        elif platform == 'FB' and sheet == '影片':
-            # 第一張圖：心情散點圖
-            share_fig = px.scatter(df, x='心情', y=y_axis,
-                                 title=f'心情與{y_axis}關係圖')
+                                             color_discrete_sequence=px.colors.qualitative.Alphabet_r,
+                                             title=f'{second_x_axis}與{second_y_axis}關係')
+        elif second_x_axis == '發布時間':
+            heatmap = data.heatmap(second_x_axis, second_y_axis)
+            reach_chart = lambda: density_heatmap(heatmap, 
+                                                  x=second_x_axis, 
+                                                  y=second_y_axis,
+                                                  color_continuous_scale=px.colors.sequential.Inferno_r,
+                                                  title=f'{second_x_axis}與{second_y_axis}分布熱力圖')
+        elif second_x_axis == '類別':
+            # 箱型圖的統計值由後端分批計算，同一數據版本共用
+            stats, short_name = data.box_stats('類別', second_y_axis)
+            reach_chart = lambda: box_figure(stats, 
+                                             x=short_name, 
+                                             y=second_y_axis,
+                                             title=f'{second_y_axis}的類別分布')
+
+    # Facebook 影片的圖表邏輯
+    elif platform == 'FB' and sheet == '影片':
+        # 第一張圖：心情散點圖
+        share_df = data.frame('心情', y_axis)
+
+        def share_chart():
+            fig = px.scatter(share_df, x='心情', y=y_axis,
+                             title=f'心情與{y_axis}關係圖')
             
             # 添加對角線
-            x_range = [df['心情'].min(), df['心情'].max()]
-            share_fig.add_trace(
+            x_range = [share_df['心情'].min(), share_df['心情'].max()]
+            fig.add_trace(
                 go.Scatter(x=x_range, y=x_range,
                           mode='lines',
                           name='對角線',
                           line=dict(color='red', dash='dash'))
             )
-            
-            # 第二張圖：發布時間直方圖
-            reach_fig = px.histogram(df,
-                                   x='發布時間',
-                                   y=second_y_axis,
-                                   color='發布時間',
-                                   color_discrete_sequence=px.colors.qualitative.Set2,
-                                   title=f'發布時間與{second_y_axis}分布')
-            
-        # Facebook 限動的圖表邏輯
-        elif platform == 'FB' and sheet == '限動':
-            # 第一張圖：發布時間直方圖
-            share_fig = px.histogram(df,
-                                   x='發布時間',
-                                   y=y_axis,
-                                   color='發布時間',
-                                   title=f'發布時間與{y_axis}分布')
-            
-            # 第二張圖：顯示提示訊息（保持為獨立圖表）
-            reach_fig = go.Figure()
-            reach_fig.add_annotation(
+            return fig
+        
+        # 第二張圖：發布時間直方圖
+        reach_df = data.totals('發布時間', second_y_axis)
+        reach_chart = lambda: px.histogram(reach_df,
+                                           x='發布時間',
+                                           y=second_y_axis,
+                                           color='發布時間',
+                                           color_discrete_sequence=px.colors.qualitative.Set2,
+                                           title=f'發布時間與{second_y_axis}分布')
+        
+    # Facebook 限動的圖表邏輯
+    elif platform == 'FB' and sheet == '限動':
+        # 第一張圖：發布時間直方圖
+        share_df = data.totals('發布時間', y_axis)
+        share_chart = lambda: px.histogram(share_df,
+                                           x='發布時間',
+                                           y=y_axis,
+                                           color='發布時間',
+                                           title=f'發布時間與{y_axis}分布')
+        
+        # 第二張圖：顯示提示訊息（保持為獨立圖表）
+        def reach_chart():
+            fig = go.Figure()
+            fig.add_annotation(
                 text="無特殊交互事項",
                 xref="paper",
                 yref="paper",
@@ -812,32 +924,33 @@ def update_graphs_and_table(platform, sheet, x_axis, y_axis, second_x_axis, seco
                 showarrow=False,
                 font=dict(size=24, color='#666')
             )
-            reach_fig.update_layout(
+            fig.update_layout(
                 plot_bgcolor='white',
                 paper_bgcolor='white',
                 margin=dict(l=50, r=20, t=40, b=30),
                 height=400
             )
+            return fig
 
-        # Instagram 圖文的圖表邏輯
-        if platform == 'IG' and sheet == '圖文':
-            if x_axis == '發布小時':
-                share_fig = px.bar(df, 
-                                 x=x_axis, 
-                                 y=y_axis,
-                                 title=f'{x_axis}與{y_axis}分布')
-            elif x_axis == '分類':
-                # 創建類別簡稱
-                df['分類_簡稱'] = df['分類'].apply(lambda x: str(x)[:5])
-                share_fig = px.box(df, 
-                                 x='分類_簡稱', 
-                                 y=y_axis,
-                                 color='分類_簡稱',
-                                 title=f'{y_axis}的分類分布')
+    # Instagram 圖文的圖表邏輯
+    if platform == 'IG' and sheet == '圖文':
+        if x_axis == '發布小時':
+            share_df = data.totals(x_axis, y_axis)
+            share_chart = lambda: px.bar(share_df, 
+                                         x=x_axis, 
+                                         y=y_axis,
+                                         title=f'{x_axis}與{y_axis}分布')
+        elif x_axis == '分類':
+            stats, short_name = data.box_stats('分類', y_axis)
+            share_chart = lambda: box_figure(stats, 
+                                             x=short_name, 
+                                             y=y_axis,
+                                             title=f'{y_axis}的分類分布')
 
-            # 第二張圖保持空白或顯示其他資訊
-            reach_fig = go.Figure()
-            reach_fig.add_annotation(
+        # 第二張圖保持空白或顯示其他資訊
+        def reach_chart():
+            fig = go.Figure()
+            fig.add_annotation(
                 text="沒有需要交互的項目",
                 xref="paper",
                 yref="paper",
@@ -846,38 +959,45 @@ def update_graphs_and_table(platform, sheet, x_axis, y_axis, second_x_axis, seco
                 showarrow=False,
                 font=dict(size=24, color='#666')
             )
+            return fig
+
+    # Instagram 限時動態的圖表邏輯
+    elif platform == 'IG' and sheet == '限時動態':
+        # 第一張圖
+        if x_axis == '張貼時間':
+            share_df = data.totals(x_axis, y_axis)
+            share_chart = lambda: px.bar(share_df,
+                                         x=x_axis,
+                                         y=y_axis,
+                                         color='張貼時間',
+                                         color_discrete_sequence=px.colors.qualitative.Alphabet_r,
+                                         title=f'{x_axis}與{y_axis}分布')
+        elif x_axis == '觸及數量':
+            share_df = data.frame(x_axis, y_axis)
+            share_chart = lambda: px.scatter(share_df,
+                                             x=x_axis,
+                                             y=y_axis,
+                                             color_discrete_sequence = px.colors.qualitative.Alphabet_r,
+                                             title=f'{x_axis}與{y_axis}關係')
+        
+        # 第二張圖
+        heatmap = data.heatmap(second_x_axis, second_y_axis)
+        reach_chart = lambda: density_heatmap(heatmap,
+                                              x=second_x_axis,
+                                              y=second_y_axis,
+                                              color_continuous_scale=px.colors.sequential.Inferno_r,
+                                              title=f'{second_x_axis}與{second_y_axis}分布熱力圖')
 
-        # Instagram 限時動態的圖表邏輯
-        elif platform == 'IG' and sheet == '限時動態':
-            # 第一張圖
-            if x_axis == '張貼時間':
-                share_fig = px.bar(df,
-                                 x=x_axis,
+    # Facebook 影片的圖表邏輯部分
+    elif platform == 'FB' and sheet == '影片':
+        if x_axis == '心情':
+            share_df = data.frame(x_axis, y_axis)
+
+            def share_chart():
+                fig = px.scatter(share_df, 
+                                 x=x_axis, 
                                  y=y_axis,
-                                 color='張貼時間',
-                                 color_discrete_sequence=px.colors.qualitative.Alphabet_r,
-                                 title=f'{x_axis}與{y_axis}分布')
-            elif x_axis == '觸及數量':
-                share_fig = px.scatter(df,
-                                     x=x_axis,
-                                     y=y_axis,
-                                     color_discrete_sequence = px.colors.qualitative.Alphabet_r,
-                                     title=f'{x_axis}與{y_axis}關係')
-            
-            # 第二張圖
-            reach_fig = px.density_heatmap(df,
-                                         x=second_x_axis,
-                                         y=second_y_axis,
-                                         color_continuous_scale=px.colors.sequential.Inferno_r,
-                                         title=f'{second_x_axis}與{second_y_axis}分布熱力圖')
-
-        # Facebook 影片的圖表邏輯部分
-        elif platform == 'FB' and sheet == '影片':
-            if x_axis == '心情':
-                share_fig = px.scatter(df, 
-                                     x=x_axis, 
-                                     y=y_axis,
-                                     title=f'{x_axis}與{y_axis}關係')
+                                 title=f'{x_axis}與{y_axis}關係')
                 
                 # 根據Y軸選擇設置不同的範圍
                 x_range = [0, 600]  # X軸範圍固定
@@ -887,25 +1007,30 @@ def update_graphs_and_table(platform, sheet, x_axis, y_axis, second_x_axis, seco
                     y_range = [0, 40000]  # 3秒觀看數和觸及人數的Y軸範圍
                 
                 # 添加對角線
-                share_fig.add_trace(
+                fig.add_trace(
                     go.Scatter(x=x_range, 
                               y=y_range,
                               mode='lines',
                               name='對角線',
                               line=dict(color='red', dash='dash'))
                 )
-                share_fig.update_layout(
+                fig.update_layout(
                     xaxis_range=x_range,
                     yaxis_range=y_range
                 )
-            
-            # 第二張圖的邏輯保持不變
-            reach_fig = px.histogram(df,
-                                   x=second_x_axis,
-                                   y=second_y_axis,
-                                   color='發布時間',
-                                   color_discrete_sequence=px.colors.qualitative.Set2,
-                                   title=f'發布時間與{second_y_axis}分布')
+                return fig
+        
+        # 第二張圖的邏輯保持不變
+        reach_df = data.totals(second_x_axis, second_y_axis)
+        reach_chart = lambda: px.histogram(reach_df,
+                                           x=second_x_axis,
+                                           y=second_y_axis,
+                                           color='發布時間',
+                                           color_discrete_sequence=px.colors.qualitative.Set2,
+                                           title=f'發布時間與{second_y_axis}分布')
+
+    with _figure_lock:
+        share_fig, reach_fig = share_chart(), reach_chart()
 
         # 更新所有圖表的布局
         for fig in [share_fig, reach_fig]:
@@ -919,21 +1044,335 @@ def update_graphs_and_table(platform, sheet, x_axis, y_axis, second_x_axis, seco
                     'yanchor': 'top'
                 }
             )
+
+    return share_fig, reach_fig
+
+def density_heatmap(heatmap, x, y, **kwargs):
+    # 與 px.density_heatmap(df, x=x, y=y) 相同的圖表：y 的分箱（plotly.js 的自動分箱規則）與計數在後端完成
+    # （heatmap 為 ChartData.heatmap 的結果），明確指定分箱後 plotly 依分箱中心與筆數加總，得到與原始資料相同的格子
+    counts, bins = heatmap
+    if bins is None:
+        # 沒有後端分箱（日期或沒有數值）：counts 為原始資料列
+        return px.density_heatmap(counts, x=x, y=y, **kwargs)
+    fig = px.density_heatmap(counts, x=x, y=y, z='count', histfunc='sum', **kwargs)
+    fig.update_traces(ybins=bins)
+    fig.update_traces(hovertemplate=f'{x}=%{{x}}<br>{y}=%{{y}}<br>count=%{{z}}<extra></extra>')
+    fig.update_layout(coloraxis_colorbar_title_text='count')
+    return fig
+
+# 計算圖表與表格欄位（圖表轉為 dict，方便快取與寫入磁碟；表格資料列由分頁 callback 提供）
+def compute_graphs_and_table(snapshot, platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis):
+    schema = snapshot.fb_data[sheet] if platform == 'FB' else snapshot.ig_data[sheet]
+    data = ChartData(snapshot.store, platform, sheet, version=snapshot.version)
+
+    platform_name = 'Facebook' if platform == 'FB' else 'Instagram'
+    title = f'{platform_name} - {sheet} 所有數據'
+
+    share_fig, reach_fig = build_graphs(data, platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis)
+    with _figure_lock:
+        share_dict, reach_dict = _figure_dict(share_fig), _figure_dict(reach_fig)
+
+    # 表格欄位為工作表所有欄位，加上圖表產生的類別簡稱
+    columns = list(schema.columns) + [col for col in data.derived if col not in schema.columns]
+    return (share_dict, reach_dict, [{'name': i, 'id': i} for i in columns], title)
+
+# 修改原有的更新圖表回調函數 - 合併所有圖表更新
+@app.callback(
+    [Output('share-rate-graph', 'figure'),
+     Output('reach-graph', 'figure'),
+     Output('data-table', 'columns'),
+     Output('data-title', 'children'),
+     Output('graph-inputs-store', 'data')],
+    [Input('platform-dropdown', 'value'),
+     Input('sheet-dropdown', 'value'),
+     Input('x-axis-dropdown', 'value'),
+     Input('y-axis-dropdown', 'value'),
+     Input('second-x-axis-dropdown', 'value'),
+     Input('second-y-axis-dropdown', 'value')],
+    State('graph-inputs-store', 'data')
+)
+def update_graphs_and_table(platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis, previous=None):
+    try:
+        if not sheet or y_axis is None:
+            return dash.no_update, dash.no_update, [], '', None
         
-        return share_fig, reach_fig, df.to_dict('records'), [{'name': i, 'id': i} for i in df.columns], title
+        # 整個請求固定使用同一份快照，避免重新載入時讀到前後不一致的數據
+        snapshot = get_snapshot()
+        key = (platform, sheet, x_axis, y_axis, second_x_axis, second_y_axis)
+        result = _graph_cache.get_or_compute(
+            snapshot.version, key,
+            lambda: compute_graphs_and_table(snapshot, *key)
+        )
+        # 成功產生圖表且為選單提供的組合才記錄使用次數，請求送來的任意值不會累積在紀錄中
+        if _allowed_combination(key):
+            _usage.record(key)
+        store = {'version': snapshot.version, 'inputs': list(key)}
+
+        # 只換 Y 軸指標時送出部分更新，其餘情況整張圖重建
+        patched = _metric_only_update(snapshot, key, previous, result)
+        if patched is not None:
+            return patched + (store,)
+        return result + (store,)
         
     except Exception as e:
         print(f"Error in update_graphs_and_table: {str(e)}")
-        error_fig = go.Figure()
-        error_fig.add_annotation(
-            text=f"圖表生成錯誤: {str(e)}",
-            xref="paper",
-            yref="paper",
-            x=0.5,
-            y=0.5,
-            showarrow=False
-        )
-        return error_fig, error_fig, [], [], "錯誤"
+        with _figure_lock:
+            error_fig = go.Figure()
+            error_fig.add_annotation(
+                text=f"圖表生成錯誤: {str(e)}",
+                xref="paper",
+                yref="paper",
+                x=0.5,
+                y=0.5,
+                showarrow=False
+            )
+            error_fig = _figure_dict(error_fig)
+        return error_fig, error_fig, [], "錯誤", None
+
+def _allowed_combination(key):
+    # 各軸的值需在 update_comparison_options 提供的選項內；沒有選項的下拉選單值為 None
+    options = update_comparison_options(*key[:2])
+    for value, choices in zip(key[2:], (options[2], options[3], options[6], options[9])):
+        if value not in ([choice['value'] for choice in choices] or [None]):
+            return False
+    return True
+
+def _triggered_props():
+    try:
+        return set(dash.callback_context.triggered_prop_ids)
+    except Exception:
+        return set()  # 直接呼叫（非 Dash 請求）時沒有觸發資訊
+
+def _same_value(old, new):
+    try:
+        if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+            return np.array_equal(np.asarray(old), np.asarray(new))
+        return old == new
+    except Exception:
+        return False
+
+def _diff_figure(old, new, path, operations):
+    # 結構（鍵值）相同的 dict 往下比較，其餘不同的值整個取代
+    if isinstance(old, dict) and isinstance(new, dict) and old.keys() == new.keys():
+        for name in new:
+            _diff_figure(old[name], new[name], path + (name,), operations)
+    elif not _same_value(old, new):
+        operations.append((path, new))
+
+def _figure_patch(old, new):
+    # 軌跡數量、類型與屬性相同才能部分更新，否則回傳 None 改為整張重建
+    old_data, new_data = old.get('data', []), new.get('data', [])
+    if len(old_data) != len(new_data):
+        return None
+    if any(a.keys() != b.keys() or a.get('type') != b.get('type') for a, b in zip(old_data, new_data)):
+        return None
+
+    operations = []
+    for i, (a, b) in enumerate(zip(old_data, new_data)):
+        _diff_figure(a, b, ('data', i), operations)
+    _diff_figure(old.get('layout', {}), new.get('layout', {}), ('layout',), operations)
+
+    patch = Patch()
+    for path, value in operations:
+        target = patch
+        for name in path[:-1]:
+            target = target[name]
+        target[path[-1]] = value
+    return patch
+
+def _metric_only_update(snapshot, key, previous, result):
+    if not previous or previous.get('version') != snapshot.version:
+        return None
+    previous_key = tuple(previous.get('inputs') or ())
+    changed = [i for i, (a, b) in enumerate(zip(previous_key, key)) if a != b]
+    triggered = _triggered_props()
+    if changed == [3] and triggered == {'y-axis-dropdown.value'}:
+        figure_index = 0
+    elif changed == [5] and triggered == {'second-y-axis-dropdown.value'}:
+        figure_index = 1
+    else:
+        return None
+
+    previous_result = _graph_cache.get_or_compute(
+        snapshot.version, previous_key,
+        lambda: compute_graphs_and_table(snapshot, *previous_key)
+    )
+    # 表格欄位不同（例如多了類別簡稱）時仍需完整更新
+    if previous_result[2] != result[2]:
+        return None
+    # 軌跡結構改變（例如離群點數量不同）時只重送這一張圖
+    patch = _figure_patch(previous_result[figure_index], result[figure_index])
+
+    figures = [dash.no_update, dash.no_update]
+    figures[figure_index] = result[figure_index] if patch is None else patch
+    return (figures[0], figures[1], dash.no_update, dash.no_update)
+
+# 表格分頁：只向後端取出目前這一頁，類別簡稱欄位在取出後補上
+@app.callback(
+    [Output('data-table', 'data'),
+     Output('data-table', 'page_count'),
+     Output('data-table', 'page_current')],
+    [Input('platform-dropdown', 'value'),
+     Input('sheet-dropdown', 'value'),
+     Input('data-table', 'columns'),
+     Input('data-table', 'page_current'),
+     Input('data-table', 'page_size')]
+)
+def update_table_page(platform, sheet, columns, page_current, page_size):
+    snapshot = get_snapshot()
+    sheets = snapshot.fb_data if platform == 'FB' else snapshot.ig_data
+    if not sheet or sheet not in sheets or not columns:
+        return [], None, 0
+    try:
+        # 切換平台或工作表時回到第一頁
+        if _triggered_props() & {'platform-dropdown.value', 'sheet-dropdown.value'}:
+            page_current = 0
+        page_size = page_size or 100
+        schema = sheets[sheet]
+        names = [column['id'] for column in columns]
+        base = [name for name in names if name in schema.columns]
+        offset = (page_current or 0) * page_size
+        page, total = snapshot.store.page(platform, sheet, offset, page_size, base)
+        page_count = max(1, -(-total // page_size))
+        if offset >= total and total:
+            page_current = page_count - 1
+            page, _ = snapshot.store.page(platform, sheet, page_current * page_size, page_size, base)
+        page = page.copy()
+        for name in names:
+            if name.endswith('_簡稱') and name[:-len('_簡稱')] in page.columns:
+                page[name] = short_labels(page[name[:-len('_簡稱')]], SHORT_NAME_LENGTH)
+        return page.to_dict('records'), page_count, page_current or 0
+    except Exception as e:
+        print(f"表格分頁錯誤: {str(e)}")
+        return [], None, 0
+
+# 排行榜選項：依工作表列出可排行的指標、類別與日期範圍
+@app.callback(
+    [Output('leaderboard-metric-dropdown', 'options'),
+     Output('leaderboard-metric-dropdown', 'value'),
+     Output('leaderboard-category-dropdown', 'options'),
+     Output('leaderboard-category-dropdown', 'value'),
+     Output('leaderboard-date-range', 'min_date_allowed'),
+     Output('leaderboard-date-range', 'max_date_allowed'),
+     Output('leaderboard-date-range', 'start_date'),
+     Output('leaderboard-date-range', 'end_date')],
+    [Input('platform-dropdown', 'value'),
+     Input('sheet-dropdown', 'value')]
+)
+def update_leaderboard_options(platform, sheet):
+    try:
+        index = get_leaderboard_index(get_snapshot(), platform, sheet)
+    except KeyError:
+        return [], None, [], None, None, None, None, None
+
+    metric_options = [{'label': metric, 'value': metric} for metric in index.metrics]
+    category_options = [{'label': str(category), 'value': category} for category in index.categories]
+    min_date = max_date = None
+    first, last = index.date_extent()
+    if not pd.isna(first):
+        min_date, max_date = first.date(), last.date()
+    metric = index.metrics[0] if index.metrics else None
+    return metric_options, metric, category_options, None, min_date, max_date, None, None
+
+# 排行榜：查詢預先建立的排序索引，不對整個表格重新排序
+@app.callback(
+    [Output('leaderboard-top-table', 'data'),
+     Output('leaderboard-top-table', 'columns'),
+     Output('leaderboard-bottom-table', 'data'),
+     Output('leaderboard-bottom-table', 'columns')],
+    [Input('platform-dropdown', 'value'),
+     Input('sheet-dropdown', 'value'),
+     Input('leaderboard-metric-dropdown', 'value'),
+     Input('leaderboard-category-dropdown', 'value'),
+     Input('leaderboard-date-range', 'start_date'),
+     Input('leaderboard-date-range', 'end_date'),
+     Input('leaderboard-n-input', 'value')]
+)
+def update_leaderboard(platform, sheet, metric, category, start_date, end_date, n):
+    if not sheet or not metric:
+        return [], [], [], []
+    try:
+        index = get_leaderboard_index(get_snapshot(), platform, sheet)
+        n = int(n) if n else 10
+        tables = []
+        for bottom in (False, True):
+            rows = index.top(metric, n, category=category, start=start_date, end=end_date, bottom=bottom)
+            tables.append(rows.to_dict('records'))
+            tables.append([{'name': col, 'id': col} for col in rows.columns])
+        return tuple(tables)
+    except Exception as e:
+        print(f"排行榜錯誤: {str(e)}")
+        return [], [], [], []
+
+# 成長曲線的貼文選項上限：貼文可達數萬篇，只送出前幾筆或搜尋結果，其餘靠輸入文字搜尋
+GROWTH_POST_OPTIONS = 50
+
+def growth_post_options(platform, sheet, search=None, selected=None):
+    # 依標籤（網址、日期、時間）比對，保留目前選取的貼文讓下拉選單能顯示
+    text = (search or '').strip().lower()
+    options = []
+    found_selected = False
+    posts = get_history().posts(platform, sheet)
+    for post in posts:
+        if len(options) >= GROWTH_POST_OPTIONS:
+            break
+        label = post_label(post)
+        if not text or text in label.lower():
+            options.append({'label': label, 'value': post})
+            found_selected = found_selected or post == selected
+    if selected and not found_selected and selected in posts:
+        options.insert(0, {'label': post_label(selected), 'value': selected})
+    return options, posts
+
+# 成長曲線選項：最新一次匯出中的貼文與可追蹤的指標
+@app.callback(
+    [Output('growth-post-dropdown', 'options'),
+     Output('growth-post-dropdown', 'value'),
+     Output('growth-metric-dropdown', 'options'),
+     Output('growth-metric-dropdown', 'value')],
+    [Input('platform-dropdown', 'value'),
+     Input('sheet-dropdown', 'value'),
+     Input('growth-post-dropdown', 'search_value')],
+    State('growth-post-dropdown', 'value')
+)
+def update_growth_options(platform, sheet, search=None, selected=None):
+    snapshot = get_snapshot()
+    sheets = snapshot.fb_data if platform == 'FB' else snapshot.ig_data
+    if not sheet or sheet not in sheets:
+        return [], None, [], None
+
+    # 只有輸入搜尋文字時只更新貼文選項
+    if _triggered_props() == {'growth-post-dropdown.search_value'}:
+        options, _ = growth_post_options(platform, sheet, search, selected)
+        return options, dash.no_update, dash.no_update, dash.no_update
+
+    post_options, posts = growth_post_options(platform, sheet)
+    metrics = leaderboard_metrics(platform, sheet, sheets[sheet])
+    metric_options = [{'label': metric, 'value': metric} for metric in metrics]
+    return (post_options, posts[0] if posts else None,
+            metric_options, metrics[0] if metrics else None)
+
+# 成長曲線：由歷史索引直接取出該貼文的變動點，不需重播所有匯出
+@app.callback(
+    Output('growth-graph', 'figure'),
+    [Input('platform-dropdown', 'value'),
+     Input('sheet-dropdown', 'value'),
+     Input('growth-post-dropdown', 'value'),
+     Input('growth-metric-dropdown', 'value')]
+)
+def update_growth_graph(platform, sheet, post, metric):
+    if not sheet or not post or not metric:
+        return {}
+    try:
+        curve = get_history().growth(platform, sheet, post, metric)
+        with _figure_lock:
+            fig = go.Figure(go.Scatter(x=curve['匯出時間'], y=curve[metric], mode='lines+markers', name=metric))
+            fig.update_layout(title={'text': f'{metric}成長曲線'}, xaxis={'title': {'text': '匯出時間'}},
+                              yaxis={'title': {'text': metric}})
+            return _figure_dict(fig)
+    except Exception as e:
+        print(f"成長曲線錯誤: {str(e)}")
+        return {}
 
 # 添加下載功能的回調
 @app.callback(
@@ -948,12 +1387,146 @@ def download_data(n_clicks, platform, sheet):
         return dash.no_update
     
     try:
-        df = fb_data[sheet] if platform == 'FB' else ig_data[sheet]
-        return dcc.send_data_frame(df.to_csv, f"{platform}_{sheet}_data.csv", encoding='utf-8-sig', index=False)
+        snapshot = get_snapshot()
+
+        # 分批從後端取出並寫入，不需先組成整份 DataFrame
+        # 開頭寫入 BOM（與原本 utf-8-sig 編碼相同），Excel 才能正確顯示中文欄名
+        def write_csv(buffer):
+            buffer.write('\ufeff')
+            header = True
+            for chunk in snapshot.store.iter_chunks(platform, sheet):
+                chunk.to_csv(buffer, index=False, header=header)
+                header = False
+            if header:
+                snapshot.store.schema(platform, sheet).to_csv(buffer, index=False)
+
+        return dcc.send_string(write_csv, f"{platform}_{sheet}_data.csv")
     except Exception as e:
         print(f"下載錯誤: {str(e)}")
         return dash.no_update
 
+# 上傳活頁簿：請求只負責存檔並排入背景工作，之後由 Interval 輪詢進度
+_UPLOAD_STATES = {'queued': '等待解析…', 'parsing': '解析與檢查中…', 'publishing': '發布新數據中…'}
+
+def _upload_message(status):
+    if status['state'] == 'failed':
+        return html.Div([html.P('上傳失敗：', style={'margin': '0', 'color': '#c0392b'}),
+                         html.Ul([html.Li(message) for message in status['messages']])])
+    if status['state'] == 'done':
+        rows = '、'.join(f"{platform} {count} 筆" for platform, count in status['rows'].items())
+        return (f"已發布數據版本 {status['version']}（{rows}，解析 {status['seconds']:.1f} 秒），"
+                "重新選擇工作表即可查看")
+    return _UPLOAD_STATES[status['state']]
+
+@app.callback(
+    [Output('upload-status', 'children'),
+     Output('upload-poll', 'disabled'),
+     Output('upload-job', 'data'),
+     Output('upload-workbook', 'contents')],
+    [Input('upload-workbook', 'contents'),
+     Input('upload-poll', 'n_intervals')],
+    [State('upload-workbook', 'filename'),
+     State('upload-job', 'data')],
+    prevent_initial_call=True
+)
+def handle_upload(contents, n_intervals, filenames, job_id):
+    if contents and 'upload-workbook.contents' in _triggered_props():
+        try:
+            job_id = submit_upload(list(zip(filenames, contents)))
+        except Exception as e:
+            print(f"上傳錯誤: {str(e)}")
+            return f"上傳失敗：{str(e)}", True, None, None
+
+    status = job_status(job_id) if job_id else None
+    if status is None:
+        return dash.no_update, True, None, None
+    # 清空 contents，再次選擇同一個檔案時才會重新觸發
+    return _upload_message(status), status['state'] in ('done', 'failed'), job_id, None
+
+# 預熱的圖表組合：各工作表的預設選項與最常用的組合
+def _warm_keys(snapshot):
+    keys = []
+    for platform, sheets in (('FB', snapshot.fb_data), ('IG', snapshot.ig_data)):
+        for sheet in sheets:
+            keys.append(('pie', platform, sheet))
+            defaults = update_comparison_options(platform, sheet)
+            if defaults[4] is not None:
+                keys.append(('graphs', platform, sheet, defaults[1], defaults[4], defaults[7], defaults[10]))
+
+    for key in _usage.most_common(WARM_TOP_N):
+        platform, sheet = key[:2]
+        sheets = snapshot.fb_data if platform == 'FB' else snapshot.ig_data
+        if sheet in sheets and ('graphs',) + key not in keys:
+            keys.append(('graphs',) + key)
+    return keys
+
+def warm_caches(snapshot):
+    _warmup_done.clear()
+    try:
+        store_key = f'{snapshot.fingerprint}-{_CODE_DIGEST}' if snapshot.fingerprint else None
+        entries = _figure_store.load(store_key, {}) if store_key else {}
+
+        # 先放入磁碟上已計算好的結果，再補算缺少的組合
+        for key, value in entries.items():
+            cache = _pie_cache if key[0] == 'pie' else _graph_cache
+            cache.put(snapshot.version, key[1:], value)
+
+        computed = 0
+        for key in _warm_keys(snapshot):
+            if key in entries:
+                continue
+            if get_snapshot().version != snapshot.version:
+                return  # 已發布更新的數據，交給新的預熱處理
+            # 與請求共用 get_or_compute：預熱期間相同組合的請求等待同一份結果，不重複計算
+            try:
+                if key[0] == 'pie':
+                    value = _pie_cache.get_or_compute(snapshot.version, key[1:],
+                                                      lambda: _pie_figure(snapshot, *key[1:]))
+                else:
+                    value = _graph_cache.get_or_compute(snapshot.version, key[1:],
+                                                        lambda: compute_graphs_and_table(snapshot, *key[1:]))
+            except Exception as e:
+                print(f"預熱錯誤 {key}: {str(e)}")
+                continue
+            entries[key] = value
+            computed += 1
+
+        if computed and store_key:
+            _figure_store.save(store_key, entries)
+        _usage.flush()
+    except Exception as e:
+        print(f"預熱錯誤: {str(e)}")
+    finally:
+        _warmup_done.set()
+
+def wait_for_warmup(timeout=None):
+    return _warmup_done.wait(timeout)
+
+def _warm_on_publish(snapshot):
+    # 預熱在背景執行緒進行，不佔用請求路徑
+    threading.Thread(target=warm_caches, args=(snapshot,), name='cache-warmup', daemon=True).start()
+
+def _record_on_publish(snapshot):
+    # 每次發布的數據追加到指標歷史（內容相同時不重複記錄）
+    threading.Thread(target=record_snapshot, args=(snapshot,), name='metric-history', daemon=True).start()
+
+_startup_phase('註冊 callback')
+
+# 讀取數據（背景監控 data/*.xlsx，變動時以新快照替換，不需重啟）
+if WARMUP_ENABLED:
+    subscribe(_warm_on_publish)
+else:
+    _warmup_done.set()
+if HISTORY_ENABLED:
+    subscribe(_record_on_publish)
+reload_data()
+_startup_phase('載入數據')
+
+if PROFILE_STARTUP:
+    for _name, _seconds in _startup_timings:
+        print(f"[啟動分析] {_name}: {1000 * _seconds:.1f} ms")
+    print(f"[啟動分析] 合計: {1000 * sum(seconds for _, seconds in _startup_timings):.1f} ms")
+
 # 添加全局錯誤處理啟動
 app.config.suppress_callback_exceptions = True
 
@@ -0,0 +1,507 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# 數據存取後端：callback 與 API 透過相同的介面查詢工作表
+# MemoryStore 直接操作快照中的 DataFrame；SqliteStore 將數據匯入 SQLite，篩選、彙總與分頁都在 SQL 內完成
+#
+# 篩選條件為 (欄位, 運算子, 值) 的序列，運算子：
+#   'in'  欄位轉為字串後等於任一值
+#   '>='  '<='  '<'  與日期或數值比較（空值不符合）
+#
+# 圖表使用的彙總（totals、summary、histogram）依分組第一次出現的順序排列，與 plotly 依資料順序排列類別相同
+
+AGGREGATIONS = ('count', 'sum', 'mean', 'median', 'min', 'max')
+
+_SQL_AGGREGATES = {'sum': 'SUM', 'mean': 'AVG', 'min': 'MIN', 'max': 'MAX'}
+_COMPARISONS = {'>=': lambda col, v: col >= v, '<=': lambda col, v: col <= v, '<': lambda col, v: col < v}
+
+
+def short_labels(values, prefix):
+    # 分組值轉為字串後只取前幾個字；空值（None 或 NaN，SQLite 讀回時為 None）一律為 'nan'，與原本 str(x)[:prefix] 相同
+    return values.where(values.notna(), np.nan).apply(lambda x: str(x)[:prefix])
+
+
+def schema_frame(dtypes):
+    # 只有欄位與型別、沒有資料列的 DataFrame
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in dtypes})
+
+
+class MemoryStore:
+    def __init__(self, fb_data, ig_data):
+        self._sheets = {'FB': fb_data, 'IG': ig_data}
+
+    def _df(self, platform, sheet):
+        return self._sheets[platform][sheet]
+
+    def _filtered(self, platform, sheet, filters):
+        df = self._df(platform, sheet)
+        if not filters:
+            return df
+        mask = pd.Series(True, index=df.index)
+        for col, op, value in filters:
+            if op == 'in':
+                mask &= df[col].astype(str).isin(value)
+            else:
+                mask &= _COMPARISONS[op](df[col], value)
+        return df[mask] if not mask.all() else df
+
+    def schema(self, platform, sheet):
+        return self._df(platform, sheet).iloc[:0]
+
+    def count(self, platform, sheet, filters=()):
+        return len(self._filtered(platform, sheet, filters))
+
+    def frame(self, platform, sheet, columns=None, filters=()):
+        df = self._filtered(platform, sheet, filters)
+        return df[list(columns)] if columns is not None else df
+
+    def page(self, platform, sheet, offset, limit, columns=None, filters=()):
+        df = self._filtered(platform, sheet, filters)
+        page = df.iloc[offset:offset + limit]
+        return (page[list(columns)] if columns is not None else page), len(df)
+
+    def value_counts(self, platform, sheet, column, filters=()):
+        # 數量由多到少，同數量依第一次出現的順序（兩種後端結果一致）
+        counts = self._filtered(platform, sheet, filters)[column].value_counts(sort=False)
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def aggregate(self, platform, sheet, by, agg, metrics=(), filters=()):
+        if agg == 'count':
+            return self.value_counts(platform, sheet, by, filters).rename_axis(by).reset_index(name='count')
+        df = self._filtered(platform, sheet, filters)
+        return df.groupby(by)[list(metrics)].agg(agg).reset_index()
+
+    def totals(self, platform, sheet, by, metrics=(), prefix=None, filters=()):
+        # 各分組的加總；prefix 為分組值（轉為字串）只取前幾個字，沒有指標時只列出分組
+        df = self._filtered(platform, sheet, filters)
+        keys = short_labels(df[by], prefix) if prefix else df[by]
+        if not metrics:
+            return pd.DataFrame({by: keys.dropna().unique()})
+        return df[list(metrics)].groupby(keys.rename(by), sort=False).sum().reset_index()
+
+    def summary(self, platform, sheet, column):
+        values = pd.to_numeric(self._df(platform, sheet)[column], errors='coerce').to_numpy(dtype=float)
+        return _summary(len(values), values[~np.isnan(values)])
+
+    def histogram(self, platform, sheet, column, start, size, by=None):
+        df = self._df(platform, sheet)
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        codes, uniques = pd.factorize(df[by], sort=False) if by else (np.zeros(len(df), dtype=int), [None])
+        keep = ~np.isnan(values) & (codes >= 0)
+        bins = np.floor((values[keep] - start) / size + _BIN_ROUNDING).astype(np.int64)
+        counts = pd.DataFrame({'code': codes[keep], 'bin': bins}).value_counts().sort_index().reset_index()
+        result = pd.DataFrame({by: np.asarray(uniques, dtype=object)[counts['code']]}) if by else pd.DataFrame()
+        result['bin'] = counts['bin'].to_numpy()
+        result['count'] = counts['count'].to_numpy()
+        return result
+
+    def extent(self, platform, sheet, column):
+        series = self._df(platform, sheet)[column]
+        return series.min(), series.max()
+
+    def top(self, platform, sheet, metric, n, columns=None, filters=(), bottom=False):
+        # 數值由大到小，同分時依資料列順序；bottom 為整個順序反過來（與排行榜索引相同）
+        df = self._filtered(platform, sheet, filters)
+        values = pd.to_numeric(df[metric], errors='coerce').to_numpy(dtype=float)
+        positions = np.flatnonzero(~np.isnan(values))
+        order = positions[np.argsort(-values[positions], kind='stable')]
+        order = order[::-1][:n] if bottom else order[:n]
+        rows = df.iloc[order]
+        return rows[list(columns)] if columns is not None else rows
+
+    def iter_chunks(self, platform, sheet, chunksize=100000, columns=None):
+        df = self._df(platform, sheet)
+        if columns is not None:
+            df = df[list(columns)]
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+# 數值落在分箱邊界時的容許誤差（與 plotly.js 的 findBin 相同）
+_BIN_ROUNDING = 1e-9
+
+
+def _gap_tolerance(count, low, high):
+    # 與 plotly.js 的 distinctVals 相同：差距不超過（全距 / 筆數）的萬分之一視為同一個數值
+    return ((high - low) or 1) / ((count - 1) or 1) / 1e4
+
+
+def _summary(rows, values, min_gap=None):
+    # rows 為包含空值的總列數；min_gap 為相鄰不同數值大於容許誤差的最小差距（沒有時為 None）
+    if not len(values):
+        return {'rows': rows, 'count': 0}
+    if min_gap is None and len(values) > 1:
+        gaps = np.diff(np.unique(values))
+        gaps = gaps[gaps > _gap_tolerance(len(values), values.min(), values.max())]
+        min_gap = float(gaps.min()) if len(gaps) else None
+    return {
+        'rows': rows,
+        'count': len(values),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'integers': int((values % 1 == 0).sum()),
+        'min_gap': min_gap
+    }
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _group_term(column, filters):
+    # 有篩選條件時在分組欄位前加上 +，讓 SQLite 使用篩選欄位的索引，而不是掃過整個分組欄位的索引
+    return f'+{_quote(column)}' if filters else _quote(column)
+
+
+def _sql_value(value):
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+class SqliteStore:
+    # 一個資料庫檔可存放多份數據（以內容雜湊區分），每個工作表一個資料表
+    # 每個執行緒使用自己的連線，WAL 模式下讀取不會被匯入阻塞
+    def __init__(self, path, index_columns=None, keep=2):
+        self.path = path
+        self.index_columns = index_columns or {}
+        self.keep = keep
+        self._local = threading.local()
+        self._import_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS datasets ('
+                             'fingerprint TEXT, platform TEXT, sheet TEXT, tbl TEXT, rows INTEGER, '
+                             'columns TEXT, position INTEGER, imported_at REAL, '
+                             'PRIMARY KEY (fingerprint, platform, sheet))')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def connection(self):
+        # fork 出的子程序不可沿用父程序的連線
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    def has_dataset(self, fingerprint):
+        row = self.connection().execute('SELECT COUNT(*) FROM datasets WHERE fingerprint = ?',
+                                         (fingerprint,)).fetchone()
+        return row[0] > 0
+
+    def import_dataset(self, fingerprint, fb_data, ig_data, chunksize=50000):
+        # 先寫入資料表與索引，最後才登記到 datasets，匯入中途失敗不會被讀到
+        with self._import_lock:
+            if self.has_dataset(fingerprint):
+                return self.dataset(fingerprint)
+            conn = self._connect()
+            try:
+                entries = []
+                for platform, sheets in (('FB', fb_data), ('IG', ig_data)):
+                    for position, (sheet, df) in enumerate(sheets.items()):
+                        table = f'{fingerprint[:16]}:{platform}:{sheet}'
+                        self._write_table(conn, table, df, platform, chunksize)
+                        columns = json.dumps([[col, str(dtype)] for col, dtype in df.dtypes.items()],
+                                             ensure_ascii=False)
+                        entries.append((fingerprint, platform, sheet, table, len(df), columns, position, time.time()))
+                with conn:
+                    conn.executemany('INSERT INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?)', entries)
+                self._prune(conn, fingerprint)
+                conn.execute('ANALYZE')
+            finally:
+                conn.close()
+        return self.dataset(fingerprint)
+
+    def _write_table(self, conn, table, df, platform, chunksize):
+        conn.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+        columns = ', '.join(_quote(col) for col in df.columns)
+        conn.execute(f'CREATE TABLE {_quote(table)} ({columns})')
+        insert = f'INSERT INTO {_quote(table)} VALUES ({", ".join("?" * len(df.columns))})'
+        for start in range(0, len(df), chunksize):
+            chunk = df.iloc[start:start + chunksize]
+            with conn:
+                conn.executemany(insert, _rows(chunk))
+        # 日期、類別與發布小時是最常用的篩選與分組欄位
+        for col in self.index_columns.get(platform, ()):
+            if col in df.columns:
+                index = f'{table}:{col}'
+                conn.execute(f'CREATE INDEX {_quote(index)} ON {_quote(table)} ({_quote(col)})')
+        conn.commit()
+
+    def append_rows(self, fingerprint, platform, sheet, df):
+        # 直接附加資料列到既有的工作表（大量歷史數據分批匯入用）
+        dataset = self.dataset(fingerprint)
+        table = dataset.table(platform, sheet)
+        conn = self._connect()
+        try:
+            insert = f'INSERT INTO {_quote(table)} VALUES ({", ".join("?" * len(df.columns))})'
+            with conn:
+                conn.executemany(insert, _rows(df))
+                conn.execute('UPDATE datasets SET rows = rows + ? WHERE fingerprint = ? AND platform = ? AND sheet = ?',
+                             (len(df), fingerprint, platform, sheet))
+        finally:
+            conn.close()
+
+    def analyze(self):
+        # 大量附加資料列後更新統計資訊，讓查詢規劃選擇合適的索引
+        conn = self._connect()
+        try:
+            conn.execute('ANALYZE')
+        finally:
+            conn.close()
+
+    def _prune(self, conn, current):
+        # 只保留最近幾份數據，仍在使用舊快照的請求可以讀完
+        rows = conn.execute('SELECT fingerprint, MAX(imported_at) FROM datasets GROUP BY fingerprint '
+                            'ORDER BY MAX(imported_at) DESC').fetchall()
+        stale = [fingerprint for fingerprint, _ in rows[self.keep:] if fingerprint != current]
+        for fingerprint in stale:
+            tables = conn.execute('SELECT tbl FROM datasets WHERE fingerprint = ?', (fingerprint,)).fetchall()
+            with conn:
+                for (table,) in tables:
+                    conn.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+                conn.execute('DELETE FROM datasets WHERE fingerprint = ?', (fingerprint,))
+
+    def dataset(self, fingerprint):
+        rows = self.connection().execute(
+            'SELECT platform, sheet, tbl, rows, columns FROM datasets WHERE fingerprint = ? ORDER BY position',
+            (fingerprint,)).fetchall()
+        if not rows:
+            raise KeyError(f'找不到數據: {fingerprint}')
+        return SqliteDataset(self, {(platform, sheet): (table, count, json.loads(columns))
+                                    for platform, sheet, table, count, columns in rows})
+
+
+def _rows(df):
+    # 日期轉為 ISO 字串（可依字串排序與比較），其餘非基本型別轉為字串
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind == 'M':
+            converted[col] = series.dt.strftime('%Y-%m-%d %H:%M:%S').astype(object).where(series.notna(), None)
+        elif series.dtype.kind in 'iub':
+            converted[col] = series.astype(object)
+        elif series.dtype.kind == 'f':
+            converted[col] = series.astype(object).where(series.notna(), None)
+        else:
+            converted[col] = series.map(lambda v: v if v is None or isinstance(v, (str, int, float)) else str(v))
+            converted[col] = converted[col].where(series.notna(), None)
+    return zip(*(converted[col].tolist() for col in df.columns))
+
+
+class SqliteDataset:
+    # 綁定某一份數據的查詢介面（對應一個快照）
+    def __init__(self, store, sheets):
+        self.store = store
+        self._sheets = sheets
+
+    def sheets(self, platform):
+        return [sheet for (p, sheet) in self._sheets if p == platform]
+
+    def table(self, platform, sheet):
+        return self._sheets[(platform, sheet)][0]
+
+    def schema(self, platform, sheet):
+        return schema_frame(self._sheets[(platform, sheet)][2])
+
+    def _dtypes(self, platform, sheet):
+        return dict(self._sheets[(platform, sheet)][2])
+
+    def _where(self, platform, sheet, filters):
+        dtypes = self._dtypes(platform, sheet)
+        clauses, params = [], []
+        for col, op, value in filters:
+            if col not in dtypes:
+                raise KeyError(col)
+            if op == 'in':
+                values = list(value)
+                # 文字欄位直接比較才能使用索引，其他型別轉為文字後比較（與 MemoryStore 相同）
+                target = _quote(col) if dtypes[col] == 'object' else f'CAST({_quote(col)} AS TEXT)'
+                clauses.append(f'{target} IN ({", ".join("?" * len(values))})' if values else '0')
+                params.extend(values)
+            else:
+                clauses.append(f'{_quote(col)} {op} ?')
+                params.append(_sql_value(value))
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _query(self, sql, params, platform, sheet, restore=None):
+        df = pd.read_sql_query(sql, self.store.connection(), params=params)
+        return self._restore(df, platform, sheet, restore)
+
+    def _restore(self, df, platform, sheet, columns=None):
+        # SQLite 不保存 pandas 型別，依匯入時記錄的型別轉回
+        dtypes = self._dtypes(platform, sheet)
+        for col in (df.columns if columns is None else columns):
+            dtype = dtypes.get(col)
+            if dtype is None:
+                continue
+            if dtype.startswith('datetime64'):
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+            elif dtype != 'object' and df[col].dtype == object:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            elif dtype != 'object' and not (dtype.startswith('int') and df[col].isna().any()):
+                try:
+                    df[col] = df[col].astype(dtype)
+                except (TypeError, ValueError):
+                    pass
+        return df
+
+    def _select(self, platform, sheet, columns):
+        names = columns if columns is not None else [col for col, _ in self._sheets[(platform, sheet)][2]]
+        return ', '.join(_quote(col) for col in names) or 'NULL'
+
+    def count(self, platform, sheet, filters=()):
+        table, rows, _ = self._sheets[(platform, sheet)]
+        if not filters:
+            return rows
+        where, params = self._where(platform, sheet, filters)
+        return self.store.connection().execute(f'SELECT COUNT(*) FROM {_quote(table)}{where}', params).fetchone()[0]
+
+    def frame(self, platform, sheet, columns=None, filters=()):
+        table = self.table(platform, sheet)
+        where, params = self._where(platform, sheet, filters)
+        sql = f'SELECT {self._select(platform, sheet, columns)} FROM {_quote(table)}{where} ORDER BY rowid'
+        return self._query(sql, params, platform, sheet)
+
+    def page(self, platform, sheet, offset, limit, columns=None, filters=()):
+        table = self.table(platform, sheet)
+        select = self._select(platform, sheet, columns)
+        total = self.count(platform, sheet, filters)
+        if not filters:
+            # 沒有篩選時 rowid 連續，直接以範圍取得該頁，不需掃過前面的資料列
+            sql = f'SELECT {select} FROM {_quote(table)} WHERE rowid > ? AND rowid <= ? ORDER BY rowid'
+            return self._query(sql, [offset, offset + limit], platform, sheet), total
+        where, params = self._where(platform, sheet, filters)
+        sql = f'SELECT {select} FROM {_quote(table)}{where} ORDER BY rowid LIMIT ? OFFSET ?'
+        return self._query(sql, params + [limit, offset], platform, sheet), total
+
+    def value_counts(self, platform, sheet, column, filters=()):
+        # 與 MemoryStore 相同：數量由多到少，同數量依第一次出現的順序
+        table = self.table(platform, sheet)
+        where, params = self._where(platform, sheet, filters)
+        condition = f'{where} AND' if where else ' WHERE'
+        group = _group_term(column, filters)
+        sql = (f'SELECT {_quote(column)}, COUNT(*) AS __count FROM {_quote(table)}{condition} '
+               f'{group} IS NOT NULL GROUP BY {group} ORDER BY __count DESC, MIN(rowid)')
+        df = self._query(sql, params, platform, sheet, restore=[column])
+        return pd.Series(df['__count'].to_numpy(), index=pd.Index(df[column], name=column), name='count')
+
+    def aggregate(self, platform, sheet, by, agg, metrics=(), filters=()):
+        if agg == 'count':
+            counts = self.value_counts(platform, sheet, by, filters)
+            return counts.rename_axis(by).reset_index(name='count')
+        if agg not in _SQL_AGGREGATES:
+            # SQLite 沒有中位數函式，只取出需要的欄位在 pandas 計算
+            df = self.frame(platform, sheet, [by] + list(metrics), filters)
+            return df.groupby(by)[list(metrics)].agg(agg).reset_index()
+
+        table = self.table(platform, sheet)
+        where, params = self._where(platform, sheet, filters)
+        condition = f'{where} AND' if where else ' WHERE'
+        function = _SQL_AGGREGATES[agg]
+        # pandas 對全為空值的群組加總為 0
+        selects = [f'COALESCE(SUM({_quote(m)}), 0)' if agg == 'sum' else f'{function}({_quote(m)})' for m in metrics]
+        group = _group_term(by, filters)
+        sql = (f'SELECT {_quote(by)}, {", ".join(f"{s} AS {_quote(m)}" for s, m in zip(selects, metrics))} '
+               f'FROM {_quote(table)}{condition} {group} IS NOT NULL GROUP BY {group} ORDER BY {group}')
+        return self._query(sql, params, platform, sheet, restore=[by])
+
+    def totals(self, platform, sheet, by, metrics=(), prefix=None, filters=()):
+        # 與 MemoryStore 相同；空值轉為字串時為 'nan'
+        table = self.table(platform, sheet)
+        where, params = self._where(platform, sheet, filters)
+        if prefix:
+            key = f"COALESCE(substr(CAST({_quote(by)} AS TEXT), 1, {int(prefix)}), substr('nan', 1, {int(prefix)}))"
+            condition = where
+        else:
+            key = _group_term(by, filters)
+            condition = f'{where} AND {key} IS NOT NULL' if where else f' WHERE {key} IS NOT NULL'
+        selects = [f'{key} AS {_quote(by)}'] + [f'COALESCE(SUM({_quote(m)}), 0) AS {_quote(m)}' for m in metrics]
+        sql = (f'SELECT {", ".join(selects)} FROM {_quote(table)}{condition} '
+               f'GROUP BY {key} ORDER BY MIN(rowid)')
+        return self._query(sql, params, platform, sheet, restore=[] if prefix else [by])
+
+    def summary(self, platform, sheet, column):
+        table, rows, _ = self._sheets[(platform, sheet)]
+        conn = self.store.connection()
+        col = _quote(column)
+        numeric = f"typeof({col}) IN ('integer', 'real')"
+        count, low, high, mean, integers = conn.execute(
+            f'SELECT COUNT(*), MIN({col}), MAX({col}), AVG({col}), SUM({col} = CAST({col} AS INTEGER)) '
+            f'FROM {_quote(table)} WHERE {numeric}').fetchone()
+        if not count:
+            return _summary(rows, np.array([]))
+        variance = conn.execute(f'SELECT AVG(({col} - ?) * ({col} - ?)) FROM {_quote(table)} WHERE {numeric}',
+                                (mean, mean)).fetchone()[0]
+        # 不同數值之間的最小差距：只排序不重複的數值
+        min_gap = conn.execute(f'SELECT MIN(gap) FROM (SELECT {col} - LAG({col}) OVER (ORDER BY {col}) AS gap '
+                               f'FROM (SELECT DISTINCT {col} FROM {_quote(table)} WHERE {numeric})) WHERE gap > ?',
+                               (_gap_tolerance(count, low, high),)).fetchone()[0]
+        return {
+            'rows': rows,
+            'count': count,
+            'min': float(low),
+            'max': float(high),
+            'mean': float(mean),
+            'std': float(max(variance, 0) ** 0.5),
+            'integers': integers,
+            'min_gap': float(min_gap) if min_gap is not None else None
+        }
+
+    def histogram(self, platform, sheet, column, start, size, by=None):
+        # 分箱在 SQL 內計算，只回傳（分組, 分箱編號, 筆數）；分組依整個工作表中第一次出現的順序
+        table = _quote(self.table(platform, sheet))
+        col = _quote(column)
+        bins = f"CAST(({col} - ?) / ? + {_BIN_ROUNDING!r} AS INTEGER)"
+        numeric = f"typeof({col}) IN ('integer', 'real')"
+        if by is None:
+            sql = f'SELECT {bins} AS bin, COUNT(*) AS count FROM {table} WHERE {numeric} GROUP BY bin ORDER BY bin'
+        else:
+            key = _quote(by)
+            sql = (f'SELECT h.{key}, h.bin, h.count FROM ('
+                   f'SELECT {key}, {bins} AS bin, COUNT(*) AS count FROM {table} '
+                   f'WHERE {numeric} AND {key} IS NOT NULL GROUP BY {key}, bin) AS h '
+                   f'JOIN (SELECT {key}, MIN(rowid) AS first FROM {table} WHERE {key} IS NOT NULL GROUP BY {key}) AS f '
+                   f'ON h.{key} = f.{key} ORDER BY f.first, h.bin')
+        return self._query(sql, [float(start), float(size)], platform, sheet, restore=[by] if by else [])
+
+    def extent(self, platform, sheet, column):
+        table = self.table(platform, sheet)
+        sql = f'SELECT MIN({_quote(column)}) AS {_quote(column)} FROM {_quote(table)} UNION ALL ' \
+              f'SELECT MAX({_quote(column)}) FROM {_quote(table)}'
+        values = self._query(sql, [], platform, sheet)[column]
+        return values.iloc[0], values.iloc[1]
+
+    def top(self, platform, sheet, metric, n, columns=None, filters=(), bottom=False):
+        # 只保留前 n 筆的排序在 SQL 內完成，不需取出整個指標欄位
+        table = self.table(platform, sheet)
+        where, params = self._where(platform, sheet, filters)
+        numeric = f"typeof({_quote(metric)}) IN ('integer', 'real')"
+        condition = f'{where} AND {numeric}' if where else f' WHERE {numeric}'
+        order = f'{_quote(metric)} ASC, rowid DESC' if bottom else f'{_quote(metric)} DESC, rowid ASC'
+        sql = (f'SELECT {self._select(platform, sheet, columns)} FROM {_quote(table)}{condition} '
+               f'ORDER BY {order} LIMIT ?')
+        return self._query(sql, params + [int(n)], platform, sheet)
+
+    def iter_chunks(self, platform, sheet, chunksize=100000, columns=None):
+        table = self.table(platform, sheet)
+        sql = f'SELECT {self._select(platform, sheet, columns)} FROM {_quote(table)} ORDER BY rowid'
+        for chunk in pd.read_sql_query(sql, self.store.connection(), chunksize=chunksize):
+            yield self._restore(chunk, platform, sheet)
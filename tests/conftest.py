@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# 測試不啟動背景預熱、歷史紀錄與檔案監控，快取寫到暫存目錄
+os.environ.setdefault('SOCIAL_DASH_CACHE_DIR', tempfile.mkdtemp(prefix='social-dash-test-'))
+os.environ.setdefault('SOCIAL_DASH_WARMUP', '0')
+os.environ.setdefault('SOCIAL_DASH_HISTORY', '0')
+os.environ.setdefault('SOCIAL_DASH_WATCH_INTERVAL', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
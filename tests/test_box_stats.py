@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+
+from box_stats import box_figure
+from chart_data import ChartData
+from data_store import read_workbooks
+from storage import MemoryStore, SqliteStore, short_labels
+
+STATS = ('q1', 'median', 'q3', 'lowerfence', 'upperfence')
+
+
+def _frames():
+    fb_data, _ = read_workbooks()
+    yield fb_data['貼文'], '總點擊次數'
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(100, 10, 600)
+    values[::37] *= 5  # 離群點
+    values[::53] = np.nan
+    categories = rng.choice(np.array(['甲', '乙', '丙', np.nan], dtype=object), 600)
+    yield pd.DataFrame({'類別': categories, '觸及人數': values}), '觸及人數'
+
+
+def _stores(tmp_path, df):
+    yield MemoryStore({'貼文': df}, {})
+    yield SqliteStore(str(tmp_path / 'data.sqlite')).import_dataset('fp', {'貼文': df}, {})
+
+
+def _without_template(layout):
+    layout = dict(layout)
+    layout.pop('template', None)
+    return layout
+
+
+@pytest.mark.parametrize('df, y', list(_frames()))
+def test_box_figure_matches_px_box(tmp_path, df, y):
+    # 與原本以類別簡稱畫出的 px.box 相同（兩種後端）
+    reference_df = df.assign(類別_簡稱=short_labels(df['類別'], 5))
+    expected = px.box(reference_df, x='類別_簡稱', y=y, color='類別_簡稱', title='標題').to_plotly_json()
+    for store in _stores(tmp_path, df):
+        stats, x = ChartData(store, 'FB', '貼文').box_stats('類別', y)
+        _check_box_figure(box_figure(stats, x, y, '標題').to_plotly_json(), expected)
+
+
+def _check_box_figure(actual, expected):
+
+    assert _without_template(actual['layout']) == _without_template(expected['layout'])
+
+    boxes = [trace for trace in actual['data'] if trace['type'] == 'box']
+    points = {trace['name']: trace for trace in actual['data'] if trace['type'] == 'scatter'}
+    assert [trace['name'] for trace in boxes] == [trace['name'] for trace in expected['data']]
+
+    for box, reference in zip(boxes, expected['data']):
+        # 除了原始數據外，所有屬性與 px.box 相同（不會多出平均線）
+        for key, value in reference.items():
+            if key not in ('x', 'y'):
+                assert box[key] == value, key
+        assert set(box) - set(reference) <= set(STATS)
+        assert 'mean' not in box and 'boxmean' not in box
+
+        # 統計值與 plotly.js 預設的 linear 四分位數算法相同
+        values = np.sort(np.asarray(reference['y'], dtype=float))
+        values = values[~np.isnan(values)]
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75], method='hazen')
+        iqr = q3 - q1
+        lowerfence = min(q1, values[values >= q1 - 1.5 * iqr].min())
+        upperfence = max(q3, values[values <= q3 + 1.5 * iqr].max())
+        np.testing.assert_allclose([box[stat][0] for stat in STATS], [q1, median, q3, lowerfence, upperfence])
+
+        # 離群點與 px.box 會畫出的點相同，外觀與 hover 沿用箱型的設定
+        outliers = values[(values < lowerfence) | (values > upperfence)]
+        if len(outliers):
+            scatter = points[box['name']]
+            np.testing.assert_allclose(np.sort(scatter['y']), outliers)
+            assert scatter['marker'] == reference['marker']
+            assert scatter['hovertemplate'] == reference['hovertemplate']
+        else:
+            assert box['name'] not in points
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_data import ChartData, numeric_bins
+from storage import MemoryStore, SqliteStore
+
+
+def _sheet(rows=2000, seed=0):
+    # 含空值的類別與指標；第一筆的指標為空值，類別順序仍以它為準
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        '類別': rng.choice(np.array(['【問與答】', '【知識典故】', '【好話分享】', np.nan], dtype=object), rows),
+        '發布時': rng.integers(0, 24, rows),
+        '觸及人數': rng.integers(0, 5000, rows),
+        '分享率': np.where(rng.random(rows) < 0.2, np.nan, rng.gamma(2, 0.01, rows)),
+    })
+    df.loc[0, ['類別', '分享率']] = ['【好話分享】', np.nan]
+    df.loc[1, '類別'] = '【問與答】'
+    return df
+
+
+def _stores(tmp_path, df):
+    memory = MemoryStore({'貼文': df}, {})
+    sqlite = SqliteStore(str(tmp_path / 'data.sqlite')).import_dataset('fp', {'貼文': df}, {})
+    return memory, sqlite
+
+
+def test_backends_give_same_chart_data(tmp_path):
+    memory, sqlite = _stores(tmp_path, _sheet())
+    for column in ('觸及人數', '分享率'):
+        assert numeric_bins(memory, 'FB', '貼文', column, is2d=True) == \
+            numeric_bins(sqlite, 'FB', '貼文', column, is2d=True)
+
+    charts = [ChartData(store, 'FB', '貼文') for store in (memory, sqlite)]
+    for by, metric, short in (('類別', '觸及人數', True), ('發布時', '觸及人數', False), ('類別', '分享率', False)):
+        expected, actual = (data.totals(by, metric, short=short) for data in charts)
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False)
+
+    # 空值類別的簡稱與原本 str(x)[:5] 相同為 'nan'（SQLite 讀回的空值為 None）
+    assert 'nan' in list(charts[1].totals('類別', '觸及人數', short=True)['類別_簡稱'])
+    (expected, expected_short), (actual, actual_short) = (data.box_stats('類別', '觸及人數') for data in charts)
+    assert actual_short == expected_short
+    assert [stat['category'] for stat in actual] == [stat['category'] for stat in expected]
+    assert 'nan' in [stat['category'] for stat in actual]
+
+    (expected, expected_bins), (actual, actual_bins) = (data.heatmap('類別', '分享率') for data in charts)
+    assert actual_bins == expected_bins
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+    assert expected['類別'].iloc[0] == '【好話分享】'
+
+
+_N = np.arange(1000)
+# 各分布在 plotly.js 2.27.0（plotly.py 5.18 內附）histogram2d 算出的 ybins
+PLOTLY_BINS = [
+    ((_N * 7919) % 5000, {'start': -0.5, 'end': 4999.5, 'size': 1000}),
+    (_N[:300] % 7, {'start': -0.5, 'end': 6.5, 'size': 1}),
+    (np.tile([0, 3, 3, 250, 1e4, 1e4, 123456], 20), {'start': -0.5, 'end': 149999.5, 'size': 50000}),
+    (np.full(30, 42), {'start': 41.5, 'end': 42.5, 'size': 1}),
+    (np.full(10, 0.37), {'start': 0, 'end': 1, 'size': 1}),
+    (_N * 0.013 + (_N % 3) * 1e-3 - 4, {'start': -5, 'end': 9, 'size': 2}),
+    ((_N[:400] % 20) * 0.5, {'start': -2, 'end': 10, 'size': 2}),
+    (np.where(_N % 5 == 0, np.nan, (_N * 31) % 97 / 7), {'start': -1, 'end': 15, 'size': 2}),
+]
+
+
+@pytest.mark.parametrize('values, expected', PLOTLY_BINS)
+def test_numeric_bins_match_plotly(tmp_path, values, expected):
+    df = pd.DataFrame({'類別': np.resize(['甲', '乙', '丙'], len(values)), '觸及人數': values})
+    for store in _stores(tmp_path, df):
+        bins = numeric_bins(store, 'FB', '貼文', '觸及人數', is2d=True)
+        assert bins == pytest.approx(expected)
+
+
+def test_date_heatmap_is_binned_by_plotly(tmp_path):
+    # plotly.js 以月份分箱日期（例如 size 'M2'），後端不分箱，回傳原始資料列
+    df = pd.DataFrame({'類別': np.resize(['甲', '乙'], 100),
+                       '發布日期': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(100) * 3, unit='D')})
+    for store in _stores(tmp_path, df):
+        assert numeric_bins(store, 'FB', '貼文', '發布日期', is2d=True) is None
+        rows, bins = ChartData(store, 'FB', '貼文').heatmap('類別', '發布日期')
+        assert bins is None
+        pd.testing.assert_frame_equal(rows.reset_index(drop=True), df)
@@ -0,0 +1,132 @@
+import shutil
+import threading
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import data_store
+from data_store import VersionedCache, get_snapshot, publish_snapshot
+
+PUBLISHES = 300
+READERS = 4
+
+
+@pytest.fixture(autouse=True)
+def restore_snapshot():
+    # 測試發布的假數據不能留給其他測試模組
+    original = get_snapshot()
+    yield
+    publish_snapshot(original.fb_data, original.ig_data, source=original.source,
+                     fingerprint=original.fingerprint, store=original.store)
+
+
+def _publish(token):
+    # 每份快照的所有部分都帶同一個編號，讀到混合兩版的內容即代表撕裂讀取
+    fb = {'貼文': pd.DataFrame({'token': [token] * 50})}
+    ig = {'圖文': pd.DataFrame({'token': [token] * 20})}
+    return publish_snapshot(fb, ig, source=('test', token), fingerprint=str(token))
+
+
+def _check(snapshot):
+    token = int(snapshot.fingerprint)
+    assert snapshot.source == ('test', token)
+    assert set(snapshot.fb_data['貼文']['token']) == {token}
+    assert set(snapshot.ig_data['圖文']['token']) == {token}
+    assert set(snapshot.store.frame('FB', '貼文')['token']) == {token}
+    assert set(snapshot.store.value_counts('IG', '圖文', 'token').index) == {token}
+
+
+def _run_readers(target):
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        try:
+            target(stop)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    try:
+        for token in range(PUBLISHES):
+            if stop.is_set():
+                break
+            _publish(token)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_readers_never_see_torn_snapshots():
+    _publish(-1)
+
+    def read(stop):
+        last_version = 0
+        while not stop.is_set():
+            snapshot = get_snapshot()
+            # 版本只會前進，且同一份快照內容一致
+            assert snapshot.version >= last_version
+            last_version = snapshot.version
+            _check(snapshot)
+
+    _run_readers(read)
+
+
+def test_versioned_cache_never_serves_other_versions():
+    cache = VersionedCache(maxsize=4)
+    _publish(-1)
+
+    def read(stop):
+        while not stop.is_set():
+            snapshot = get_snapshot()
+            value = cache.get_or_compute(snapshot.version, 'key', lambda: snapshot.version)
+            assert value == snapshot.version
+
+    _run_readers(read)
+
+
+def test_versioned_cache_drops_entries_when_version_advances():
+    cache = VersionedCache(maxsize=4)
+    cache.put(1, 'a', 'v1')
+    assert cache.get(1, 'a') == 'v1'
+
+    # 新版本寫入時整份清空
+    cache.put(2, 'b', 'v2')
+    assert cache.get(1, 'a') is None
+    assert cache.get(2, 'a') is None
+    assert cache.stats()['size'] == 1
+
+    # 舊版本的請求晚到時不寫入、也不覆蓋新版本
+    cache.put(1, 'b', 'stale')
+    assert cache.get(2, 'b') == 'v2'
+    assert cache.get_or_compute(1, 'c', lambda: 'old') == 'old'
+    assert cache.get(2, 'c') is None
+
+    # 以新版本查詢時重新計算
+    assert cache.get_or_compute(3, 'b', lambda: 'v3') == 'v3'
+    assert cache.get(2, 'b') is None
+
+
+def test_reload_parses_in_worker_process(tmp_path, monkeypatch):
+    # 內容不同（重新存檔）的活頁簿：解析快取沒有，需完整解析
+    fb_path, ig_path = str(tmp_path / 'FB_all_data.xlsx'), str(tmp_path / 'IG_all_data.xlsx')
+    openpyxl.load_workbook(data_store.FB_PATH).save(fb_path)
+    shutil.copy(data_store.IG_PATH, ig_path)
+    publish_snapshot({}, {}, fingerprint='other')
+
+    def in_process(*paths):
+        raise AssertionError('服務程序內不應解析 Excel')
+
+    monkeypatch.setattr(data_store, 'read_workbooks', in_process)
+    snapshot = data_store.reload_data(fb_path, ig_path)
+    assert snapshot.fingerprint == data_store.content_fingerprint((fb_path, ig_path))
+    assert snapshot.source[0] == (fb_path, ig_path)
+    expected = pd.read_excel(data_store.FB_PATH, sheet_name='貼文')
+    assert len(snapshot.fb_data['貼文']) == len(expected)
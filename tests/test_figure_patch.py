@@ -0,0 +1,98 @@
+import copy
+import json
+
+import dash
+from dash import Patch
+from plotly.utils import PlotlyJSONEncoder
+
+import social_data_dash as dashboard
+from data_store import get_snapshot
+
+
+def _apply(figure, patch):
+    # 依 Dash 前端的方式套用 Assign 操作
+    figure = copy.deepcopy(figure)
+    for operation in patch.to_plotly_json()['operations']:
+        assert operation['operation'] == 'Assign'
+        *path, name = operation['location']
+        target = figure
+        for step in path:
+            target = target[step]
+        target[name] = operation['params']['value']
+    return figure
+
+
+def _dump(figure):
+    return json.dumps(figure, cls=PlotlyJSONEncoder, sort_keys=True)
+
+
+def _update(monkeypatch, key, previous_key, trigger):
+    monkeypatch.setattr(dashboard, '_triggered_props', lambda: {trigger})
+    previous = {'version': get_snapshot().version, 'inputs': list(previous_key)}
+    return dashboard.update_graphs_and_table(*key, previous=previous)
+
+
+def _full(snapshot, key):
+    # 與整張重建相同的結果（callback 已算過的組合直接取用快取）
+    return dashboard._graph_cache.get_or_compute(
+        snapshot.version, key, lambda: dashboard.compute_graphs_and_table(snapshot, *key))
+
+
+def _default_keys(snapshot):
+    for platform, sheets in (('FB', snapshot.fb_data), ('IG', snapshot.ig_data)):
+        for sheet in sheets:
+            options = dashboard.update_comparison_options(platform, sheet)
+            yield (platform, sheet, options[1], options[4], options[7], options[10]), options
+
+
+def test_metric_switch_patch_matches_full_rebuild(monkeypatch):
+    snapshot = get_snapshot()
+    patched = 0
+    for key, options in _default_keys(snapshot):
+        for index, figure_index, choices, trigger in ((3, 0, options[3], 'y-axis-dropdown.value'),
+                                                      (5, 1, options[9], 'second-y-axis-dropdown.value')):
+            for x_value in [option['value'] for option in (options[2] if index == 3 else options[6])] or [None]:
+                base = key[:index - 1] + (x_value,) + key[index:]
+                values = [option['value'] for option in choices]
+                for previous_value, value in zip(values, values[1:]):
+                    previous_key = base[:index] + (previous_value,) + base[index + 1:]
+                    new_key = base[:index] + (value,) + base[index + 1:]
+                    output = _update(monkeypatch, new_key, previous_key, trigger)
+                    previous = _full(snapshot, previous_key)[figure_index]
+                    expected = _full(snapshot, new_key)[figure_index]
+
+                    assert output[1 - figure_index] is dash.no_update
+                    assert output[2] is dash.no_update and output[3] is dash.no_update
+                    figure = output[figure_index]
+                    if isinstance(figure, Patch):
+                        patched += 1
+                        figure = _apply(previous, figure)
+                    assert _dump(figure) == _dump(expected), new_key
+    assert patched > 0
+
+
+def test_other_changes_rebuild_figures(monkeypatch):
+    snapshot = get_snapshot()
+    options = dashboard.update_comparison_options('FB', '貼文')
+    key = ('FB', '貼文', '發布日期', options[4], options[7], options[10])
+
+    # 換 X 軸：兩張圖與表格欄位都完整更新
+    output = _update(monkeypatch, ('FB', '貼文', '類別') + key[3:], key, 'x-axis-dropdown.value')
+    assert isinstance(output[0], dict) and isinstance(output[1], dict)
+    assert output[2] == _full(snapshot, ('FB', '貼文', '類別') + key[3:])[2]
+
+    # 換工作表
+    ig_options = dashboard.update_comparison_options('IG', '圖文')
+    ig_key = ('IG', '圖文', ig_options[1], ig_options[4], ig_options[7], ig_options[10])
+    output = _update(monkeypatch, ig_key, key, 'sheet-dropdown.value')
+    assert isinstance(output[0], dict) and output[3] == 'Instagram - 圖文 所有數據'
+
+    # Y 軸觸發但軌跡數量不同：只重送該張圖
+    new_key = key[:3] + (options[3][1]['value'],) + key[4:]
+    monkeypatch.setattr(dashboard, '_triggered_props', lambda: {'y-axis-dropdown.value'})
+    result = _full(snapshot, new_key)
+    share = copy.deepcopy(result[0])
+    share['data'] = share['data'] + share['data'][:1]
+    output = dashboard._metric_only_update(snapshot, new_key, {'version': snapshot.version, 'inputs': list(key)},
+                                           (share,) + result[1:])
+    assert output[0] is share and output[1] is dash.no_update
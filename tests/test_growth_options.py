@@ -0,0 +1,48 @@
+import json
+
+import pandas as pd
+import pytest
+
+import social_data_dash as dashboard
+from metric_history import MetricHistory
+
+POSTS = 3000
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    df = pd.DataFrame({
+        '永久連結': [f'https://www.facebook.com/post/{i}' for i in range(POSTS)],
+        '發布日期': pd.Timestamp('2024-01-01') + pd.to_timedelta(pd.RangeIndex(POSTS) // 10, unit='D'),
+        '發布時間': '19:00',
+        '觸及人數': range(POSTS),
+    })
+    history = MetricHistory(str(tmp_path))
+    history.record({'貼文': df}, {}, fingerprint='test', exported_at=1.7e9)
+    monkeypatch.setattr(dashboard, 'get_history', lambda: history)
+    return history
+
+
+def test_sheet_change_sends_limited_options(history):
+    options, value, _, _ = dashboard.update_growth_options('FB', '貼文')
+    posts = history.posts('FB', '貼文')
+    assert len(options) == dashboard.GROWTH_POST_OPTIONS
+    assert value == posts[0]
+    assert [option['value'] for option in options] == posts[:dashboard.GROWTH_POST_OPTIONS]
+    assert len(json.dumps(options, ensure_ascii=False)) < 20000
+
+
+def test_search_returns_matching_posts(history):
+    options, _ = dashboard.growth_post_options('FB', '貼文', search='POST/2999')
+    assert [option['label'] for option in options] == ['https://www.facebook.com/post/2999 2024-10-26 19:00']
+
+    options, _ = dashboard.growth_post_options('FB', '貼文', search='2024-03-01')
+    assert 0 < len(options) <= dashboard.GROWTH_POST_OPTIONS
+    assert all('2024-03-01' in option['label'] for option in options)
+
+
+def test_selected_post_stays_in_options(history):
+    selected = history.posts('FB', '貼文')[-1]
+    options, _ = dashboard.growth_post_options('FB', '貼文', search='', selected=selected)
+    assert options[0]['value'] == selected
+    assert len(options) == dashboard.GROWTH_POST_OPTIONS + 1
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from leaderboard import MAX_N, LeaderboardIndex, StoreLeaderboard
+from storage import SqliteStore
+
+
+def _frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 50, rows).astype(float)  # 大量同分
+    values[rng.random(rows) < 0.1] = np.nan
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+    dates = pd.Series(dates).where(rng.random(rows) > 0.05)
+    return pd.DataFrame({
+        '類別': rng.choice(['甲', '乙', '丙'], rows),
+        '發布日期': dates,
+        '觸及人數': values,
+    })
+
+
+def _expected(df, category, start, end, n, bottom):
+    # 以排序整個區間作為對照：數值由大到小、同分依列位置
+    mask = df['觸及人數'].notna() & df['發布日期'].notna()
+    if category is not None:
+        mask &= df['類別'] == category
+    if start is not None:
+        mask &= df['發布日期'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['發布日期'] < pd.Timestamp(end) + pd.Timedelta(days=1)
+    positions = np.flatnonzero(mask.to_numpy())
+    values = df['觸及人數'].to_numpy()[positions]
+    order = positions[np.lexsort((positions, -values))]
+    return order[::-1][:n] if bottom else order[:n]
+
+
+@pytest.mark.parametrize('rows', [1, 99, 100, 101, 2500])
+def test_date_range_query_matches_full_sort(rows):
+    df = _frame(rows)
+    index = LeaderboardIndex(df, ['觸及人數'], '類別', '發布日期')
+    rng = np.random.default_rng(rows)
+    for _ in range(200):
+        start, end = sorted(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(-5, 370, 2), unit='D'))
+        start = None if rng.random() < 0.1 else start.date().isoformat()
+        end = None if rng.random() < 0.1 else end.date().isoformat()
+        if start is None and end is None:
+            continue
+        category = rng.choice([None, '甲', '乙'])
+        n = int(rng.choice([1, 7, MAX_N, MAX_N + 5]))
+        bottom = bool(rng.random() < 0.5)
+        result = index.query('觸及人數', n, category=category, start=start, end=end, bottom=bottom)
+        np.testing.assert_array_equal(result, _expected(df, category, start, end, n, bottom))
+
+
+def test_sqlite_leaderboard_matches_index(tmp_path):
+    df = _frame(2500)
+    index = LeaderboardIndex(df, ['觸及人數'], '類別', '發布日期')
+    dataset = SqliteStore(str(tmp_path / 'data.sqlite')).import_dataset('test', {'貼文': df}, {})
+    store_index = StoreLeaderboard(dataset, 'FB', '貼文', dataset.schema('FB', '貼文'), ['觸及人數'], '類別', '發布日期')
+    assert store_index.categories == index.categories
+    assert store_index.date_extent() == index.date_extent()
+
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        start, end = sorted(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(-5, 370, 2), unit='D'))
+        start = None if rng.random() < 0.3 else start.date().isoformat()
+        end = None if rng.random() < 0.3 else end.date().isoformat()
+        category = rng.choice([None, '甲', '乙'])
+        n = int(rng.choice([1, 7, MAX_N + 5]))
+        bottom = bool(rng.random() < 0.5)
+        expected = index.top('觸及人數', n, category=category, start=start, end=end, bottom=bottom)
+        actual = store_index.top('觸及人數', n, category=category, start=start, end=end, bottom=bottom)
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True))
@@ -0,0 +1,64 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from metric_history import MetricHistory
+from storage import SqliteStore
+
+
+def _exports(rows, count, seed=0):
+    # 每次匯出更新部分指標並新增貼文；網址有重複，鍵值會跨越讀取區塊加上編號
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        '永久連結': [f'https://example.com/{i % (rows // 3)}' for i in range(rows)],
+        '發布日期': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 3, rows), unit='D'),
+        '發布時間': '12:00:00',
+        '觸及人數': rng.integers(0, 100, rows),
+    })
+    exports = []
+    for export in range(count):
+        df = df.copy()
+        changed = rng.random(len(df)) < 0.3
+        df.loc[changed, '觸及人數'] = df.loc[changed, '觸及人數'] + rng.integers(1, 50, changed.sum())
+        added = df.sample(5, random_state=export).assign(永久連結=[f'https://example.com/new-{export}-{i}'
+                                                               for i in range(5)])
+        df = pd.concat([df, added], ignore_index=True)
+        exports.append(df)
+    return exports
+
+
+def test_chunked_record_matches_whole_frames(tmp_path):
+    whole = MetricHistory(str(tmp_path / 'whole'))
+    chunked = MetricHistory(str(tmp_path / 'chunked'))
+    store = SqliteStore(str(tmp_path / 'data.sqlite'))
+    for export, df in enumerate(_exports(60, 4)):
+        whole.record({'貼文': df}, {}, fingerprint=f'export-{export}', exported_at=export)
+
+        dataset = store.import_dataset(f'export-{export}', {'貼文': df}, {})
+        schema = dataset.schema('FB', '貼文')
+        chunks = lambda: itertools.chain([schema], dataset.iter_chunks('FB', '貼文', 7))  # noqa: E731
+        chunked.record({'貼文': chunks}, {}, fingerprint=f'export-{export}', exported_at=export)
+
+    assert chunked.posts('FB', '貼文') == whole.posts('FB', '貼文')
+    for export in range(4):
+        pd.testing.assert_frame_equal(chunked.as_of('FB', '貼文', export), whole.as_of('FB', '貼文', export))
+    for post in whole.posts('FB', '貼文')[::10]:
+        pd.testing.assert_frame_equal(chunked.growth('FB', '貼文', post, '觸及人數'),
+                                      whole.growth('FB', '貼文', post, '觸及人數'))
+
+
+def test_growth_skips_exports_without_post(tmp_path):
+    history = MetricHistory(str(tmp_path))
+    df = pd.DataFrame({'永久連結': ['a', 'b'], '發布日期': pd.Timestamp('2024-01-01'), '發布時間': '12:00:00',
+                       '觸及人數': [10, 20]})
+    exports = [df, df.iloc[[1]], df.assign(觸及人數=[15, 20]), df.assign(觸及人數=[15, 25])]
+    for export, data in enumerate(exports):
+        history.record({'貼文': data}, {}, fingerprint=f'export-{export}', exported_at=export)
+
+    growth = history.growth('FB', '貼文', 'a|2024-01-01|12:00:00', '觸及人數')
+    assert growth['匯出'].tolist() == [0, 2, 3]
+    assert growth['觸及人數'].tolist() == [10, 15, 15]
+    growth = history.growth('FB', '貼文', 'b|2024-01-01|12:00:00', '觸及人數')
+    assert growth['匯出'].tolist() == [0, 1, 2, 3]
+    assert growth['觸及人數'].tolist() == [20, 20, 20, 25]
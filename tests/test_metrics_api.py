@@ -0,0 +1,13 @@
+import social_data_dash as dashboard
+
+
+def test_aggregate_rejects_non_numeric_metrics():
+    client = dashboard.server.test_client()
+    for query in ('agg=mean&metrics=類別', 'agg=sum&metrics=發布時間'):
+        response = client.get(f'/api/v1/FB/貼文/aggregate?by=類別&{query}')
+        assert response.status_code == 400
+        assert '數值欄位' in response.get_json()['error']
+
+    response = client.get('/api/v1/FB/貼文/aggregate?by=類別&agg=sum')
+    assert response.status_code == 200
+    assert '編號' not in response.get_json()['metrics']
@@ -0,0 +1,85 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import data_store
+import upload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def targets(tmp_path, monkeypatch):
+    # data/ 換成暫存目錄：FB 先放舊內容，IG 沿用範例檔
+    fb_path, ig_path = str(tmp_path / 'FB_all_data.xlsx'), str(tmp_path / 'IG_all_data.xlsx')
+    with open(fb_path, 'wb') as f:
+        f.write(b'old')
+    shutil.copy(data_store.IG_PATH, ig_path)
+    monkeypatch.setattr(upload, '_TARGETS', {'FB': fb_path, 'IG': ig_path})
+    monkeypatch.setattr(upload, 'UPLOAD_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(upload, 'JOBS_DIR', str(tmp_path / 'uploads' / 'jobs'))
+    return fb_path, ig_path
+
+
+def _staged_job(tmp_path, job_id):
+    os.makedirs(upload.UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(upload.UPLOAD_DIR, f'{job_id}-0.xlsx')
+    shutil.copy(data_store.FB_PATH, path)
+    job = upload._Job(job_id, [(path, 'FB_all_data.xlsx')])
+    job.save()
+    return job, path
+
+
+def test_status_is_readable_from_other_processes(tmp_path, targets):
+    job, _ = _staged_job(tmp_path, 'abc123')
+    job.update('parsing')
+    code = (f'import upload; upload.JOBS_DIR = {upload.JOBS_DIR!r}; '
+            f'import json; print(json.dumps(upload.job_status("abc123")))')
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1])['state'] == 'parsing'
+    assert upload.job_status('../abc123') is None
+    assert upload.job_status(['abc123']) is None
+
+
+def test_failed_publish_keeps_data_files(tmp_path, targets, monkeypatch):
+    fb_path, _ = targets
+    job, path = _staged_job(tmp_path, 'def456')
+    # 目前快照為其他內容，發布沒有發生時指紋不會相符
+    data_store.publish_snapshot({}, {}, fingerprint='other')
+    monkeypatch.setattr(upload, 'reload_data', lambda *paths: None)
+    upload._process(job)
+
+    status = upload.job_status('def456')
+    assert status['state'] == 'failed'
+    with open(fb_path, 'rb') as f:
+        assert f.read() == b'old'
+    assert not os.path.exists(path)
+
+
+def test_publishes_staged_files_before_replacing(tmp_path, targets, monkeypatch):
+    fb_path, ig_path = targets
+    calls = []
+
+    def reload_data(*paths):
+        with open(fb_path, 'rb') as f:
+            calls.append((paths, f.read()))
+        return data_store.reload_data(*paths)
+
+    job, path = _staged_job(tmp_path, 'abc789')
+    monkeypatch.setattr(upload, 'reload_data', reload_data)
+    upload._process(job)
+
+    status = upload.job_status('abc789')
+    assert status['state'] == 'done', status['messages']
+    # 第一次以暫存檔發布，當時 data/ 仍是舊檔；之後才取代並只更新快照來源
+    assert calls[0] == ((path, ig_path), b'old')
+    assert calls[1][0] == (fb_path, ig_path)
+    snapshot = data_store.get_snapshot()
+    assert status['version'] == snapshot.version
+    assert snapshot.source[0] == (fb_path, ig_path)
+    with open(fb_path, 'rb') as f, open(data_store.FB_PATH, 'rb') as original:
+        assert f.read() == original.read()
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import social_data_dash as dashboard
+from data_store import get_snapshot, publish_snapshot
+from figure_cache import UsageTracker
+
+
+def _fresh_snapshot():
+    # 以同一份數據發布新版本，快取從空的開始；不帶 fingerprint 以免載入磁碟上的預熱結果
+    snapshot = get_snapshot()
+    return publish_snapshot(snapshot.fb_data, snapshot.ig_data, source=snapshot.source)
+
+
+def test_warmup_and_requests_share_one_computation(monkeypatch):
+    snapshot = _fresh_snapshot()
+    calls = []
+    original = dashboard.compute_graphs_and_table
+
+    def slow_compute(snap, *key):
+        calls.append(key)
+        time.sleep(0.2)
+        return original(snap, *key)
+
+    monkeypatch.setattr(dashboard, 'compute_graphs_and_table', slow_compute)
+    key = next(key for key in dashboard._warm_keys(snapshot) if key[0] == 'graphs')[1:]
+
+    warm = threading.Thread(target=dashboard.warm_caches, args=(snapshot,))
+    requests = [threading.Thread(target=dashboard.update_graphs_and_table, args=key) for _ in range(4)]
+    warm.start()
+    for thread in requests:
+        thread.start()
+    for thread in [warm] + requests:
+        thread.join()
+
+    assert calls.count(key) == 1
+
+
+def test_concurrent_figure_builds_do_not_fail():
+    snapshot = _fresh_snapshot()
+    keys = []
+    for platform, sheets in (('FB', snapshot.fb_data), ('IG', snapshot.ig_data)):
+        for sheet in sheets:
+            options = dashboard.update_comparison_options(platform, sheet)
+            for x_axis in [option['value'] for option in options[2]]:
+                for y_axis in [option['value'] for option in options[3]][:3]:
+                    keys.append((platform, sheet, x_axis, y_axis, options[7], options[10]))
+
+    errors = []
+
+    def build(part):
+        for key in part:
+            try:
+                dashboard.compute_graphs_and_table(snapshot, *key)
+            except Exception as e:
+                errors.append(repr(e))
+
+    threads = [threading.Thread(target=build, args=(keys[i::6] * 2,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_store_queries_do_not_hold_figure_lock(monkeypatch):
+    # 箱型圖的分批查詢進行中，其他請求仍可建立圖表
+    snapshot = _fresh_snapshot()
+    started, release = threading.Event(), threading.Event()
+    original = snapshot.store.iter_chunks
+
+    def slow_chunks(*args, **kwargs):
+        started.set()
+        release.wait(10)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(snapshot.store, 'iter_chunks', slow_chunks)
+    options = dashboard.update_comparison_options('FB', '貼文')
+    key = ('FB', '貼文', options[2][0]['value'], options[3][0]['value'], '類別', options[10])
+    compute = threading.Thread(target=dashboard.compute_graphs_and_table, args=(snapshot, *key))
+    compute.start()
+    try:
+        assert started.wait(10)
+        pie = []
+        builder = threading.Thread(target=lambda: pie.append(dashboard._pie_figure(snapshot, 'FB', '貼文')))
+        builder.start()
+        builder.join(5)
+        assert pie and pie[0]['data']
+    finally:
+        release.set()
+        compute.join()
+
+
+def test_usage_records_only_valid_combinations(tmp_path, monkeypatch):
+    _fresh_snapshot()
+    usage = UsageTracker(str(tmp_path), max_keys=2)
+    monkeypatch.setattr(dashboard, '_usage', usage)
+    options = dashboard.update_comparison_options('FB', '貼文')
+    valid = ('FB', '貼文', options[1], options[4], options[7], options[10])
+
+    dashboard.update_graphs_and_table(*valid)
+    dashboard.update_graphs_and_table('FB', '貼文', options[1], 'x' * 100, options[7], options[10])
+    dashboard.update_graphs_and_table('FB', 'no-such-sheet', options[1], options[4], options[7], options[10])
+    assert usage.most_common(10) == [valid]
+
+    # 寫入磁碟時只保留最常用的 max_keys 個組合
+    for i, key in enumerate(['a', 'b', 'c']):
+        for _ in range(i + 1):
+            usage.record(key)
+    usage.flush()
+    assert UsageTracker(str(tmp_path)).most_common(10) == ['c', 'b']
@@ -0,0 +1,262 @@
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from data_store import (DATA_DIR, FB_PATH, IG_PATH, content_fingerprint, get_snapshot, prepare_workbook,
+                        reload_data, save_parsed, validate_workbook, workbook_platform)
+
+# 活頁簿上傳：檔案先存到暫存目錄，由獨立子程序在時間與記憶體限制下檢查並解析，
+# 以暫存檔發布新的數據版本，成功後才取代 data/ 下的檔案；整個流程在背景執行緒進行，不佔用請求執行緒
+# 工作狀態寫在 UPLOAD_DIR 下，多個 worker 時輪詢落在哪個 worker 都讀得到
+
+UPLOAD_DIR = os.path.join(DATA_DIR, 'uploads')
+JOBS_DIR = os.path.join(UPLOAD_DIR, 'jobs')
+
+# 解析子程序的時間（秒）與記憶體（MB）上限，以及單一檔案大小上限（MB）
+UPLOAD_TIMEOUT = float(os.environ.get('SOCIAL_DASH_UPLOAD_TIMEOUT', '120'))
+UPLOAD_MEMORY_MB = int(os.environ.get('SOCIAL_DASH_UPLOAD_MEMORY_MB', '2048'))
+UPLOAD_MAX_MB = int(os.environ.get('SOCIAL_DASH_UPLOAD_MAX_MB', '50'))
+
+_TARGETS = {'FB': FB_PATH, 'IG': IG_PATH}
+
+# 只保留最近的工作狀態供頁面輪詢
+_MAX_JOBS = 20
+
+
+def parse_files(files):
+    # 在子程序內執行：依工作表判斷平台、檢查欄位，解析結果寫入解析快取
+    raw = {}
+    errors = []
+    for path, name in files:
+        try:
+            sheets = pd.read_excel(path, sheet_name=None)
+        except MemoryError:
+            raise
+        except Exception as e:
+            errors.append(f"{name} 無法讀取：{str(e)}")
+            continue
+        platform = workbook_platform(sheets)
+        if platform is None:
+            errors.append(f"{name} 無法判斷是 FB 或 IG 活頁簿")
+        elif platform in raw:
+            errors.append(f"{name} 與其他檔案同為 {platform} 活頁簿")
+        else:
+            errors.extend(f"{name}：{error}" for error in validate_workbook(platform, sheets))
+            raw[platform] = (path, sheets)
+    if errors:
+        return {'errors': errors}
+
+    # 未上傳的平台沿用目前 data/ 下的檔案
+    workbooks = {}
+    for platform, target in _TARGETS.items():
+        if platform in raw:
+            workbooks[platform] = raw[platform]
+        elif os.path.exists(target):
+            workbooks[platform] = (target, pd.read_excel(target, sheet_name=None))
+        else:
+            return {'errors': [f"缺少 {platform} 活頁簿，請一併上傳"]}
+
+    parsed = tuple(prepare_workbook(platform, workbooks[platform][1]) for platform in ('FB', 'IG'))
+    # 內容雜湊與檔案移到 data/ 後相同，發布時可直接命中解析快取
+    fingerprint = content_fingerprint((workbooks['FB'][0], workbooks['IG'][0]))
+    save_parsed(fingerprint, parsed)
+    return {
+        'platforms': {platform: raw[platform][0] for platform in raw},
+        'fingerprint': fingerprint,
+        'rows': {platform: sum(len(df) for df in sheets.values())
+                 for platform, sheets in zip(('FB', 'IG'), parsed)}
+    }
+
+
+def _peak_mb():
+    # ru_maxrss 會沿用 fork 前父程序的峰值，Linux 上改讀本程序的 VmHWM（KB）
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows 沒有 resource 模組
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker_main():
+    request = json.loads(sys.stdin.read())
+    # 解析是背景工作，降低排程優先權，CPU 不足時先讓服務程序處理請求
+    if hasattr(os, 'nice'):
+        os.nice(19)
+    try:
+        import resource
+    except ImportError:
+        resource = None  # Windows 沒有 resource 模組，只保留時間上限
+    if resource is not None:
+        limit = request['memory_mb'] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    start = time.perf_counter()
+    try:
+        result = parse_files(request['files'])
+    except MemoryError:
+        result = {'errors': [f"解析超過記憶體上限 {request['memory_mb']} MB"]}
+    result['seconds'] = time.perf_counter() - start
+    result['peak_mb'] = _peak_mb()
+    print(json.dumps(result, ensure_ascii=False))
+
+
+def run_worker(files, timeout=UPLOAD_TIMEOUT, memory_mb=UPLOAD_MEMORY_MB):
+    # files: [(暫存路徑, 原始檔名)]；逾時或子程序異常結束時回傳錯誤訊息
+    request = json.dumps({'files': files, 'memory_mb': memory_mb})
+    try:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__)], input=request,
+                                   capture_output=True, text=True, timeout=timeout,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    except subprocess.TimeoutExpired:
+        return {'errors': [f"解析超過時間上限 {timeout:g} 秒"]}
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        detail = completed.stderr.strip().splitlines()[-1:] or [f"結束碼 {completed.returncode}"]
+        return {'errors': [f"解析程序異常結束：{detail[0]}"]}
+    return json.loads(lines[-1])
+
+
+class _Job:
+    def __init__(self, job_id, files):
+        self.job_id = job_id
+        self.files = files
+        self.state = 'queued'
+        self.messages = []
+        self.result = {}
+        self.version = None
+
+    def update(self, state, messages=None):
+        self.state = state
+        if messages is not None:
+            self.messages = messages
+        self.save()
+
+    def save(self):
+        # 先寫暫存檔再取代，其他 worker 不會讀到寫到一半的狀態
+        status = {
+            'state': self.state,
+            'messages': list(self.messages),
+            'version': self.version,
+            'rows': self.result.get('rows'),
+            'seconds': self.result.get('seconds'),
+            'peak_mb': self.result.get('peak_mb')
+        }
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=JOBS_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(status, f, ensure_ascii=False)
+            os.replace(tmp_path, _job_path(self.job_id))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f'{job_id}.json')
+
+
+def _prune_jobs():
+    # 只保留最近的工作狀態；其他 worker 可能同時刪除，找不到的檔案留到下次再清
+    try:
+        paths = sorted((os.path.join(JOBS_DIR, name) for name in os.listdir(JOBS_DIR) if name.endswith('.json')),
+                       key=os.path.getmtime)
+    except OSError:
+        return
+    for path in paths[:-_MAX_JOBS]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload')
+
+
+def submit_upload(files):
+    # files: [(檔名, dcc.Upload 的 base64 內容)]；存成暫存檔後立即回傳工作編號，解析排入背景
+    decoded = []
+    for name, contents in files:
+        if not name.lower().endswith(('.xlsx', '.xlsm')):
+            raise ValueError(f"{name} 不是 Excel 活頁簿")
+        data = base64.b64decode(contents.split(',', 1)[-1])
+        if len(data) > UPLOAD_MAX_MB * 1024 * 1024:
+            raise ValueError(f"{name} 超過 {UPLOAD_MAX_MB} MB")
+        decoded.append((name, data))
+
+    job_id = uuid.uuid4().hex[:12]
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    staged = []
+    for index, (name, data) in enumerate(decoded):
+        # 與 data/ 位於同一檔案系統，發布時以 os.replace 原子取代
+        path = os.path.join(UPLOAD_DIR, f'{job_id}-{index}.xlsx')
+        with open(path, 'wb') as f:
+            f.write(data)
+        staged.append((path, name))
+
+    job = _Job(job_id, staged)
+    job.save()
+    _prune_jobs()
+    _executor.submit(_process, job)
+    return job_id
+
+
+def _process(job):
+    try:
+        job.update('parsing')
+        job.result = run_worker(job.files)
+        if job.result.get('errors'):
+            job.update('failed', job.result['errors'])
+            return
+
+        job.update('publishing')
+        # 以暫存檔發布（未上傳的平台沿用 data/ 下的檔案），失敗時 data/ 不受影響
+        paths = {platform: job.result['platforms'].get(platform, target) for platform, target in _TARGETS.items()}
+        reload_data(paths['FB'], paths['IG'])
+        snapshot = get_snapshot()
+        if snapshot.fingerprint != job.result['fingerprint']:
+            job.update('failed', ['數據發布失敗，請查看伺服器紀錄'])
+            return
+        # 發布成功後才取代 data/ 下的檔案；內容與目前快照相同，檔案監控只會更新來源而不重新發布
+        for platform, path in job.result['platforms'].items():
+            os.replace(path, _TARGETS[platform])
+        reload_data(_TARGETS['FB'], _TARGETS['IG'])
+        job.version = snapshot.version
+        job.update('done')
+    except Exception as e:
+        print(f"上傳錯誤: {str(e)}")
+        job.update('failed', [str(e)])
+    finally:
+        for path, _ in job.files:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def job_status(job_id):
+    # 工作編號來自頁面，只接受 submit_upload 產生的格式
+    if not isinstance(job_id, str) or not job_id or not all(c in '0123456789abcdef' for c in job_id):
+        return None
+    try:
+        with open(_job_path(job_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    _worker_main()